@@ -5,4 +5,5 @@ db = SQLAlchemy()
 # Importa todos os modelos para garantir que sejam registrados
 from .state import State
 from .decision import Decision
+from .decision_event import DecisionEvent
 
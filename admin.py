@@ -2,20 +2,48 @@
 Rotas de Administração - BrasilSim
 Sistema para facilitar testes e gerenciamento do jogo
 """
-from flask import Blueprint, request, jsonify
-from src.models.state import State
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.models.state import State, INDICATORS, DECISION_COOLDOWN
 from src.models.decision import Decision
+from src.models.decision_event import DecisionEvent
 from src.models import db
-import uuid
+from src.models.leaderboard import leaderboard
+from src.models.catalog import decision_catalog
+from src.models.write_behind import exclusive_write
+from src.routes.response_cache import response_cache, cached_response
+from src.routes.live import live_feed
+from src.routes.serialization import state_json_cache, decision_json, stream_json
+from src.archive import parse_sections, export_lines, import_lines
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 
 admin_bp = Blueprint('admin', __name__)
 
+# Nome exibido nas estatísticas -> coluna do indicador
+STATS_INDICATORS = {
+    'economia': 'economy',
+    'educacao': 'education',
+    'saude': 'health',
+    'seguranca': 'security',
+    'cultura': 'culture',
+    'satisfacao': 'satisfaction',
+    'corrupcao': 'corruption'
+}
+
+def parse_id(value):
+    """Id inteiro (estados e decisões) vindo da URL, ou None se inválido"""
+    return int(value) if value.isascii() and value.isdigit() else None
+
+# Limite de estado-turnos de uma simulação pela API (roda dentro da requisição,
+# em um processo só; simulações maiores: python -m src.simulator)
+MAX_API_SIMULATION_STATE_TURNS = 5_000_000
+
 @admin_bp.route('/admin/states', methods=['GET'])
 def admin_list_states():
     """Listar todos os estados com informações detalhadas para administração"""
     try:
-        states = State.get_all_states()
+        states = State.query.order_by(State.id).all()
         states_data = []
         
         for state in states:
@@ -24,7 +52,8 @@ def admin_list_states():
             state_dict['created_at_formatted'] = state.created_at.strftime('%d/%m/%Y %H:%M')
             state_dict['last_decision_formatted'] = state.last_decision.strftime('%d/%m/%Y %H:%M') if state.last_decision else 'Nunca'
             state_dict['can_make_decision'] = state.can_make_decision()
-            state_dict['decisions_count'] = len(state.get_decision_history())
+            state_dict['balance_score'] = state.balance_score
+            state_dict['growth_score'] = state.growth_score
             states_data.append(state_dict)
         
         return jsonify({
@@ -39,22 +68,27 @@ def admin_list_states():
         }), 500
 
 @admin_bp.route('/admin/states/<state_id>', methods=['DELETE'])
+@exclusive_write
 def admin_delete_state(state_id):
     """Deletar estado (para testes)"""
     try:
-        # Validar UUID
-        try:
-            uuid.UUID(state_id)
-        except ValueError:
+        state_id = parse_id(state_id)
+        if state_id is None:
             return jsonify({'error': 'ID inválido'}), 400
         
-        state = State.get_by_id(state_id)
+        state = db.session.get(State, state_id)
         if not state:
             return jsonify({'error': 'Estado não encontrado'}), 404
         
         state_name = state.name
+        deleted_id = state.id
+        DecisionEvent.delete_for_state(deleted_id)
         db.session.delete(state)
         db.session.commit()
+        leaderboard.discard(deleted_id)
+        state_json_cache.discard(deleted_id)
+        response_cache.bump()
+        live_feed.changed(deleted_id)
         
         return jsonify({
             'message': f'Estado "{state_name}" deletado com sucesso!'
@@ -67,13 +101,12 @@ def admin_delete_state(state_id):
         }), 500
 
 @admin_bp.route('/admin/states/<state_id>/indicators', methods=['PATCH'])
+@exclusive_write
 def admin_update_indicators(state_id):
     """Atualizar indicadores de um estado manualmente"""
     try:
-        # Validar UUID
-        try:
-            uuid.UUID(state_id)
-        except ValueError:
+        state_id = parse_id(state_id)
+        if state_id is None:
             return jsonify({'error': 'ID inválido'}), 400
         
         data = request.get_json()
@@ -82,7 +115,7 @@ def admin_update_indicators(state_id):
                 'error': 'Dados obrigatórios: indicators'
             }), 400
         
-        state = State.get_by_id(state_id)
+        state = db.session.get(State, state_id)
         if not state:
             return jsonify({'error': 'Estado não encontrado'}), 404
         
@@ -101,11 +134,19 @@ def admin_update_indicators(state_id):
                     'error': f'Valor do indicador {indicator} deve ser entre 0 e 100'
                 }), 400
         
-        # Atualizar indicadores
+        # Atualizar indicadores (registrado no histórico como ajuste manual)
+        before = state.get_indicators()
+        # Indicadores são inteiros: o histórico guarda variações inteiras e a
+        # reconstrução (DecisionEvent.replay) precisa bater com a linha
         for indicator, value in indicators.items():
-            setattr(state, indicator, value)
+            setattr(state, indicator, round(value))
+        DecisionEvent.record(state.id, None, None, before, state.get_indicators())
+        state.refresh_scores()
         
         db.session.commit()
+        leaderboard.update(state)
+        response_cache.bump()
+        live_feed.changed(state.id)
         
         return jsonify({
             'message': 'Indicadores atualizados com sucesso!',
@@ -119,22 +160,22 @@ def admin_update_indicators(state_id):
         }), 500
 
 @admin_bp.route('/admin/states/<state_id>/reset-cooldown', methods=['PATCH'])
+@exclusive_write
 def admin_reset_cooldown(state_id):
     """Resetar cooldown de decisão de um estado"""
     try:
-        # Validar UUID
-        try:
-            uuid.UUID(state_id)
-        except ValueError:
+        state_id = parse_id(state_id)
+        if state_id is None:
             return jsonify({'error': 'ID inválido'}), 400
         
-        state = State.get_by_id(state_id)
+        state = db.session.get(State, state_id)
         if not state:
             return jsonify({'error': 'Estado não encontrado'}), 404
         
         # Resetar cooldown (definir last_decision para mais de 24h atrás)
-        state.last_decision = datetime.now() - timedelta(hours=25)
+        state.last_decision = datetime.utcnow() - DECISION_COOLDOWN - timedelta(hours=1)
         db.session.commit()
+        response_cache.bump()
         
         return jsonify({
             'message': f'Cooldown do estado "{state.name}" resetado com sucesso!',
@@ -151,17 +192,14 @@ def admin_reset_cooldown(state_id):
 def admin_list_decisions():
     """Listar todas as decisões disponíveis"""
     try:
-        decisions = Decision.query.all()
-        decisions_data = []
+        # Do catálogo em memória, com o JSON de cada decisão já codificado
+        decisions = decision_catalog.all()
         
-        for decision in decisions:
-            decision_dict = decision.to_dict()
-            decisions_data.append(decision_dict)
-        
-        return jsonify({
-            'decisions': decisions_data,
-            'total': len(decisions_data)
-        }), 200
+        return stream_json(
+            'decisions',
+            (decision_json(decision) for decision in decisions),
+            tail=lambda: {'total': len(decisions)}
+        )
         
     except Exception as e:
         return jsonify({
@@ -190,13 +228,42 @@ def admin_create_decision():
         
         # Validar estrutura das opções
         for i, option in enumerate(options):
-            if not isinstance(option, dict) or 'text' not in option or 'effects' not in option:
+            if not isinstance(option, dict) or 'text' not in option or not isinstance(option.get('effects'), dict):
                 return jsonify({
                     'error': f'Opção {i+1} deve ter "text" e "effects"'
                 }), 400
+            # Efeitos inválidos gravados quebrariam o catálogo de decisões em todo recarregamento
+            unknown = [indicator for indicator in option['effects'] if indicator not in INDICATORS]
+            if unknown:
+                return jsonify({
+                    'error': f'Opção {i+1}: indicadores desconhecidos: {", ".join(map(str, unknown))}'
+                }), 400
+            if not all(isinstance(change, int) and not isinstance(change, bool)
+                       for change in option['effects'].values()):
+                return jsonify({
+                    'error': f'Opção {i+1}: os efeitos devem ser inteiros'
+                }), 400
+        
+        # Id definido por quem chama (o roteador do modo em shards grava a
+        # mesma decisão, com o mesmo id, em todos os shards)
+        decision_id = data.get('id')
+        if decision_id is not None:
+            if type(decision_id) is not int or decision_id < 1:
+                return jsonify({'error': 'ID inválido'}), 400
+            existing = db.session.get(Decision, decision_id)
+            if existing is not None:
+                if (existing.title, existing.description, existing.options) != (title, description, options):
+                    return jsonify({'error': 'Já existe outra decisão com esse ID'}), 409
+                # Repetição da mesma criação: nada muda
+                return jsonify({
+                    'message': 'Decisão já cadastrada.',
+                    'decision': existing.to_dict()
+                }), 200
         
         # Criar decisão
-        decision = Decision.create_decision(title, description, options)
+        decision = Decision.create_decision(title, description, options, decision_id=decision_id)
+        decision_catalog.add(decision)
+        response_cache.bump()
         
         return jsonify({
             'message': 'Decisão criada com sucesso!',
@@ -213,19 +280,20 @@ def admin_create_decision():
 def admin_delete_decision(decision_id):
     """Deletar decisão"""
     try:
-        # Validar UUID
-        try:
-            uuid.UUID(decision_id)
-        except ValueError:
+        decision_id = parse_id(decision_id)
+        if decision_id is None:
             return jsonify({'error': 'ID inválido'}), 400
         
-        decision = Decision.query.get(decision_id)
+        decision = db.session.get(Decision, decision_id)
         if not decision:
             return jsonify({'error': 'Decisão não encontrada'}), 404
         
         decision_title = decision.title
+        deleted_id = decision.id
         db.session.delete(decision)
         db.session.commit()
+        decision_catalog.remove(deleted_id)
+        response_cache.bump()
         
         return jsonify({
             'message': f'Decisão "{decision_title}" deletada com sucesso!'
@@ -238,11 +306,13 @@ def admin_delete_decision(decision_id):
         }), 500
 
 @admin_bp.route('/admin/clear-all-data', methods=['DELETE'])
+@exclusive_write
 def admin_clear_all_data():
     """Limpar todos os dados (CUIDADO!)"""
     try:
-        # Deletar todos os estados
+        # Deletar todos os estados e seu histórico
         states_count = State.query.count()
+        DecisionEvent.query.delete()
         State.query.delete()
         
         # Deletar todas as decisões
@@ -250,6 +320,11 @@ def admin_clear_all_data():
         Decision.query.delete()
         
         db.session.commit()
+        leaderboard.clear()
+        decision_catalog.clear()
+        state_json_cache.clear()
+        response_cache.bump()
+        live_feed.changed_all()
         
         return jsonify({
             'message': f'Todos os dados foram limpos! ({states_count} estados e {decisions_count} decisões removidos)',
@@ -262,40 +337,117 @@ def admin_clear_all_data():
             'error': f'Erro interno do servidor: {str(e)}'
         }), 500
 
+@admin_bp.route('/admin/export', methods=['GET'])
+@exclusive_write
+def admin_export():
+    """Exportar estados, decisões e histórico em NDJSON (enviado aos poucos)"""
+    try:
+        kinds = parse_sections(request.args.get('only'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    filename = f'brasilsim-{datetime.now():%Y%m%d-%H%M%S}.ndjson'
+    return Response(
+        stream_with_context(export_lines(kinds)),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@admin_bp.route('/admin/import', methods=['POST'])
+@exclusive_write
+def admin_import():
+    """Importar um arquivo NDJSON exportado (corpo da requisição), em uma transação"""
+    try:
+        started = datetime.now()
+        counts = import_lines(request.stream)
+        
+        leaderboard.invalidate()
+        decision_catalog.invalidate()
+        state_json_cache.clear()
+        response_cache.bump()
+        live_feed.changed_all()
+        
+        return jsonify({
+            'message': 'Importação concluída!',
+            'imported': counts,
+            'elapsed_seconds': round((datetime.now() - started).total_seconds(), 2)
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        return jsonify({'error': 'O arquivo tem registros com ids que já existem no banco.'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': f'Erro interno do servidor: {str(e)}'
+        }), 500
+
+@admin_bp.route('/admin/simulate', methods=['POST'])
+def admin_simulate():
+    """Simular turnos futuros de todos os estados, opcionalmente com uma decisão hipotética"""
+    # Importado aqui: o simulador (e o pool de processos) só carrega quando usado
+    from src.simulator import CandidateDecision, simulate_current, DEFAULT_TURNS, DEFAULT_SEEDS
+    try:
+        data = request.get_json(silent=True) or {}
+        turns = data.get('turns', DEFAULT_TURNS)
+        seeds = data.get('seeds', DEFAULT_SEEDS)
+        seed = data.get('seed')
+        if not all(isinstance(value, int) and value >= 1 for value in (turns, seeds)):
+            return jsonify({'error': 'turns e seeds devem ser inteiros positivos'}), 400
+        if seed is not None and (not isinstance(seed, int) or seed < 0):
+            return jsonify({'error': 'seed deve ser um inteiro não negativo'}), 400
+        
+        state_turns = State.query.count() * turns * seeds * (2 if data.get('decision') else 1)
+        if state_turns > MAX_API_SIMULATION_STATE_TURNS:
+            return jsonify({
+                'error': f'Simulação grande demais para a API ({state_turns} estado-turnos, '
+                         f'máximo {MAX_API_SIMULATION_STATE_TURNS}). Use python -m src.simulator.'
+            }), 400
+        
+        candidate = CandidateDecision.from_dict(data['decision']) if data.get('decision') else None
+        return jsonify(simulate_current(turns, seeds, seed, candidate)), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'error': f'Erro interno do servidor: {str(e)}'
+        }), 500
+
 @admin_bp.route('/admin/stats', methods=['GET'])
+@cached_response
 def admin_get_stats():
     """Obter estatísticas gerais do sistema"""
     try:
-        total_states = State.query.count()
-        total_decisions = Decision.query.count()
-        
-        # Estados por região
-        states_by_region = {}
-        for region in ['Norte', 'Nordeste', 'Centro-Oeste', 'Sudeste', 'Sul']:
-            count = State.query.filter_by(region=region).count()
-            states_by_region[region] = count
-        
-        # Estados por governo
-        states_by_government = {}
-        for gov in ['Democracia', 'Tecnocracia', 'Coronelismo']:
-            count = State.query.filter_by(government=gov).count()
-            states_by_government[gov] = count
+        # Uma única passada agregada: contagem e somas por região e governo
+        groups = db.session.query(
+            State.region,
+            State.government_type,
+            func.count(State.id),
+            *[func.sum(getattr(State, column)) for column in STATS_INDICATORS.values()]
+        ).group_by(State.region, State.government_type).all()
+        
+        states_by_region = {region: 0 for region in State.get_regions()}
+        states_by_government = {gov: 0 for gov in State.get_government_types()}
+        totals = {name: 0 for name in STATS_INDICATORS}
+        total_states = 0
+        
+        for region, government_type, count, *sums in groups:
+            states_by_region[region] = states_by_region.get(region, 0) + count
+            states_by_government[government_type] = states_by_government.get(government_type, 0) + count
+            total_states += count
+            for name, value in zip(STATS_INDICATORS, sums):
+                totals[name] += value or 0
         
         # Indicadores médios
-        states = State.query.all()
-        if states:
-            avg_indicators = {
-                'economia': sum(s.economia for s in states) / len(states),
-                'educacao': sum(s.educacao for s in states) / len(states),
-                'saude': sum(s.saude for s in states) / len(states),
-                'seguranca': sum(s.seguranca for s in states) / len(states),
-                'cultura': sum(s.cultura for s in states) / len(states),
-                'satisfacao': sum(s.satisfacao for s in states) / len(states),
-                'corrupcao': sum(s.corrupcao for s in states) / len(states)
-            }
+        if total_states:
+            avg_indicators = {name: total / total_states for name, total in totals.items()}
         else:
             avg_indicators = {}
         
+        total_decisions = db.session.query(func.count(Decision.id)).scalar()
+        
         return jsonify({
             'total_states': total_states,
             'total_decisions': total_decisions,
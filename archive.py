@@ -0,0 +1,294 @@
+"""
+Exportação e importação em NDJSON - BrasilSim
+
+Cada linha do arquivo é um objeto JSON com o tipo do registro ("state",
+"decision" ou "event") e as colunas da tabela correspondente, com os ids
+originais. A exportação lê o banco com cursor no servidor, em blocos, e a
+importação grava em lotes com executemany; as duas usam memória constante,
+qualquer que seja o tamanho do mundo.
+
+Uso:
+    python -m src.archive export --output mundo.ndjson
+    python -m src.archive export --only states,decisions > estados.ndjson
+    python -m src.archive import mundo.ndjson
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from operator import itemgetter
+
+from src.models import db, State, Decision, DecisionEvent
+from src.models.migrations import init_database
+from src.routes.serialization import dumps, loads
+
+# Tipo do registro -> tabela, na ordem em que precisam ser gravados
+KINDS = {
+    'state': State.__table__,
+    'decision': Decision.__table__,
+    'event': DecisionEvent.__table__,
+}
+
+# Nome usado em --only e na rota de exportação -> tipo do registro
+SECTIONS = {
+    'states': 'state',
+    'decisions': 'decision',
+    'events': 'event',
+}
+
+# Linhas lidas do cursor por vez na exportação
+EXPORT_BATCH_SIZE = 5000
+
+# Linhas gravadas por executemany na importação
+IMPORT_BATCH_SIZE = 10000
+
+# Tamanho de uma data ISO com microssegundos (AAAA-MM-DDTHH:MM:SS.ffffff)
+ISO_DATETIME_LENGTH = 26
+
+
+def parse_sections(only=None):
+    """Converte 'states,events' (ou None = tudo) na lista de tipos a exportar"""
+    if not only:
+        return list(KINDS)
+    names = [name.strip() for name in only.split(',') if name.strip()]
+    invalid = [name for name in names if name not in SECTIONS]
+    if invalid:
+        raise ValueError(f'Seções inválidas: {", ".join(invalid)}. Válidas: {", ".join(SECTIONS)}')
+    return [kind for kind in KINDS if kind in {SECTIONS[name] for name in names}]
+
+
+def export_lines(kinds=None):
+    """
+    Gera as linhas NDJSON (bytes) das tabelas pedidas, em ordem de id.
+    Requer contexto da aplicação enquanto estiver sendo consumido.
+    """
+    for kind in kinds or KINDS:
+        table = KINDS[kind]
+        prefix = b'{"type":' + dumps(kind) + b','
+        result = db.session.execute(
+            table.select().order_by(table.c.id),
+            execution_options={'yield_per': EXPORT_BATCH_SIZE}
+        )
+        keys = list(result.keys())
+        for rows in result.partitions():
+            yield b''.join(prefix + dumps(dict(zip(keys, row)))[1:] + b'\n' for row in rows)
+
+
+class TableWriter:
+    """
+    Converte registros importados em linhas de INSERT de uma tabela. Colunas
+    ausentes recebem o valor padrão do modelo. No SQLite as linhas vão direto
+    para o executemany do driver, já com as conversões de tipo do dialeto
+    (o processamento de parâmetros do SQLAlchemy, linha a linha, custaria
+    mais que a gravação); nos demais bancos passam pelo INSERT em lote do
+    SQLAlchemy.
+    """
+
+    def __init__(self, table, dialect):
+        self.table = table
+        self.direct = dialect.name == 'sqlite'
+        compiled = table.insert().compile(dialect=dialect, column_keys=[column.name for column in table.columns])
+        self.sql = str(compiled)
+
+        # Colunas na ordem dos parâmetros, com padrão e conversão de cada uma
+        columns = {column.name: column for column in table.columns}
+        self.names = list(compiled.positiontup or columns)
+        self.defaults = [default_value(columns[name]) for name in self.names]
+        self.get_all = itemgetter(*self.names)
+
+        # Só as colunas que precisam de conversão: datas em texto ISO e tipos
+        # com conversão do dialeto
+        self.conversions = []
+        for index, name in enumerate(self.names):
+            column = columns[name]
+            process = column.type.dialect_impl(dialect).bind_processor(dialect) if self.direct else None
+            if isinstance(column.type, db.DateTime):
+                self.conversions.append((index, datetime_converter(process)))
+            elif process is not None:
+                self.conversions.append((index, process))
+
+    def row(self, record):
+        try:
+            values = list(self.get_all(record))
+        except KeyError:
+            values = [record.get(name, default) for name, default in zip(self.names, self.defaults)]
+
+        for index, convert in self.conversions:
+            value = values[index]
+            if value is not None:
+                values[index] = convert(value)
+
+        if self.direct:
+            return tuple(values)
+        return dict(zip(self.names, values))
+
+    def write(self, rows):
+        if self.direct:
+            db.session.connection().exec_driver_sql(self.sql, rows)
+        else:
+            db.session.execute(self.table.insert(), rows)
+
+
+def datetime_converter(process=None):
+    """
+    Converte datas em texto ISO (como saem da exportação) para o que o banco
+    recebe. Se o dialeto grava datas como 'AAAA-MM-DD HH:MM:SS.ffffff' (o
+    SQLite do SQLAlchemy), o texto completo é ajustado direto, sem criar um
+    datetime e formatá-lo de novo.
+    """
+    sample = datetime(2000, 1, 2, 3, 4, 5, 6)
+    same_text = process is not None and process(sample) == sample.isoformat(' ')
+
+    def convert(value):
+        if isinstance(value, str):
+            if same_text and len(value) == ISO_DATETIME_LENGTH and value[10] == 'T':
+                return value[:10] + ' ' + value[11:]
+            value = datetime.fromisoformat(value)
+        return process(value) if process is not None else value
+
+    return convert
+
+
+def default_value(column):
+    """Valor padrão (do lado do Python) de uma coluna, ou None"""
+    default = column.default
+    if default is None:
+        return None
+    if default.is_callable:
+        return default.arg(None)
+    return default.arg
+
+
+class Importer:
+    """
+    Grava registros NDJSON em lotes. As linhas podem vir em qualquer ordem:
+    antes de gravar um lote, os lotes pendentes dos tipos anteriores (ex.:
+    estados antes de eventos) são gravados, para respeitar as chaves
+    estrangeiras. Nada é confirmado: quem chama faz o commit.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        dialect = db.session.get_bind().dialect
+        self.batch_size = batch_size
+        self.counts = {kind: 0 for kind in KINDS}
+        self._pending = {kind: [] for kind in KINDS}
+        self._writers = {kind: TableWriter(table, dialect) for kind, table in KINDS.items()}
+
+    def add(self, record):
+        kind = record.pop('type', None)
+        writer = self._writers.get(kind)
+        if writer is None:
+            raise ValueError(f'Tipo de registro inválido: {kind}')
+
+        pending = self._pending[kind]
+        pending.append(writer.row(record))
+        if len(pending) >= self.batch_size:
+            self.flush(kind)
+
+    def add_lines(self, lines):
+        """Importa linhas NDJSON (str ou bytes); linhas em branco são ignoradas"""
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+            except ValueError:
+                raise ValueError(f'Linha {number}: JSON inválido')
+            if not isinstance(record, dict):
+                raise ValueError(f'Linha {number}: esperado um objeto JSON')
+            self.add(record)
+
+    def flush(self, kind=None):
+        """Grava os lotes pendentes de `kind` e dos tipos anteriores (ou de todos)"""
+        for current in KINDS:
+            pending = self._pending[current]
+            if pending:
+                self._writers[current].write(pending)
+                self.counts[current] += len(pending)
+                self._pending[current] = []
+            if current == kind:
+                break
+
+    def finish(self):
+        """Grava o que faltou e ajusta as sequências de id (PostgreSQL)"""
+        self.flush()
+        if db.session.get_bind().dialect.name == 'postgresql':
+            for kind, table in KINDS.items():
+                if self.counts[kind]:
+                    db.session.execute(db.text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                        f"(SELECT MAX(id) FROM {table.name}))"
+                    ))
+        return self.counts
+
+
+def import_lines(lines, batch_size=IMPORT_BATCH_SIZE):
+    """Importa um fluxo NDJSON em uma única transação e retorna {tipo: linhas}"""
+    importer = Importer(batch_size)
+    try:
+        importer.add_lines(lines)
+        counts = importer.finish()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts
+
+
+def create_cli_app(environ=os.environ):
+    """
+    A aplicação de main.create_app (mesma configuração do banco), com o
+    esquema criado, para a linha de comando. As decisões padrão não são
+    gravadas: a importação traz as suas, com os mesmos ids.
+    """
+    # Importada aqui: main registra as rotas, que usam este módulo
+    from src.main import create_app
+    app = create_app(environ)
+    with app.app_context():
+        init_database(default_decisions=False)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exporta e importa o mundo do BrasilSim em NDJSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='grava estados, decisões e histórico em NDJSON')
+    export_parser.add_argument('--output', help='arquivo de saída (padrão: saída padrão)')
+    export_parser.add_argument('--only', help=f'seções separadas por vírgula ({",".join(SECTIONS)})')
+
+    import_parser = commands.add_parser('import', help='carrega um arquivo NDJSON exportado')
+    import_parser.add_argument('file', help='arquivo NDJSON (- para a entrada padrão)')
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    app = create_cli_app()
+    started = time.perf_counter()
+    with app.app_context():
+        if args.command == 'export':
+            kinds = parse_sections(args.only)
+            output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+            try:
+                for chunk in export_lines(kinds):
+                    output.write(chunk)
+            finally:
+                if args.output:
+                    output.close()
+            print(f'Exportação concluída em {time.perf_counter() - started:.1f}s', file=sys.stderr)
+        else:
+            source = sys.stdin.buffer if args.file == '-' else open(args.file, 'rb')
+            try:
+                counts = import_lines(source, args.batch_size)
+            finally:
+                if args.file != '-':
+                    source.close()
+            summary = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+            print(f'Importados: {summary} em {time.perf_counter() - started:.1f}s', file=sys.stderr)
+            print('Servidores em execução reconstroem rankings e catálogo ao expirar os índices '
+                  '(ou ao reiniciar).', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+Arquivos estáticos - BrasilSim
+
+O build percorre a pasta static, troca o nome de cada arquivo (menos as
+páginas HTML) por um com o hash do conteúdo (app.js -> app.1a2b3c4d5e6f.js),
+atualiza as referências no HTML e no CSS e guarda cada arquivo também
+comprimido com gzip e brotli (quando o pacote brotli está instalado).
+
+Na primeira requisição, o servidor carrega tudo em uma tabela em memória:
+cada requisição escolhe a versão pelo Accept-Encoding, sem abrir arquivos.
+Os nomes com hash são servidos com cache imutável; o index.html (também
+usado para as rotas do SPA) e os nomes originais, com revalidação pelo ETag.
+Sem um build em dia com a pasta static, a tabela é montada na memória.
+
+Uso:
+    python -m src.assets
+    python -m src.assets --static caminho/static --output caminho/static_build
+
+Configuração por variáveis de ambiente:
+    BRASILSIM_ASSET_BUILD_DIR  pasta do build (padrão: static_build, ao lado de static)
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import sys
+from threading import Lock
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, só gzip
+    brotli = None
+
+DEFAULT_STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+DEFAULT_BUILD_DIR = os.path.join(os.path.dirname(__file__), 'static_build')
+
+MANIFEST_NAME = 'manifest.json'
+INDEX_PATH = 'index.html'
+
+# Páginas servidas sempre pelo nome original
+PAGE_EXTENSIONS = ('.html',)
+
+# Arquivos cujas referências a outros arquivos são atualizadas no build
+REWRITTEN_EXTENSIONS = ('.html', '.css')
+
+# Tipos comprimidos (imagens e fontes já vêm comprimidas)
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Arquivos menores que isso não compensam a compressão
+MIN_COMPRESS_SIZE = 256
+
+# Codificações na ordem de preferência, com a extensão do arquivo no build
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Referências no HTML (src/href) e no CSS (url(...))
+HTML_REFERENCE = re.compile(r'''(\b(?:src|href)\s*=\s*["'])([^"']+)(["'])''')
+CSS_REFERENCE = re.compile(r'''(url\(\s*["']?)([^"')]+)(["']?\s*\))''')
+
+# Referências que não apontam para arquivos da pasta static
+EXTERNAL_REFERENCE = re.compile(r'^(?:[a-z][a-z0-9+.-]*:|//|#)', re.IGNORECASE)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprinted_path(path, data):
+    """js/app.js -> js/app.<12 primeiros dígitos do hash>.js"""
+    root, extension = posixpath.splitext(path)
+    return f'{root}.{content_hash(data)[:12]}{extension}'
+
+
+def guess_mimetype(path):
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if mimetype.startswith('text/') or mimetype in ('application/javascript', 'application/json'):
+        mimetype += '; charset=utf-8'
+    return mimetype
+
+
+def compress(path, data):
+    """Versões comprimidas que valem a pena: {codificação: bytes}"""
+    mimetype = guess_mimetype(path)
+    if len(data) < MIN_COMPRESS_SIZE or not mimetype.startswith(COMPRESSIBLE_TYPES):
+        return {}
+    encoded = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in encoded.items() if len(body) < len(data)}
+
+
+def read_sources(static_dir):
+    """Arquivos da pasta static: {caminho relativo com '/': bytes}"""
+    sources = {}
+    for directory, _, names in os.walk(static_dir):
+        for name in sorted(names):
+            full_path = os.path.join(directory, name)
+            path = os.path.relpath(full_path, static_dir).replace(os.sep, '/')
+            with open(full_path, 'rb') as source:
+                sources[path] = source.read()
+    return sources
+
+
+def rewrite_references(path, data, renamed):
+    """Troca as referências de um HTML ou CSS pelos nomes com hash"""
+    pattern = HTML_REFERENCE if path.endswith('.html') else CSS_REFERENCE
+    base = posixpath.dirname(path)
+
+    def replace(match):
+        reference = match.group(2).strip()
+        if EXTERNAL_REFERENCE.match(reference):
+            return match.group(0)
+        target, separator, suffix = reference.partition('?')
+        target, hash_separator, fragment = target.partition('#')
+        if target.startswith('/'):
+            resolved = posixpath.normpath(target.lstrip('/'))
+        else:
+            resolved = posixpath.normpath(posixpath.join(base, target))
+        if resolved not in renamed:
+            return match.group(0)
+        new_name = renamed[resolved]
+        if target.startswith('/'):
+            new_target = '/' + new_name
+        else:
+            new_target = posixpath.relpath(new_name, base or '.')
+        rebuilt = new_target + hash_separator + fragment + separator + suffix
+        return match.group(1) + rebuilt + match.group(3)
+
+    return pattern.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+
+class Asset:
+    """Um arquivo servido: conteúdo em cada codificação e cabeçalhos"""
+    __slots__ = ('path', 'mimetype', 'bodies', 'etag', 'immutable')
+
+    def __init__(self, path, data, immutable, bodies=None):
+        self.path = path
+        self.mimetype = guess_mimetype(path)
+        self.bodies = {'identity': data}
+        self.bodies.update(compress(path, data) if bodies is None else bodies)
+        self.etag = content_hash(data)[:16]
+        self.immutable = immutable
+
+    def choose_encoding(self, accept_encoding):
+        """Melhor codificação disponível aceita pelo cliente"""
+        for encoding, _ in ENCODINGS:
+            if encoding in self.bodies and accept_encoding[encoding]:
+                return encoding
+        return 'identity'
+
+    def response(self, request):
+        encoding = self.choose_encoding(request.accept_encodings)
+        response = Response(self.bodies[encoding], mimetype=self.mimetype)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE if self.immutable else REVALIDATE_CACHE
+        if len(self.bodies) > 1:
+            response.vary.add('Accept-Encoding')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        # Cada codificação é um corpo diferente, com seu próprio ETag
+        response.set_etag(self.etag if encoding == 'identity' else f'{self.etag}-{encoding}')
+        return response.make_conditional(request)
+
+
+class AssetTable:
+    """Arquivos estáticos em memória, pelo caminho da URL"""
+
+    def __init__(self, assets, sources_hash):
+        self.assets = assets
+        self.sources_hash = sources_hash
+        self.index = assets.get(INDEX_PATH)
+
+    @staticmethod
+    def build(static_dir):
+        """Monta a tabela a partir da pasta static (hash, referências e compressão)"""
+        sources = read_sources(static_dir)
+        renamed = {}
+        assets = {}
+
+        # Primeiro os arquivos sem referências, depois o CSS (que já aponta para
+        # os nomes novos) e por último as páginas, que mantêm o nome
+        def order(path):
+            extension = posixpath.splitext(path)[1]
+            return (extension in PAGE_EXTENSIONS, extension in REWRITTEN_EXTENSIONS, path)
+
+        for path in sorted(sources, key=order):
+            data = sources[path]
+            extension = posixpath.splitext(path)[1]
+            if extension in REWRITTEN_EXTENSIONS:
+                data = rewrite_references(path, data, renamed)
+            if extension in PAGE_EXTENSIONS:
+                assets[path] = Asset(path, data, immutable=False)
+                continue
+            renamed[path] = fingerprinted_path(path, data)
+            asset = Asset(renamed[path], data, immutable=True)
+            assets[renamed[path]] = asset
+            # O nome original continua respondendo, com revalidação
+            assets[path] = Asset(path, data, immutable=False, bodies=dict(asset.bodies))
+        return AssetTable(assets, sources_digest(sources))
+
+    def write(self, build_dir):
+        """Grava o build: cada arquivo, suas versões comprimidas e o manifesto"""
+        if os.path.isdir(build_dir):
+            shutil.rmtree(build_dir)
+        manifest = {'sources_hash': self.sources_hash, 'assets': {}}
+        for path, asset in sorted(self.assets.items()):
+            full_path = os.path.join(build_dir, *path.split('/'))
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            for encoding, body in asset.bodies.items():
+                extension = dict(ENCODINGS).get(encoding, '')
+                with open(full_path + extension, 'wb') as output:
+                    output.write(body)
+            manifest['assets'][path] = {'immutable': asset.immutable, 'encodings': sorted(asset.bodies)}
+        with open(os.path.join(build_dir, MANIFEST_NAME), 'w', encoding='utf-8') as output:
+            json.dump(manifest, output, indent=2, sort_keys=True)
+
+    @staticmethod
+    def read(build_dir):
+        """Carrega um build gravado por `write`; None se não houver"""
+        manifest_path = os.path.join(build_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, encoding='utf-8') as source:
+            manifest = json.load(source)
+        assets = {}
+        for path, entry in manifest['assets'].items():
+            full_path = os.path.join(build_dir, *path.split('/'))
+            bodies = {}
+            for encoding in entry['encodings']:
+                extension = dict(ENCODINGS).get(encoding, '')
+                with open(full_path + extension, 'rb') as body:
+                    bodies[encoding] = body.read()
+            data = bodies.pop('identity')
+            assets[path] = Asset(path, data, entry['immutable'], bodies=bodies)
+        return AssetTable(assets, manifest['sources_hash'])
+
+    @staticmethod
+    def load(static_dir, build_dir=DEFAULT_BUILD_DIR):
+        """Build gravado, se estiver em dia com a pasta static; senão, montado na memória"""
+        if not os.path.isdir(static_dir):
+            return AssetTable({}, None)
+        table = AssetTable.read(build_dir)
+        if table is not None and table.sources_hash == sources_digest(read_sources(static_dir)):
+            return table
+        return AssetTable.build(static_dir)
+
+    def response(self, path, request):
+        """Resposta para o caminho, ou o index.html (rotas do SPA); None sem index.html"""
+        asset = self.assets.get(path) or self.index
+        return asset.response(request) if asset is not None else None
+
+
+def sources_digest(sources):
+    """Hash do conjunto de arquivos (nomes e conteúdos) da pasta static"""
+    digest = hashlib.sha256()
+    for path in sorted(sources):
+        digest.update(path.encode('utf-8') + b'\0' + content_hash(sources[path]).encode() + b'\0')
+    return digest.hexdigest()
+
+
+def init_static_assets(app, build_dir=DEFAULT_BUILD_DIR):
+    """
+    Rotas que servem a pasta static e o SPA. A tabela é carregada na
+    primeira requisição, para não atrasar o início dos workers.
+    """
+    loaded = []
+    lock = Lock()
+
+    def static_assets():
+        if not loaded:
+            with lock:
+                if not loaded:
+                    loaded.append(AssetTable.load(app.static_folder, build_dir))
+        return loaded[0]
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        """Serve arquivos estáticos e SPA"""
+        response = static_assets().response(path, request)
+        if response is None:
+            return "index.html not found", 404
+        return response
+
+    return app
+
+
+def print_report(table):
+    print(f"{'arquivo':<48}{'original':>10}{'gzip':>10}{'brotli':>10}  cache")
+    for path, asset in sorted(table.assets.items()):
+        sizes = [asset.bodies.get(encoding) for encoding in ('identity', 'gzip', 'br')]
+        print(f"{path:<48}" + ''.join(f"{len(body) if body is not None else '-':>10}" for body in sizes)
+              + f"  {'imutável' if asset.immutable else 'revalida'}")
+    if brotli is None:
+        print('\nbrotli não instalado: apenas gzip (pip install brotli)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera o build dos arquivos estáticos do BrasilSim')
+    parser.add_argument('--static', default=DEFAULT_STATIC_DIR, help='pasta com os arquivos originais')
+    parser.add_argument('--output', default=os.environ.get('BRASILSIM_ASSET_BUILD_DIR', DEFAULT_BUILD_DIR),
+                        help='pasta do build (substituída por inteiro)')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.static):
+        print(f'Pasta não encontrada: {args.static}', file=sys.stderr)
+        return 1
+    if os.path.realpath(args.output) == os.path.realpath(args.static):
+        print('A pasta do build deve ser diferente da pasta static', file=sys.stderr)
+        return 1
+    table = AssetTable.build(args.static)
+    table.write(args.output)
+    print_report(table)
+    print(f'\nBuild gravado em {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
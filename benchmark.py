@@ -0,0 +1,683 @@
+"""
+Benchmark da API - BrasilSim
+
+Cria um banco SQLite temporário com N estados e M decisões aplicadas, exercita
+a aplicação de main.create_app pelo cliente de testes do Flask e por um
+servidor HTTP local, e mede latência (p50/p95/p99) e requisições
+por segundo de cada rota. O resultado é salvo em JSON para comparar commits.
+
+Uso:
+    python -m src.benchmark --states 10000 --decisions 50000 --output bench.json
+    python -m src.benchmark --compare antes.json depois.json
+    python -m src.benchmark --stress --concurrency 8 --requests 200
+    python -m src.benchmark --stress --write-behind
+    python -m src.benchmark --check-plans
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import event
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+from src.main import create_app
+from src.models import db, State, Decision, DecisionEvent
+from src.models.leaderboard import leaderboard
+from src.models.catalog import decision_catalog
+from src.models.scheduler import decision_scheduler, encode_queue
+from src.models.migrations import init_database
+from src.models.write_behind import write_behind
+from src.models.state import INDICATORS
+from src.routes.states import MAX_BATCH_SIZE
+from src.routes.response_cache import response_cache
+
+# Itens por requisição no cenário de decisões em lote
+BATCH_SIZE = 100
+
+# Estados disputados por todas as threads no teste de estresse
+STRESS_HOT_STATES = 3
+STRESS_BATCH_SIZE = 10
+
+# Rotas usadas na medição de escala por quantidade de workers
+SCALING_ROUTES = (
+    'GET /api/rankings',
+    'GET /api/rankings/<type>',
+    'GET /api/states/<id>',
+    'POST /api/states/<id>/decision',
+)
+
+
+def create_benchmark_app(database_uri, write_behind_mode=False):
+    """A aplicação de main.create_app, com a configuração do ambiente, apontando para outro banco"""
+    return create_app({
+        **os.environ,
+        'DATABASE_URL': database_uri,
+        'BRASILSIM_WRITE_BEHIND': '1' if write_behind_mode else '0',
+    })
+
+
+def seed(app, n_states, n_decisions, seed_value=42):
+    """Popula o banco com estados e aplica decisões aleatórias em lotes"""
+    rng = random.Random(seed_value)
+    regions = State.get_regions()
+    government_types = State.get_government_types()
+
+    with app.app_context():
+        init_database()
+        decision_catalog.load()
+
+        # Estados já com a agenda de decisões, como os criados pela API
+        rows = []
+        for i in range(n_states):
+            decision_seed, position, queue = decision_scheduler.ensure(rng.randrange(2 ** 31), 0, [])
+            rows.append({
+                'name': f'Estado {i}',
+                'region': rng.choice(regions),
+                'government_type': rng.choice(government_types),
+                'decision_seed': decision_seed,
+                'decision_position': position,
+                'decision_queue': encode_queue(queue),
+            })
+        for start in range(0, len(rows), 10000):
+            db.session.execute(State.__table__.insert(), rows[start:start + 10000])
+        db.session.commit()
+
+        leaderboard.build()
+        decisions = [(decision.id, len(decision.options)) for decision in Decision.query.all()]
+
+    client = app.test_client()
+    remaining = n_decisions
+    while remaining > 0:
+        size = min(remaining, MAX_BATCH_SIZE)
+        items = []
+        for _ in range(size):
+            decision_id, n_options = rng.choice(decisions)
+            items.append({
+                'state_id': rng.randint(1, n_states),
+                'decision_id': decision_id,
+                'option_index': rng.randrange(n_options),
+            })
+        response = client.post('/api/states/decisions/batch', json={'items': items})
+        if response.status_code != 200:
+            raise RuntimeError(f'Falha ao popular decisões: {response.get_data(as_text=True)}')
+        remaining -= size
+
+    return decisions
+
+
+def build_scenarios(n_states, decisions, rng):
+    """Rotas exercitadas: (nome, método, função que gera caminho e corpo)"""
+    def random_state():
+        return rng.randint(1, n_states)
+
+    def random_item():
+        decision_id, n_options = rng.choice(decisions)
+        return {'state_id': random_state(), 'decision_id': decision_id, 'option_index': rng.randrange(n_options)}
+
+    return [
+        ('GET /api/rankings', 'GET', lambda: ('/api/rankings', None)),
+        ('GET /api/rankings/overview', 'GET', lambda: ('/api/rankings/overview', None)),
+        ('GET /api/rankings/<type>', 'GET', lambda: ('/api/rankings/' + rng.choice(['geral', 'equilibrio', 'crescimento']), None)),
+        ('GET /api/states', 'GET', lambda: ('/api/states?limit=50', None)),
+        ('GET /api/states/<id>', 'GET', lambda: (f'/api/states/{random_state()}', None)),
+        ('GET /api/states/<id>/current-decision', 'GET', lambda: (f'/api/states/{random_state()}/current-decision', None)),
+        ('POST /api/states/<id>/decision', 'POST', lambda: (f'/api/states/{random_state()}/decision', {'option_index': 0})),
+        ('POST /api/states/decisions/batch', 'POST', lambda: ('/api/states/decisions/batch', {'items': [random_item() for _ in range(BATCH_SIZE)]})),
+        ('GET /api/admin/stats', 'GET', lambda: ('/api/admin/stats', None)),
+        ('GET /api/regions', 'GET', lambda: ('/api/regions', None)),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Percentil pelo método do posto mais próximo"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'count': count,
+        'errors': errors,
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'rps': round(count / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def run_test_client(app, scenarios, n_requests):
+    """Mede as rotas pelo cliente de testes do Flask (sem rede)"""
+    client = app.test_client()
+    results = {}
+    for name, method, make_request in scenarios:
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+        for _ in range(n_requests):
+            path, body = make_request()
+            request_started = time.perf_counter()
+            # Respostas em streaming só são geradas quando lidas, e só liberam o
+            # contexto da requisição (e a conexão) quando fechadas
+            with client.open(path, method=method, json=body) as response:
+                response.get_data()
+            latencies.append(time.perf_counter() - request_started)
+            if response.status_code >= 400:
+                errors += 1
+        results[name] = summarize(latencies, errors, time.perf_counter() - started)
+    return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Servidor de desenvolvimento com keep-alive e sem log por requisição"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def run_http(app, scenarios, n_requests, concurrency):
+    """Mede as rotas por um servidor HTTP local real, com conexões persistentes"""
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        return measure_http(server.server_port, scenarios, n_requests, concurrency)
+    finally:
+        server.shutdown()
+
+
+def measure_http(port, scenarios, n_requests, concurrency):
+    """Dispara as requisições de cada rota contra um servidor já em execução"""
+    local = threading.local()
+
+    def send(method, path, body):
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = local.connection = http.client.HTTPConnection('127.0.0.1', port)
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        request_started = time.perf_counter()
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return time.perf_counter() - request_started, response.status
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for name, method, make_request in scenarios:
+            requests = [make_request() for _ in range(n_requests)]
+            started = time.perf_counter()
+            outcomes = list(pool.map(lambda request: send(method, *request), requests))
+            elapsed = time.perf_counter() - started
+            results[name] = summarize(
+                [latency for latency, _ in outcomes],
+                sum(1 for _, status in outcomes if status >= 400),
+                elapsed
+            )
+    return results
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('O servidor terminou antes de aceitar conexões')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'O servidor não respondeu na porta {port}')
+
+
+def run_scaling(worker_counts, threads, n_states, n_decisions, n_requests, seed_value=42):
+    """
+    Sobe o servidor de produção (src.serve) com diferentes quantidades de
+    workers sobre o mesmo banco e mede a vazão de uma mistura de leituras
+    de rankings e escritas de decisões.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        app = create_benchmark_app(database_uri)
+        decisions = seed(app, n_states, n_decisions, seed_value)
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+        for workers in worker_counts:
+            port = free_port()
+            environ = dict(
+                os.environ,
+                DATABASE_URL=database_uri,
+                BRASILSIM_BIND=f'127.0.0.1:{port}',
+                BRASILSIM_WORKERS=str(workers),
+                BRASILSIM_THREADS=str(threads),
+            )
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'src.serve'],
+                cwd=project_root, env=environ,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_for_port(port, process)
+                scenarios = [
+                    scenario for scenario in build_scenarios(n_states, decisions, random.Random(seed_value))
+                    if scenario[0] in SCALING_ROUTES
+                ]
+                endpoints = measure_http(port, scenarios, n_requests, workers * threads)
+                total = sum(stats['count'] for stats in endpoints.values())
+                elapsed = sum(stats['count'] / stats['rps'] for stats in endpoints.values() if stats['rps'])
+                results[str(workers)] = {
+                    'workers': workers,
+                    'threads': threads,
+                    'rps': round(total / elapsed, 1) if elapsed else 0.0,
+                    'endpoints': endpoints,
+                }
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    return results
+
+
+def run_stress(n_threads, requests_per_thread, seed_value=42, write_behind_mode=False):
+    """
+    Várias threads aplicam decisões (individuais e em lote) nos mesmos poucos
+    estados por um servidor HTTP local. Ao final, confere no banco que nenhuma
+    decisão confirmada (HTTP 200) se perdeu: decisions_count e a quantidade de
+    eventos batem com as confirmações, e somar os eventos reproduz os
+    indicadores gravados. Com a escrita adiada, as pendências são gravadas
+    (como no encerramento do servidor) antes da conferência.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_benchmark_app(f"sqlite:///{os.path.join(directory, 'stress.db')}", write_behind_mode)
+        decisions = seed(app, STRESS_HOT_STATES, 0, seed_value)
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        def worker(index):
+            rng = random.Random(seed_value + index)
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_port)
+            confirmed = Counter()
+            statuses = Counter()
+            for _ in range(requests_per_thread):
+                if rng.random() < 0.8:
+                    state_id = rng.randint(1, STRESS_HOT_STATES)
+                    path, body = f'/api/states/{state_id}/decision', {'option_index': 0}
+                else:
+                    path = '/api/states/decisions/batch'
+                    body = {'items': []}
+                    for _ in range(STRESS_BATCH_SIZE):
+                        decision_id, n_options = rng.choice(decisions)
+                        body['items'].append({
+                            'state_id': rng.randint(1, STRESS_HOT_STATES),
+                            'decision_id': decision_id,
+                            'option_index': rng.randrange(n_options),
+                        })
+                connection.request('POST', path, body=json.dumps(body), headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                payload = json.loads(response.read())
+                statuses[response.status] += 1
+                if response.status != 200:
+                    continue
+                if 'results' in payload:
+                    confirmed.update(result['state_id'] for result in payload['results'] if result['success'])
+                else:
+                    confirmed[state_id] += 1
+            connection.close()
+            return confirmed, statuses
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=n_threads) as pool:
+                outcomes = list(pool.map(worker, range(n_threads)))
+        finally:
+            server.shutdown()
+            write_behind.close()
+        elapsed = time.perf_counter() - started
+
+        confirmed = sum((outcome[0] for outcome in outcomes), Counter())
+        statuses = sum((outcome[1] for outcome in outcomes), Counter())
+
+        states = {}
+        with app.app_context():
+            for state in State.query.order_by(State.id).all():
+                events = DecisionEvent.query.filter_by(state_id=state.id).count()
+                replayed = DecisionEvent.replay(state.id)
+                states[str(state.id)] = {
+                    'confirmed': confirmed[state.id],
+                    'decisions_count': state.decisions_count,
+                    'events': events,
+                    'version': state.version,
+                    'replay_matches': replayed == {name: getattr(state, name) for name in INDICATORS},
+                }
+            db.session.remove()
+            db.engine.dispose()
+
+    lost = sum(abs(stats['confirmed'] - stats['decisions_count']) for stats in states.values())
+    consistent = lost == 0 and all(
+        stats['events'] == stats['decisions_count'] and stats['replay_matches'] for stats in states.values()
+    )
+    return {
+        'threads': n_threads,
+        'write_behind': write_behind_mode,
+        'requests': n_threads * requests_per_thread,
+        'elapsed_seconds': round(elapsed, 2),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'states': states,
+        'lost_updates': lost,
+        'consistent': consistent,
+    }
+
+
+# Requisições cujas consultas em states precisam usar índices (--check-plans).
+# As listas também são seguidas até a segunda página (cursor).
+PLAN_CHECK_REQUESTS = [
+    ('GET', '/api/states?limit=20'),
+    ('GET', '/api/states?limit=20&order=desc'),
+    *[('GET', f'/api/states?limit=20&order_by={indicator}&order={order}')
+      for indicator in INDICATORS for order in ('desc', 'asc')],
+    ('GET', '/api/states/1'),
+    ('GET', '/api/rankings'),
+    ('GET', '/api/rankings/overview'),
+    ('GET', '/api/rankings/economia'),
+    ('GET', '/api/admin/stats'),
+    ('POST', '/api/states'),
+]
+
+# Linhas de EXPLAIN QUERY PLAN (SQLite) que indicam leitura da tabela inteira
+# ou ordenação de linhas à parte (inclusive só do desempate, RIGHT PART OF
+# ORDER BY). Percorrer a tabela na ordem do id com LIMIT (lista padrão)
+# aparece como SCAN states, mas para no limite.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?states$')
+FULL_SORT = re.compile(r'^USE TEMP B-TREE\b')
+ID_ORDER_LIMIT = re.compile(r'ORDER BY states\.id( ASC| DESC)?\s+LIMIT\b')
+STATES_SELECT = re.compile(r'^\s*SELECT\b.*\bFROM states\b', re.DOTALL)
+
+
+def run_plan_check(n_states, seed_value=42):
+    """
+    Faz as requisições de PLAN_CHECK_REQUESTS, captura os SELECTs em states
+    que elas executam e confere o plano de cada um no SQLite: nenhum pode ler
+    a tabela inteira ou ordenar linhas à parte (percorrer um índice que
+    cobre as colunas, como nas estatísticas, é aceito). Também roda em
+    tests/test_query_plans.py.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_benchmark_app(f"sqlite:///{os.path.join(directory, 'plans.db')}")
+        seed(app, n_states, 0, seed_value)
+        response_cache.bump()
+        client = app.test_client()
+
+        captured = {}
+        current = {}
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and STATES_SELECT.match(statement) and statement not in captured:
+                captured[statement] = (current['request'], parameters)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            for number, (method, path) in enumerate(PLAN_CHECK_REQUESTS):
+                current['request'] = f'{method} {path}'
+                if method == 'POST':
+                    response = client.post(path, json={
+                        'name': f'Plano {number}', 'region': 'Sul', 'government_type': 'Democracia'
+                    })
+                else:
+                    response = client.get(path)
+                if response.status_code >= 400:
+                    raise RuntimeError(f'{method} {path}: HTTP {response.status_code}')
+                # Respostas em streaming só consultam o banco quando lidas, e só
+                # devolvem a conexão quando fechadas
+                cursor = response.is_json and response.get_json().get('next_cursor')
+                response.close()
+                if cursor:
+                    current['request'] = f'{method} {path} (segunda página)'
+                    page = client.get(f'{path}&cursor={cursor}')
+                    page.get_data()
+                    page.close()
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+        queries = []
+        with app.app_context():
+            connection = db.session.connection()
+            for statement, (request_label, parameters) in captured.items():
+                plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                bounded = ID_ORDER_LIMIT.search(statement) is not None
+                problems = [
+                    line for line in plan
+                    if (FULL_SCAN.match(line) and not bounded) or FULL_SORT.match(line)
+                ]
+                queries.append({
+                    'request': request_label,
+                    'sql': ' '.join(statement.split()),
+                    'plan': plan,
+                    'ok': not problems,
+                })
+            db.session.remove()
+            db.engine.dispose()
+
+    return {'states': n_states, 'queries': queries, 'ok': all(query['ok'] for query in queries)}
+
+
+def print_plan_report(report):
+    print(f"BrasilSim planos de consulta - {len(report['queries'])} consultas em states "
+          f"({report['states']} estados)")
+    for query in report['queries']:
+        print(f"\n[{'ok' if query['ok'] else 'LEITURA COMPLETA'}] {query['request']}")
+        print(f"  {query['sql'][:160]}")
+        for line in query['plan']:
+            print(f'    {line}')
+    print(f"\n{'todas as consultas usam índices' if report['ok'] else 'há consultas sem índice'}")
+
+
+def print_stress_report(report):
+    print(f"BrasilSim estresse - {report['threads']} threads, {report['requests']} requisições "
+          f"em {STRESS_HOT_STATES} estados ({report['elapsed_seconds']}s"
+          f"{', escrita adiada' if report['write_behind'] else ''})")
+    print('status HTTP: ' + ', '.join(f'{status}={count}' for status, count in report['statuses'].items()))
+    print(f"{'estado':>7}{'confirmadas':>13}{'gravadas':>10}{'eventos':>9}{'versão':>8}{'replay':>8}")
+    for state_id, stats in report['states'].items():
+        print(f"{state_id:>7}{stats['confirmed']:>13}{stats['decisions_count']:>10}{stats['events']:>9}"
+              f"{stats['version']:>8}{'ok' if stats['replay_matches'] else 'ERRO':>8}")
+    print(f"atualizações perdidas: {report['lost_updates']} - "
+          f"{'consistente' if report['consistent'] else 'INCONSISTENTE'}")
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(n_states, n_decisions, n_requests, concurrency, modes, seed_value=42, write_behind_mode=False):
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_benchmark_app(f"sqlite:///{os.path.join(directory, 'bench.db')}", write_behind_mode)
+
+        seed_started = time.perf_counter()
+        decisions = seed(app, n_states, n_decisions, seed_value)
+        seed_elapsed = time.perf_counter() - seed_started
+
+        results = {}
+        for mode in modes:
+            response_cache.clear()
+            scenarios = build_scenarios(n_states, decisions, random.Random(seed_value))
+            if mode == 'test_client':
+                results[mode] = run_test_client(app, scenarios, n_requests)
+            else:
+                results[mode] = run_http(app, scenarios, n_requests, concurrency)
+
+        # Decisões por segundo: rota individual x rota em lote
+        for mode_results in results.values():
+            single = mode_results.get('POST /api/states/<id>/decision')
+            batch = mode_results.get('POST /api/states/decisions/batch')
+            if single and batch:
+                mode_results['decisions_per_second'] = {
+                    'single': single['rps'],
+                    'batch': round(batch['rps'] * BATCH_SIZE, 1),
+                }
+
+        write_behind.close()
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    return {
+        'meta': {
+            'commit': current_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'states': n_states,
+            'decisions': n_decisions,
+            'requests_per_endpoint': n_requests,
+            'concurrency': concurrency,
+            'write_behind': write_behind_mode,
+            'seed_seconds': round(seed_elapsed, 2),
+        },
+        'results': results,
+    }
+
+
+def print_report(report):
+    meta = report['meta']
+    print(f"BrasilSim benchmark - commit {meta['commit']} - {meta['states']} estados, "
+          f"{meta['decisions']} decisões (seed {meta['seed_seconds']}s)"
+          f"{' - escrita adiada' if meta.get('write_behind') else ''}")
+    for mode, endpoints in report['results'].items():
+        print(f'\n[{mode}]')
+        print(f"{'rota':<42}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'erros':>7}")
+        for name, stats in endpoints.items():
+            if name == 'decisions_per_second':
+                continue
+            print(f"{name:<42}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+                  f"{stats['rps']:>10}{stats['errors']:>7}")
+        if 'decisions_per_second' in endpoints:
+            rates = endpoints['decisions_per_second']
+            print(f"decisões/s: individual {rates['single']} | em lote {rates['batch']}")
+
+    if 'scaling' in report:
+        print('\n[scaling] servidor de produção (src.serve)')
+        print(f"{'workers':>8}{'threads':>9}{'req/s':>10}")
+        for stats in report['scaling'].values():
+            print(f"{stats['workers']:>8}{stats['threads']:>9}{stats['rps']:>10}")
+
+
+def compare_reports(before_path, after_path):
+    """Compara p50, p99 e req/s de dois resultados salvos"""
+    with open(before_path) as handle:
+        before = json.load(handle)
+    with open(after_path) as handle:
+        after = json.load(handle)
+
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+    for mode, endpoints in after['results'].items():
+        print(f'\n[{mode}]')
+        print(f"{'rota':<42}{'p50 ms':>18}{'p99 ms':>18}{'req/s':>20}")
+        for name, stats in endpoints.items():
+            old = before['results'].get(mode, {}).get(name)
+            if name == 'decisions_per_second' or not old:
+                continue
+
+            def change(key):
+                if not old[key]:
+                    return f"{stats[key]}"
+                return f"{stats[key]} ({(stats[key] - old[key]) / old[key] * 100:+.0f}%)"
+
+            print(f"{name:<42}{change('p50_ms'):>18}{change('p99_ms'):>18}{change('rps'):>20}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark da API do BrasilSim')
+    parser.add_argument('--states', type=int, default=1000, help='estados criados no banco temporário')
+    parser.add_argument('--decisions', type=int, default=5000, help='decisões aplicadas antes das medições')
+    parser.add_argument('--requests', type=int, default=200, help='requisições por rota')
+    parser.add_argument('--concurrency', type=int, default=4, help='conexões simultâneas no modo HTTP')
+    parser.add_argument('--mode', choices=['test_client', 'http', 'all'], default='all')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='arquivo JSON para salvar o resultado')
+    parser.add_argument('--compare', nargs=2, metavar=('ANTES', 'DEPOIS'), help='compara dois resultados salvos')
+    parser.add_argument('--scaling', help='mede o servidor de produção com estas quantidades de workers (ex.: 1,2,4)')
+    parser.add_argument('--threads', type=int, default=4, help='threads por worker no modo --scaling')
+    parser.add_argument('--stress', action='store_true',
+                        help='decisões concorrentes nos mesmos estados (--concurrency threads x --requests cada)')
+    parser.add_argument('--check-plans', action='store_true',
+                        help='falha se alguma consulta frequente em states ler a tabela inteira')
+    parser.add_argument('--write-behind', action='store_true',
+                        help='decisões individuais com escrita adiada (gravadas em lote pela thread de gravação)')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return 0
+
+    if args.check_plans:
+        report = run_plan_check(args.states, args.seed)
+        print_plan_report(report)
+        return 0 if report['ok'] else 1
+
+    if args.stress:
+        report = run_stress(args.concurrency, args.requests, args.seed, args.write_behind)
+        print_stress_report(report)
+        if args.output:
+            with open(args.output, 'w') as handle:
+                json.dump(report, handle, indent=2)
+        return 0 if report['consistent'] else 1
+
+    modes = ['test_client', 'http'] if args.mode == 'all' else [args.mode]
+    report = run_benchmark(args.states, args.decisions, args.requests, args.concurrency, modes, args.seed,
+                           args.write_behind)
+    if args.scaling:
+        worker_counts = [int(count) for count in args.scaling.split(',')]
+        report['scaling'] = run_scaling(
+            worker_counts, args.threads, args.states, args.decisions, args.requests, args.seed
+        )
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f'\nResultado salvo em {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
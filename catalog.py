@@ -0,0 +1,142 @@
+"""
+Catálogo de Decisões em memória - BrasilSim
+Guarda as decisões do banco com as opções já decodificadas, para sortear
+uma decisão em O(1) sem consultar a tabela a cada turno.
+"""
+import logging
+import random
+import time
+from threading import Lock, RLock
+from .decision import Decision
+from .engine import compile_effects
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogDecision:
+    """Cópia somente leitura de uma decisão, com a mesma interface usada nas rotas"""
+    __slots__ = ('id', 'title', 'description', 'options', 'category', 'deltas', 'encoded')
+
+    def __init__(self, decision):
+        self.id = decision.id
+        self.title = decision.title
+        self.description = decision.description
+        self.options = decision.options
+        self.category = decision.category
+        # Efeitos de cada opção já compilados (ver engine.compile_effects)
+        self.deltas = compile_effects(self.options)
+        # JSON de to_dict(), preenchido na primeira resposta que usar a decisão
+        self.encoded = None
+
+    def to_dict(self):
+        """Converte a decisão para dicionário"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'options': self.options,
+            'category': self.category
+        }
+
+
+class DecisionCatalog:
+    """
+    Catálogo de decisões do processo. É carregado na primeira consulta e
+    atualizado pelas rotas que alteram a tabela de decisões. Com `max_age`
+    (segundos), é recarregado periodicamente para enxergar alterações feitas
+    por outros processos. `generation` muda a cada alteração do conteúdo.
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self.generation = 0
+        self._lock = RLock()
+        self._load_lock = Lock()
+        self._by_id = {}
+        self._pool = []
+        self._loaded = False
+        self._loaded_at = 0.0
+
+    def load(self):
+        """Carrega todas as decisões do banco (requer contexto da aplicação)"""
+        entries = []
+        for decision in Decision.query.all():
+            try:
+                entries.append(CatalogDecision(decision))
+            except ValueError as error:
+                # Gravada antes da validação dos efeitos: fica fora do sorteio
+                # em vez de derrubar todas as rotas que usam o catálogo
+                logger.warning('Decisão %s ignorada: %s', decision.id, error)
+        with self._lock:
+            self._by_id = {entry.id: entry for entry in entries}
+            self._pool = entries
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+            self.generation += 1
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self.load()
+        elif self.max_age is not None and time.monotonic() - self._loaded_at > self.max_age:
+            # Só uma thread recarrega; as demais seguem com o catálogo atual
+            if self._load_lock.acquire(blocking=False):
+                try:
+                    self.load()
+                finally:
+                    self._load_lock.release()
+
+    def add(self, decision):
+        """Adiciona (ou substitui) uma decisão recém gravada"""
+        with self._lock:
+            if not self._loaded:
+                return
+            entry = CatalogDecision(decision)
+            self._by_id[entry.id] = entry
+            self._pool = list(self._by_id.values())
+            self.generation += 1
+
+    def remove(self, decision_id):
+        """Remove uma decisão apagada"""
+        with self._lock:
+            if self._by_id.pop(decision_id, None) is not None:
+                self._pool = list(self._by_id.values())
+                self.generation += 1
+
+    def clear(self):
+        """Esvazia o catálogo (ex.: após apagar todas as decisões)"""
+        with self._lock:
+            self._by_id = {}
+            self._pool = []
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+            self.generation += 1
+
+    def invalidate(self):
+        """Força um recarregamento na próxima consulta"""
+        with self._lock:
+            self._loaded = False
+
+    def get(self, decision_id):
+        """Retorna a decisão pelo id, ou None"""
+        self.ensure_loaded()
+        return self._by_id.get(decision_id)
+
+    def all(self):
+        """Todas as decisões do catálogo"""
+        self.ensure_loaded()
+        return list(self._pool)
+
+    def random(self):
+        """Sorteia uma decisão do catálogo, ou None se estiver vazio"""
+        self.ensure_loaded()
+        pool = self._pool
+        return random.choice(pool) if pool else None
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self._pool)
+
+
+decision_catalog = DecisionCatalog()
@@ -22,8 +22,12 @@ class Decision(db.Model):
     
     @property
     def options(self):
-        """Retorna as opções da decisão como lista"""
-        return json.loads(self.options_json)
+        """Retorna as opções da decisão como lista (decodificada uma vez por instância)"""
+        cached = self.__dict__.get('_options')
+        if cached is None or cached[0] is not self.options_json:
+            cached = (self.options_json, json.loads(self.options_json))
+            self._options = cached
+        return cached[1]
     
     def to_dict(self):
         """Converte a decisão para dicionário"""
@@ -38,14 +42,30 @@ class Decision(db.Model):
     @staticmethod
     def get_random_decision():
         """Retorna uma decisão aleatória do banco ou das decisões padrão"""
-        # Primeiro tenta pegar do banco
-        decisions = Decision.query.all()
-        if decisions:
-            return random.choice(decisions)
+        from .catalog import decision_catalog
+        
+        # Primeiro tenta pegar do catálogo carregado do banco
+        decision = decision_catalog.random()
+        if decision:
+            return decision
         
         # Se não houver no banco, retorna uma decisão padrão
         return Decision.get_default_decision()
     
+    @staticmethod
+    def create_decision(title, description, options, category='geral', decision_id=None):
+        """Cria e grava uma nova decisão (com o id informado, se houver)"""
+        decision = Decision(
+            title=title,
+            description=description,
+            options=options,
+            category=category
+        )
+        decision.id = decision_id
+        db.session.add(decision)
+        db.session.commit()
+        return decision
+    
     @staticmethod
     def get_default_decision():
         """Retorna uma decisão padrão para quando não há decisões no banco"""
@@ -0,0 +1,197 @@
+from datetime import datetime
+from sqlalchemy import func
+from . import db
+from .state import INDICATORS, INITIAL_INDICATOR_VALUE
+
+class DecisionEvent(db.Model):
+    """
+    Evento de Decisão - registro imutável de uma alteração nos indicadores.
+    Guarda a variação efetivamente aplicada (já com o corte em 0..100), de
+    modo que somar os eventos reconstrói os indicadores do estado.
+    """
+    __tablename__ = 'decision_events'
+    __table_args__ = (
+        db.Index('ix_decision_events_state_time', 'state_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    state_id = db.Column(db.Integer, db.ForeignKey('states.id', ondelete='CASCADE'), nullable=False)
+    # Sem decisão: ajuste manual feito pela administração
+    decision_id = db.Column(db.Integer, nullable=True)
+    option_index = db.Column(db.SmallInteger, nullable=True)
+
+    # Variação aplicada em cada indicador
+    d_economy = db.Column(db.SmallInteger, nullable=False, default=0)
+    d_education = db.Column(db.SmallInteger, nullable=False, default=0)
+    d_health = db.Column(db.SmallInteger, nullable=False, default=0)
+    d_security = db.Column(db.SmallInteger, nullable=False, default=0)
+    d_culture = db.Column(db.SmallInteger, nullable=False, default=0)
+    d_satisfaction = db.Column(db.SmallInteger, nullable=False, default=0)
+    d_corruption = db.Column(db.SmallInteger, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @property
+    def deltas(self):
+        """Retorna as variações como dicionário {indicador: variação}"""
+        return {indicator: getattr(self, f'd_{indicator}') for indicator in INDICATORS}
+
+    def to_dict(self):
+        """Converte o evento para dicionário"""
+        return {
+            'id': self.id,
+            'state_id': self.state_id,
+            'decision_id': self.decision_id,
+            'option_index': self.option_index,
+            'deltas': self.deltas,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    @staticmethod
+    def row(state_id, decision_id, option_index, before, after, created_at=None):
+        """
+        Monta a linha de um evento a partir dos indicadores antes e depois
+        da alteração (dicionários ou sequências na ordem de INDICATORS)
+        """
+        if isinstance(before, dict):
+            before = [before[indicator] for indicator in INDICATORS]
+        if isinstance(after, dict):
+            after = [after[indicator] for indicator in INDICATORS]
+
+        row = {
+            'state_id': state_id,
+            'decision_id': decision_id,
+            'option_index': option_index,
+            'created_at': created_at or datetime.utcnow()
+        }
+        for indicator, old, new in zip(INDICATORS, before, after):
+            row[f'd_{indicator}'] = new - old
+        return row
+
+    @staticmethod
+    def record(state_id, decision_id, option_index, before, after, created_at=None):
+        """Adiciona um evento à sessão atual (gravado no próximo commit)"""
+        event = DecisionEvent(**DecisionEvent.row(
+            state_id, decision_id, option_index, before, after, created_at
+        ))
+        db.session.add(event)
+        return event
+
+    @staticmethod
+    def record_many(rows):
+        """Grava vários eventos com um único INSERT em lote (executemany)"""
+        if rows:
+            db.session.execute(DecisionEvent.__table__.insert(), rows)
+
+    @staticmethod
+    def history(state_id, limit=None):
+        """
+        Eventos de um estado em ordem cronológica. Com `limit`, lê apenas os
+        últimos N pelo índice (state_id, created_at).
+        """
+        query = DecisionEvent.query.filter_by(state_id=state_id).order_by(
+            DecisionEvent.created_at.desc(), DecisionEvent.id.desc()
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return list(reversed(query.all()))
+
+    @staticmethod
+    def latest_deltas_query(state_id, limit):
+        """
+        SELECT das variações dos últimos `limit` eventos do estado, do mais
+        recente ao mais antigo: percorre o índice (state_id, created_at) de
+        trás para frente e para no limite, qualquer que seja o histórico
+        """
+        columns = [getattr(DecisionEvent, f'd_{indicator}') for indicator in INDICATORS]
+        return db.select(DecisionEvent.state_id, DecisionEvent.created_at, DecisionEvent.id, *columns).where(
+            DecisionEvent.state_id == state_id
+        ).order_by(DecisionEvent.created_at.desc(), DecisionEvent.id.desc()).limit(limit)
+
+    @staticmethod
+    def latest_deltas(state_id, limit):
+        """Variações dos últimos `limit` eventos do estado, em ordem cronológica"""
+        rows = db.session.execute(DecisionEvent.latest_deltas_query(state_id, limit)).all()
+        return [dict(zip(INDICATORS, row[3:])) for row in reversed(rows)]
+
+    @staticmethod
+    def recent_deltas_query(state_ids, limit):
+        """
+        SELECT de (state_id, created_at, id, variações...) dos últimos `limit`
+        eventos de cada estado. Parte da tabela de estados e, para cada um,
+        busca os ids pela subconsulta com LIMIT no índice (state_id,
+        created_at): o custo é de estados x limit, qualquer que seja o
+        histórico, e a consulta tem sempre a mesma forma (compilada uma vez)
+        """
+        from .state import State
+        states, events = State.__table__, DecisionEvent.__table__
+        latest = events.alias('latest')
+        latest_ids = db.select(latest.c.id).where(latest.c.state_id == states.c.id).order_by(
+            latest.c.created_at.desc(), latest.c.id.desc()
+        ).limit(limit).correlate(states)
+        columns = [events.c[f'd_{indicator}'] for indicator in INDICATORS]
+        return db.select(events.c.state_id, events.c.created_at, events.c.id, *columns).select_from(
+            states.join(events, events.c.id.in_(latest_ids))
+        ).where(states.c.id.in_(list(state_ids)))
+
+    @staticmethod
+    def recent_deltas(state_ids, limit):
+        """
+        Variações dos últimos `limit` eventos de cada estado, em ordem
+        cronológica, com uma única consulta: {state_id: [deltas, ...]}
+        """
+        result = {state_id: [] for state_id in state_ids}
+        rows = db.session.execute(DecisionEvent.recent_deltas_query(result, limit)).all()
+        # (state_id, created_at, id): em ordem cronológica por estado
+        for row in sorted(rows, key=lambda row: row[:3]):
+            result[row[0]].append(dict(zip(INDICATORS, row[3:])))
+        return result
+
+    @staticmethod
+    def scan_recent_deltas(state_ids, limit, connection):
+        """
+        Como recent_deltas, mas numerando todos os eventos dos estados em uma
+        só passada (ROW_NUMBER): o custo cresce com o histórico inteiro. Só
+        para o preenchimento único das migrações, que percorre todos os estados.
+        """
+        position = func.row_number().over(
+            partition_by=DecisionEvent.state_id,
+            order_by=(DecisionEvent.created_at.desc(), DecisionEvent.id.desc())
+        ).label('position')
+        columns = [getattr(DecisionEvent, f'd_{indicator}') for indicator in INDICATORS]
+        ranked = db.select(DecisionEvent.state_id, position, *columns).where(
+            DecisionEvent.state_id.in_(list(state_ids))
+        ).subquery()
+
+        rows = connection.execute(db.select(ranked).where(ranked.c.position <= limit).order_by(
+            ranked.c.state_id, ranked.c.position.desc()
+        )).all()
+
+        result = {state_id: [] for state_id in state_ids}
+        for row in rows:
+            result[row[0]].append(dict(zip(INDICATORS, row[2:])))
+        return result
+
+    @staticmethod
+    def replay(state_id, until=None):
+        """
+        Reconstrói os indicadores de um estado somando seus eventos aos
+        valores iniciais. Com `until`, retorna os indicadores naquele momento.
+        """
+        query = db.session.query(*[
+            func.coalesce(func.sum(getattr(DecisionEvent, f'd_{indicator}')), 0)
+            for indicator in INDICATORS
+        ]).filter(DecisionEvent.state_id == state_id)
+        if until is not None:
+            query = query.filter(DecisionEvent.created_at <= until)
+
+        sums = query.one()
+        return {
+            indicator: INITIAL_INDICATOR_VALUE + int(total)
+            for indicator, total in zip(INDICATORS, sums)
+        }
+
+    @staticmethod
+    def delete_for_state(state_id):
+        """Apaga os eventos de um estado (usado ao apagar o estado)"""
+        DecisionEvent.query.filter_by(state_id=state_id).delete()
@@ -0,0 +1,135 @@
+"""
+Motor de Simulação vetorizado - BrasilSim
+Mantém os sete indicadores de vários estados em uma única matriz
+(n_estados x 7) e aplica lotes de efeitos com uma soma e um corte em 0..100,
+com o mesmo resultado de State.apply_decision_effects.
+"""
+import numpy as np
+from . import db
+from .state import State, INDICATORS, MIN_INDICATOR_VALUE as MIN_VALUE, MAX_INDICATOR_VALUE as MAX_VALUE
+
+INDICATOR_INDEX = {name: i for i, name in enumerate(INDICATORS)}
+
+
+def effects_vector(effects):
+    """
+    Converte um dicionário de efeitos em um vetor alinhado a INDICATORS.
+    Levanta ValueError para indicadores desconhecidos ou variações que não
+    sejam inteiras (nada é descartado ou arredondado em silêncio).
+    """
+    vector = np.zeros(len(INDICATORS), dtype=np.int64)
+    for indicator, change in effects.items():
+        index = INDICATOR_INDEX.get(indicator)
+        if index is None:
+            raise ValueError(f'Indicador desconhecido nos efeitos: {indicator}')
+        if isinstance(change, bool) or not isinstance(change, int):
+            raise ValueError(f'O efeito em {indicator} deve ser um número inteiro')
+        vector[index] += change
+    return vector
+
+
+def compile_effects(options):
+    """
+    Vetores de efeito de cada opção de uma decisão, como tuplas de inteiros
+    alinhadas a INDICATORS: aplicar uma escolha vira uma soma posição a
+    posição, sem percorrer dicionários de efeitos. Efeitos inválidos
+    levantam ValueError (ver effects_vector).
+    """
+    return tuple(tuple(effects_vector(option.get('effects', {})).tolist()) for option in options)
+
+
+def occurrence_rank(rows):
+    """
+    Para cada posição, quantas vezes a mesma linha já apareceu antes dela.
+    Ex.: [4, 7, 4, 4] -> [0, 0, 1, 2]
+    """
+    rows = np.asarray(rows)
+    if rows.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.argsort(rows, kind='stable')
+    sorted_rows = rows[order]
+    positions = np.arange(rows.size)
+    starts = np.empty(rows.size, dtype=bool)
+    starts[0] = True
+    starts[1:] = sorted_rows[1:] != sorted_rows[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    rank = np.empty(rows.size, dtype=np.int64)
+    rank[order] = positions - group_start
+    return rank
+
+
+class IndicatorMatrix:
+    """Indicadores de um conjunto de estados, uma linha por estado"""
+
+    def __init__(self, state_ids, values):
+        self.state_ids = np.asarray(state_ids, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.int64).reshape(len(self.state_ids), len(INDICATORS))
+        self._row_of = {int(state_id): row for row, state_id in enumerate(self.state_ids)}
+        # Versão de cada estado no momento da leitura (preenchida por load)
+        self.versions = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Monta a matriz a partir de tuplas (id, economy, ..., corruption)"""
+        rows = list(rows)
+        return cls(
+            [row[0] for row in rows],
+            [row[1:1 + len(INDICATORS)] for row in rows]
+        )
+
+    @classmethod
+    def load(cls, state_ids=None):
+        """Carrega do banco todos os estados (ou apenas `state_ids`), com suas versões"""
+        query = db.session.query(State.id, *[getattr(State, name) for name in INDICATORS], State.version)
+        if state_ids is not None:
+            query = query.filter(State.id.in_(list(state_ids)))
+        rows = query.order_by(State.id).all()
+        matrix = cls.from_rows(rows)
+        matrix.versions = {row[0]: row[-1] for row in rows}
+        return matrix
+
+    def __len__(self):
+        return len(self.state_ids)
+
+    def __contains__(self, state_id):
+        return state_id in self._row_of
+
+    def row_of(self, state_id):
+        return self._row_of[state_id]
+
+    def rows_of(self, state_ids):
+        return np.fromiter((self._row_of[state_id] for state_id in state_ids), dtype=np.int64)
+
+    def indicators(self, state_id):
+        """Retorna {indicador: valor} de um estado"""
+        return dict(zip(INDICATORS, self.values[self._row_of[state_id]].tolist()))
+
+    def apply(self, rows, deltas):
+        """
+        Aplica deltas (n_itens x 7) às linhas indicadas, em ordem.
+
+        Itens para linhas diferentes são somados e cortados de uma vez só;
+        quando a mesma linha aparece várias vezes, as ocorrências são
+        aplicadas em rodadas sucessivas, pois cortar a cada passo não é o
+        mesmo que cortar a soma. Retorna os indicadores resultantes após
+        cada item (n_itens x 7).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        deltas = np.asarray(deltas, dtype=np.int64).reshape(rows.size, len(INDICATORS))
+        after = np.empty_like(deltas)
+        if rows.size == 0:
+            return after
+
+        rank = occurrence_rank(rows)
+        for round_number in range(int(rank.max()) + 1):
+            items = np.flatnonzero(rank == round_number)
+            targets = rows[items]
+            updated = np.clip(self.values[targets] + deltas[items], MIN_VALUE, MAX_VALUE)
+            self.values[targets] = updated
+            after[items] = updated
+        return after
+
+    def general_totals(self):
+        """Total usado no ranking geral, para todas as linhas"""
+        signs = np.array([1, 1, 1, 1, 1, 1, -1], dtype=np.int64)
+        return self.values @ signs
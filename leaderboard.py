@@ -0,0 +1,291 @@
+"""
+Índice de Rankings em memória - BrasilSim
+Mantém uma estrutura ordenada por indicador (e pela pontuação geral) para
+responder consultas de top-N sem varrer nem ordenar a tabela de estados.
+"""
+from bisect import bisect_left, insort
+from threading import Lock, RLock
+import time
+from . import db
+from .state import State, INDICATORS
+from .engine import IndicatorMatrix
+
+# Categoria -> (coluna do indicador, maior é melhor)
+INDICATOR_CATEGORIES = {
+    'economia': ('economy', True),
+    'educacao': ('education', True),
+    'saude': ('health', True),
+    'seguranca': ('security', True),
+    'cultura': ('culture', True),
+    'satisfacao': ('satisfaction', True),
+    'menos_corrupto': ('corruption', False),
+}
+
+CATEGORIES = list(INDICATOR_CATEGORIES) + ['geral']
+
+# Categoria -> pontuação derivada guardada no estado (maior é melhor)
+DERIVED_CATEGORIES = {
+    'equilibrio': 'balance_score',
+    'crescimento': 'growth_score',
+}
+
+RANKED_CATEGORIES = CATEGORIES + list(DERIVED_CATEGORIES)
+
+# A matriz do motor de simulação segue a mesma ordem de colunas
+assert [column for column, _ in INDICATOR_CATEGORIES.values()] == list(INDICATORS)
+
+
+def general_total(values):
+    """Soma usada no ranking geral (a pontuação exibida é esse total / 6)"""
+    return (values['economy'] + values['education'] + values['health'] + values['security']
+            + values['culture'] + values['satisfaction'] - values['corruption'])
+
+
+def category_score(category, values):
+    """Retorna a pontuação exibida de uma categoria a partir dos indicadores"""
+    if category == 'geral':
+        return round(general_total(values) / 6, 1)
+    if category in DERIVED_CATEGORIES:
+        return values[DERIVED_CATEGORIES[category]]
+    column, _ = INDICATOR_CATEGORIES[category]
+    return values[column]
+
+
+class SortedKeyList:
+    """
+    Lista ordenada em blocos: a busca é O(log n) e inserções/remoções
+    movem no máximo um bloco de tamanho fixo, não a lista inteira.
+    """
+    LOAD = 512
+
+    def __init__(self, items=()):
+        items = sorted(items)
+        self._blocks = [items[i:i + self.LOAD] for i in range(0, len(items), self.LOAD)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(items)
+
+    def __len__(self):
+        return self._len
+
+    def add(self, item):
+        if not self._blocks:
+            self._blocks.append([item])
+            self._maxes.append(item)
+        else:
+            pos = bisect_left(self._maxes, item)
+            if pos == len(self._maxes):
+                pos -= 1
+            block = self._blocks[pos]
+            insort(block, item)
+            self._maxes[pos] = block[-1]
+            if len(block) > 2 * self.LOAD:
+                self._blocks[pos:pos + 1] = [block[:self.LOAD], block[self.LOAD:]]
+                self._maxes[pos:pos + 1] = [block[self.LOAD - 1], block[-1]]
+        self._len += 1
+
+    def remove(self, item):
+        pos = bisect_left(self._maxes, item)
+        if pos == len(self._maxes):
+            raise ValueError(item)
+        block = self._blocks[pos]
+        index = bisect_left(block, item)
+        if index == len(block) or block[index] != item:
+            raise ValueError(item)
+        del block[index]
+        if block:
+            self._maxes[pos] = block[-1]
+        else:
+            del self._blocks[pos]
+            del self._maxes[pos]
+        self._len -= 1
+
+    def index(self, item):
+        """Posição (a partir de 0) de um item presente na lista"""
+        pos = bisect_left(self._maxes, item)
+        if pos == len(self._maxes):
+            raise ValueError(item)
+        block = self._blocks[pos]
+        index = bisect_left(block, item)
+        if index == len(block) or block[index] != item:
+            raise ValueError(item)
+        return sum(len(previous) for previous in self._blocks[:pos]) + index
+
+    def head(self, limit):
+        """Retorna os primeiros `limit` itens em ordem"""
+        result = []
+        for block in self._blocks:
+            result.extend(block[:limit - len(result)])
+            if len(result) >= limit:
+                break
+        return result
+
+
+class Leaderboard:
+    """
+    Índice de rankings. Cada categoria guarda chaves (ordem, id) já ordenadas,
+    de forma que o desempate por id reproduz a ordem estável de `sorted()`
+    sobre `State.query.all()`.
+
+    O índice vive no processo: quem altera indicadores deve chamar `update`
+    (ou `discard`) depois do commit. Com vários processos gravando no mesmo
+    banco, `max_age` (segundos) faz o índice ser reconstruído periodicamente
+    para enxergar as escritas dos outros processos.
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self._lock = RLock()
+        self._build_lock = Lock()
+        self._lists = {}
+        self._keys = {}
+        self._values = {}
+        self._built = False
+        self._built_at = 0.0
+
+    @staticmethod
+    def _sort_keys(state_id, values):
+        keys = {}
+        for category, (column, higher_is_better) in INDICATOR_CATEGORIES.items():
+            value = values[column]
+            keys[category] = (-value if higher_is_better else value, state_id)
+        keys['geral'] = (-general_total(values), state_id)
+        for category, column in DERIVED_CATEGORIES.items():
+            keys[category] = (-values[column], state_id)
+        return keys
+
+    @staticmethod
+    def _values_of(state):
+        values = state.get_indicators()
+        for column in DERIVED_CATEGORIES.values():
+            values[column] = getattr(state, column)
+        return values
+
+    def build(self):
+        """Reconstrói o índice a partir do banco (requer contexto da aplicação)"""
+        # Uma única leitura: indicadores (para a matriz) e pontuações derivadas
+        derived_columns = tuple(DERIVED_CATEGORIES.values())
+        rows = db.session.query(
+            State.id,
+            *[getattr(State, column) for column in INDICATORS + derived_columns]
+        ).order_by(State.id).all()
+        matrix = IndicatorMatrix.from_rows(rows)
+        derived = [tuple(row[1 + len(INDICATORS):]) for row in rows]
+        state_ids = matrix.state_ids.tolist()
+
+        # Chaves de ordenação calculadas por coluna inteira, sem laço por estado
+        category_keys = {}
+        for column_index, (category, (_, higher_is_better)) in enumerate(INDICATOR_CATEGORIES.items()):
+            column = matrix.values[:, column_index]
+            category_keys[category] = list(zip((-column if higher_is_better else column).tolist(), state_ids))
+        category_keys['geral'] = list(zip((-matrix.general_totals()).tolist(), state_ids))
+
+        for position, category in enumerate(DERIVED_CATEGORIES):
+            category_keys[category] = [(-scores[position], state_id) for scores, state_id in zip(derived, state_ids)]
+
+        keys = {
+            state_id: dict(zip(RANKED_CATEGORIES, state_keys))
+            for state_id, state_keys in zip(state_ids, zip(*(category_keys[category] for category in RANKED_CATEGORIES)))
+        }
+        values = {
+            state_id: dict(zip(INDICATORS + derived_columns, row + list(extra)))
+            for state_id, row, extra in zip(state_ids, matrix.values.tolist(), derived)
+        }
+
+        with self._lock:
+            self._lists = {category: SortedKeyList(category_keys[category]) for category in RANKED_CATEGORIES}
+            self._keys = keys
+            self._values = values
+            self._built = True
+            self._built_at = time.monotonic()
+
+    def ensure_built(self):
+        if not self._built:
+            with self._build_lock:
+                if not self._built:
+                    self.build()
+        elif self.max_age is not None and time.monotonic() - self._built_at > self.max_age:
+            # Só uma thread reconstrói; as demais seguem com o índice atual
+            if self._build_lock.acquire(blocking=False):
+                try:
+                    self.build()
+                finally:
+                    self._build_lock.release()
+
+    def update(self, state):
+        """Insere ou reposiciona um estado após alteração dos indicadores"""
+        self.update_values(state.id, self._values_of(state))
+
+    def update_values(self, state_id, values):
+        """
+        Como `update`, recebendo os valores já lidos ({coluna: valor}),
+        incluindo as pontuações derivadas
+        """
+        with self._lock:
+            if not self._built:
+                return
+            self._discard(state_id)
+            keys = self._sort_keys(state_id, values)
+            for category, key in keys.items():
+                self._lists[category].add(key)
+            self._keys[state_id] = keys
+            self._values[state_id] = values
+
+    def discard(self, state_id):
+        """Remove um estado do índice"""
+        with self._lock:
+            if self._built:
+                self._discard(state_id)
+
+    def _discard(self, state_id):
+        old_keys = self._keys.pop(state_id, None)
+        self._values.pop(state_id, None)
+        if old_keys:
+            for category, key in old_keys.items():
+                self._lists[category].remove(key)
+
+    def clear(self):
+        """Esvazia o índice (ex.: após apagar todos os estados)"""
+        with self._lock:
+            self._lists = {category: SortedKeyList() for category in RANKED_CATEGORIES}
+            self._keys = {}
+            self._values = {}
+            self._built = True
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """Força uma reconstrução na próxima consulta"""
+        with self._lock:
+            self._built = False
+
+    def __len__(self):
+        self.ensure_built()
+        return len(self._keys)
+
+    def top(self, category, limit=10):
+        """Retorna [(state_id, score)] dos `limit` primeiros da categoria"""
+        self.ensure_built()
+        with self._lock:
+            entries = self._lists[category].head(limit)
+            return [
+                (key[-1], category_score(category, self._values[key[-1]]))
+                for key in entries
+            ]
+
+    def standing(self, state_id):
+        """
+        Valores do estado no índice e sua posição (a partir de 1) em cada
+        categoria, ou None se o estado não estiver no índice
+        """
+        self.ensure_built()
+        with self._lock:
+            values = self._values.get(state_id)
+            if values is None:
+                return None
+            positions = {
+                category: self._lists[category].index(key) + 1
+                for category, key in self._keys[state_id].items()
+            }
+            return dict(values), positions
+
+
+leaderboard = Leaderboard()
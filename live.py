@@ -0,0 +1,495 @@
+"""
+Rankings ao vivo - BrasilSim
+Envia por Server-Sent Events (GET /api/rankings/live?state_id=N) as
+mudanças nos top 10 de cada ranking (estado que entra, sai, muda de posição
+ou só de pontuação) e, para quem informa state_id, as mudanças do próprio
+estado. A conexão começa com um evento "snapshot" com os rankings atuais.
+
+As rotas de escrita só avisam `live_feed` de quais estados mudaram. Um
+servidor asyncio, em uma thread do processo e em outra porta, junta os
+avisos a cada intervalo, calcula as diferenças uma vez a partir do índice de
+rankings e manda o mesmo evento já codificado para todos os clientes. Uma
+conexão parada custa uma corrotina e uma fila (e não uma thread do
+Gunicorn), então um processo mantém milhares delas. Clientes que não dão
+conta dos eventos são desconectados e, ao reconectar, recebem outro retrato.
+
+Com vários workers, cada um abre o servidor na mesma porta (SO_REUSEPORT) e
+refaz as comparações a cada BRASILSIM_INDEX_MAX_AGE, para enxergar as
+escritas dos outros processos.
+
+Configuração por variáveis de ambiente:
+    BRASILSIM_LIVE_BIND         endereço do servidor (padrão 0.0.0.0:5002; vazio ou 0 desliga)
+    BRASILSIM_LIVE_INTERVAL_MS  intervalo entre lotes de eventos (padrão 250)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+from src.models import db
+from src.models.state import State, INDICATORS
+from src.models.leaderboard import leaderboard
+from src.routes.rankings import RANKING_TYPES
+from src.routes.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+LIVE_PATH = '/api/rankings/live'
+
+DEFAULT_BIND = '0.0.0.0:5002'
+DEFAULT_INTERVAL_MS = 250.0
+
+# Tamanho dos rankings acompanhados
+TOP_SIZE = 10
+
+# Comentário enviado a conexões paradas, para proxies não as fecharem
+HEARTBEAT_SECONDS = 15
+
+# Eventos na fila de um cliente antes de ele ser desconectado
+MAX_QUEUED_EVENTS = 64
+
+# Tempo de reconexão sugerido ao navegador (EventSource)
+RETRY_MS = 3000
+
+# Espera pelo cabeçalho da requisição
+REQUEST_TIMEOUT = 10
+
+CORS_HEADERS = (
+    b'Access-Control-Allow-Origin: *\r\n'
+    b'Access-Control-Allow-Headers: Last-Event-ID, Cache-Control\r\n'
+)
+
+
+class LiveFeed:
+    """
+    Estados alterados desde o último lote de eventos, avisados pelas rotas de
+    escrita. Só guarda os avisos enquanto algum LiveServer do processo os
+    consome: sem servidor (BRASILSIM_LIVE_BIND desligado, shards, testes), o
+    conjunto cresceria a cada escrita sem nunca ser esvaziado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = set()
+        self._everything = False
+        self._servers = 0
+
+    @property
+    def active(self):
+        return self._servers > 0
+
+    def attach(self):
+        """Um servidor passou a consumir os avisos (ver LiveServer.start)"""
+        with self._lock:
+            self._servers += 1
+
+    def detach(self):
+        with self._lock:
+            self._servers -= 1
+            if not self._servers:
+                self._changed = set()
+                self._everything = False
+
+    def changed(self, *state_ids):
+        if not self.active:
+            return
+        with self._lock:
+            self._changed.update(state_ids)
+
+    def changed_all(self):
+        """Muitos estados mudaram de uma vez (importação, limpeza)"""
+        if not self.active:
+            return
+        with self._lock:
+            self._everything = True
+
+    def drain(self):
+        """(estados alterados, se tudo mudou) desde a última chamada"""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            everything, self._everything = self._everything, False
+        return changed, everything
+
+
+live_feed = LiveFeed()
+
+
+def top_rankings():
+    """{tipo: [(state_id, pontuação)]} dos top 10, com os tipos de GET /rankings"""
+    return {
+        ranking_type: leaderboard.top(category, TOP_SIZE)
+        for ranking_type, category in RANKING_TYPES.items()
+    }
+
+
+def ranking_changes(previous, current):
+    """Diferenças entre dois resultados de top_rankings, por estado"""
+    changes = []
+    for ranking_type, entries in current.items():
+        before = {state_id: (position, value)
+                  for position, (state_id, value) in enumerate(previous.get(ranking_type, ()), 1)}
+        after = {state_id: (position, value) for position, (state_id, value) in enumerate(entries, 1)}
+        for state_id, (position, value) in after.items():
+            old = before.get(state_id)
+            change = {'ranking': ranking_type, 'state_id': state_id, 'position': position, 'value': value}
+            if old is None:
+                change['change'] = 'enter'
+            elif old[0] != position:
+                change['change'] = 'move'
+                change['from'] = old[0]
+            elif old[1] != value:
+                change['change'] = 'value'
+            else:
+                continue
+            changes.append(change)
+        for state_id, (position, _) in before.items():
+            if state_id not in after:
+                changes.append({'ranking': ranking_type, 'state_id': state_id, 'change': 'leave', 'from': position})
+    return changes
+
+
+def state_payload(state_id):
+    """Indicadores, pontuações e posições de um estado no índice de rankings"""
+    standing = leaderboard.standing(state_id)
+    if standing is None:
+        return {'state_id': state_id, 'deleted': True}
+    values, positions = standing
+    return {
+        'state_id': state_id,
+        'indicators': {name: values[name] for name in INDICATORS},
+        'balance_score': values['balance_score'],
+        'growth_score': values['growth_score'],
+        'positions': {ranking_type: positions[category] for ranking_type, category in RANKING_TYPES.items()},
+    }
+
+
+def sse_event(event, data, event_id):
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event.encode(), dumps(data))
+
+
+class Subscriber:
+    """Uma conexão aberta: estado acompanhado, fila de eventos e a tarefa que a atende"""
+    __slots__ = ('state_id', 'queue', 'task', 'dropped')
+
+    def __init__(self, state_id, task):
+        self.state_id = state_id
+        self.queue = asyncio.Queue(MAX_QUEUED_EVENTS)
+        self.task = task
+        self.dropped = False
+
+    def drop(self):
+        """Encerra a conexão (cliente lento ou que já desconectou)"""
+        self.dropped = True
+        self.task.cancel()
+
+
+class LiveServer:
+    """
+    Servidor SSE em asyncio, em uma thread própria. As consultas ao índice
+    de rankings e ao banco rodam no pool de threads do loop, com contexto da
+    aplicação; a lista de clientes e o último top 10 enviado só mudam na
+    thread do loop.
+    """
+
+    def __init__(self, app, host, port, interval=DEFAULT_INTERVAL_MS / 1000, reuse_port=False):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.reuse_port = reuse_port
+        self.subscribers = set()
+        self.events_sent = 0
+        self._by_state = {}
+        self._rankings = None
+        self._snapshot_rankings = (None, None)
+        self._last_states = {}
+        self._labels = {}
+        self._event_id = 0
+        self._last_full_check = time.monotonic()
+        self._loop = None
+        self._server = None
+        self._error = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='brasilsim-live', daemon=True)
+
+    def start(self):
+        """Abre a porta e começa a atender; levanta OSError se a porta não abrir"""
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        live_feed.attach()
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            live_feed.detach()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(asyncio.start_server(
+                self._handle, self.host, self.port, reuse_port=self.reuse_port or None, backlog=1024
+            ))
+        except OSError as error:
+            self._error = error
+            self._ready.set()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._loop.create_task(self._publish_forever())
+        self._ready.set()
+        self._loop.run_forever()
+
+        # Parado por stop(): fecha a porta e encerra as conexões e o lote periódico
+        self._server.close()
+        tasks = asyncio.all_tasks(self._loop)
+        for task in tasks:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self._loop.close()
+
+    # Consultas (pool de threads)
+
+    def _labels_for(self, state_ids):
+        """{state_id: (nome, região, governo)}, lendo do banco só os que faltam"""
+        missing = [state_id for state_id in state_ids if state_id not in self._labels]
+        if missing:
+            rows = db.session.query(State.id, State.name, State.region, State.government_type).filter(
+                State.id.in_(missing)
+            ).all()
+            for state_id, *label in rows:
+                self._labels[state_id] = tuple(label)
+        return {state_id: self._labels.get(state_id) for state_id in state_ids}
+
+    def _label(self, entry, labels):
+        label = labels.get(entry['state_id'])
+        if label is not None:
+            entry['name'], entry['region'], entry['government'] = label
+        return entry
+
+    def _compute_snapshot(self, rankings, state_id):
+        with self.app.app_context():
+            if rankings is None:
+                rankings = top_rankings()
+            labels = self._labels_for({state_id for entries in rankings.values() for state_id, _ in entries})
+            entries = {
+                ranking_type: [
+                    self._label({'position': position, 'state_id': entry_id, 'value': value}, labels)
+                    for position, (entry_id, value) in enumerate(ranking, 1)
+                ]
+                for ranking_type, ranking in rankings.items()
+            }
+            state = state_payload(state_id) if state_id is not None else None
+            return rankings, entries, state
+
+    def _compute_changes(self, previous, state_ids):
+        with self.app.app_context():
+            current = top_rankings()
+            changes = ranking_changes(previous, current)
+            labels = self._labels_for({change['state_id'] for change in changes if change['change'] == 'enter'})
+            for change in changes:
+                if change['change'] == 'enter':
+                    self._label(change, labels)
+            states = {state_id: state_payload(state_id) for state_id in state_ids}
+            return current, changes, states
+
+    # Loop de eventos
+
+    async def _publish_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            changed, everything = live_feed.drain()
+            if not self.subscribers:
+                # Sem clientes, nada a comparar: o próximo recebe um retrato novo
+                self._rankings = None
+                self._last_states.clear()
+                continue
+
+            # Com vários workers, o índice é reconstruído a cada max_age: compara tudo
+            full = everything or (leaderboard.max_age is not None
+                                  and time.monotonic() - self._last_full_check >= leaderboard.max_age)
+            if not changed and not full:
+                continue
+            if full:
+                self._last_full_check = time.monotonic()
+                if everything:
+                    self._labels.clear()
+            watched = set(self._by_state) if full else changed & set(self._by_state)
+
+            previous = self._rankings
+            try:
+                current, changes, states = await self._loop.run_in_executor(
+                    None, self._compute_changes, previous or {}, watched
+                )
+            except Exception:
+                logger.exception('Falha ao calcular os eventos ao vivo')
+                continue
+            if previous is None:
+                # O retrato dos clientes já tem esse top 10: nada a mandar como diferença
+                changes = []
+            self._rankings = current
+            self._publish(changes, states)
+
+    def _publish(self, changes, states):
+        if changes:
+            data = self._next_event('rankings', {'changes': changes})
+            for subscriber in list(self.subscribers):
+                self._send(subscriber, data)
+        for state_id, payload in states.items():
+            if self._last_states.get(state_id) == payload:
+                continue
+            self._last_states[state_id] = payload
+            data = self._next_event('state', payload)
+            for subscriber in list(self._by_state.get(state_id, ())):
+                self._send(subscriber, data)
+
+    def _next_event(self, event, data):
+        self._event_id += 1
+        return sse_event(event, data, self._event_id)
+
+    def _send(self, subscriber, data):
+        try:
+            subscriber.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            subscriber.drop()
+
+    async def _snapshot(self, state_id):
+        """
+        Retrato a partir do último top 10 comparado, para que as próximas
+        diferenças partam dele. A parte dos rankings é reaproveitada entre
+        as conexões enquanto o top 10 não muda.
+        """
+        while True:
+            rankings = self._rankings
+            cached_rankings, entries = self._snapshot_rankings
+            if rankings is None or cached_rankings is not rankings or state_id is not None:
+                rankings, entries, state = await self._loop.run_in_executor(
+                    None, self._compute_snapshot, rankings, state_id
+                )
+            else:
+                state = None
+            if self._rankings is None:
+                self._rankings = rankings
+            # Um lote de diferenças foi publicado durante o cálculo: refaz
+            if self._rankings is rankings:
+                self._snapshot_rankings = (rankings, entries)
+                return {'rankings': entries, 'state': state}
+
+    async def _watch_disconnect(self, reader, subscriber):
+        """Nota o fechamento da conexão sem esperar pelo próximo envio"""
+        try:
+            # O cliente não manda mais nada depois do cabeçalho
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        subscriber.drop()
+
+    def _subscribe(self, subscriber):
+        self.subscribers.add(subscriber)
+        if subscriber.state_id is not None:
+            self._by_state.setdefault(subscriber.state_id, set()).add(subscriber)
+
+    def _unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        watchers = self._by_state.get(subscriber.state_id)
+        if watchers is not None:
+            watchers.discard(subscriber)
+            if not watchers:
+                del self._by_state[subscriber.state_id]
+                self._last_states.pop(subscriber.state_id, None)
+
+    async def _handle(self, reader, writer):
+        subscriber = watcher = None
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT)
+                method, target, _ = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                return
+            url = urlsplit(target)
+            if method == 'OPTIONS':
+                writer.write(b'HTTP/1.1 204 No Content\r\n' + CORS_HEADERS + b'Content-Length: 0\r\n\r\n')
+                return
+            if url.path != LIVE_PATH:
+                await self._reply_error(writer, b'404 Not Found', 'Rota não encontrada.')
+                return
+            if method != 'GET':
+                await self._reply_error(writer, b'405 Method Not Allowed', 'Use GET.')
+                return
+            state_id = parse_qs(url.query).get('state_id', [None])[0]
+            if state_id is not None:
+                if not state_id.isdigit():
+                    await self._reply_error(writer, b'400 Bad Request', 'Parâmetro state_id inválido.')
+                    return
+                state_id = int(state_id)
+
+            subscriber = Subscriber(state_id, asyncio.current_task())
+            snapshot = await self._snapshot(state_id)
+            self._subscribe(subscriber)
+            watcher = self._loop.create_task(self._watch_disconnect(reader, subscriber))
+            writer.write(
+                b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: text/event-stream; charset=utf-8\r\n'
+                b'Cache-Control: no-cache\r\n'
+                b'X-Accel-Buffering: no\r\n'
+                b'Connection: keep-alive\r\n' + CORS_HEADERS + b'\r\n'
+                + b'retry: %d\n\n' % RETRY_MS + self._next_event('snapshot', snapshot)
+            )
+            await writer.drain()
+
+            while True:
+                try:
+                    data = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    data = b': ping\n\n'
+                writer.write(data)
+                await writer.drain()
+                self.events_sent += 1
+        except asyncio.CancelledError:
+            # Conexão encerrada por Subscriber.drop; outros cancelamentos seguem adiante
+            if subscriber is None or not subscriber.dropped:
+                raise
+        except ConnectionError:
+            pass
+        except Exception:
+            logger.exception('Falha em uma conexão ao vivo')
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if subscriber is not None:
+                self._unsubscribe(subscriber)
+            writer.close()
+
+    async def _reply_error(self, writer, status, message):
+        body = dumps({'error': message})
+        writer.write(
+            b'HTTP/1.1 ' + status + b'\r\nContent-Type: application/json\r\n' + CORS_HEADERS
+            + b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(body) + body
+        )
+        await writer.drain()
+
+
+def live_bind(environ=os.environ):
+    """Endereço do servidor ao vivo, ou None se desligado"""
+    bind = environ.get('BRASILSIM_LIVE_BIND', DEFAULT_BIND).strip()
+    if bind.lower() in ('', '0', 'off', 'false', 'no'):
+        return None
+    return bind
+
+
+def start_live_server(app, environ=os.environ, reuse_port=False):
+    """
+    Inicia o servidor ao vivo no processo atual (um por worker, depois do
+    fork). Retorna None se BRASILSIM_LIVE_BIND estiver desligado.
+    """
+    bind = live_bind(environ)
+    if bind is None:
+        return None
+    host, _, port = bind.rpartition(':')
+    interval = float(environ.get('BRASILSIM_LIVE_INTERVAL_MS', DEFAULT_INTERVAL_MS)) / 1000
+    return LiveServer(app, host or '0.0.0.0', int(port), interval, reuse_port).start()
@@ -3,51 +3,81 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
-from src.models import db, State, Decision
+from src.models import db
+from src.models.sqlite_tuning import configure_sqlite
+from src.models.migrations import init_database
+from src.models.write_behind import write_behind
+from src.config import configure_database, configure_write_behind, configure_shard
 from src.routes.states import states_bp
+from src.routes.rankings import rankings_bp
+from src.routes.admin import admin_bp
+from src.routes.serialization import FastJSONProvider
+from src.routes.metrics import metrics_bp, init_metrics
+from src.routes.profiler import init_profiler
+from src.routes.live import start_live_server
+from src.assets import init_static_assets, DEFAULT_BUILD_DIR
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'brasilsim-secret-key-2024'
-
-# Habilita CORS para todas as rotas
-CORS(app)
-
-# Registra as rotas da API
-app.register_blueprint(states_bp, url_prefix='/api')
-
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Inicializa o banco de dados
-with app.app_context():
-    db.create_all()
-    # Cria decisões padrão se não existirem
-    if Decision.query.count() == 0:
-        Decision.create_default_decisions()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    """Serve arquivos estáticos e SPA"""
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+
+def create_app(environ=os.environ):
+    """
+    Monta a aplicação sem acessar o banco. O esquema e as decisões padrão
+    ficam com init_database (python -m src.manage init-db); o índice de
+    rankings, o catálogo de decisões e os arquivos estáticos são carregados
+    no primeiro uso.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'brasilsim-secret-key-2024'
+
+    # jsonify com orjson, quando instalado
+    app.json = FastJSONProvider(app)
+
+    # Habilita CORS para todas as rotas
+    CORS(app)
+
+    # Registra as rotas da API
+    app.register_blueprint(states_bp, url_prefix='/api')
+    app.register_blueprint(rankings_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api')
+
+    # Métricas (GET /metrics) e profiler por requisição (BRASILSIM_PROFILING)
+    app.register_blueprint(metrics_bp)
+    init_metrics(app)
+    init_profiler(app, environ)
+
+    # Configuração do banco de dados (DATABASE_URL e pool: ver config.py)
+    configure_database(app, environ)
+    db.init_app(app)
+    with app.app_context():
+        # SQLite em modo WAL: leituras não esperam pelas escritas
+        configure_sqlite(
+            db.engine,
+            busy_timeout_ms=app.config['SQLITE_BUSY_TIMEOUT_MS'],
+            synchronous=app.config['SQLITE_SYNCHRONOUS']
+        )
+
+    # Região atendida no modo em shards (BRASILSIM_SHARD: ver router.py)
+    configure_shard(app, environ)
+
+    # Escrita adiada das decisões (BRASILSIM_WRITE_BEHIND: ver config.py)
+    configure_write_behind(app, environ)
+    write_behind.init_app(app)
+
+    # Arquivos estáticos e SPA, em memória (ver assets.py)
+    init_static_assets(app, environ.get('BRASILSIM_ASSET_BUILD_DIR', DEFAULT_BUILD_DIR))
+    return app
+
+
+# Aplicação usada pelo servidor de produção (serve.py) e por servidores WSGI
+app = create_app()
 
 if __name__ == '__main__':
+    with app.app_context():
+        init_database()
     print("🇧🇷 BrasilSim - Simulador Político Brasileiro")
     print("🚀 Servidor iniciando em http://localhost:5001")
+    # O recarregador roda a aplicação em um processo filho: só ele abre a porta ao vivo
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_live_server(app)
     app.run(host='0.0.0.0', port=5001, debug=True)
-
@@ -0,0 +1,133 @@
+"""
+Comandos de manutenção - BrasilSim
+
+Uso:
+    python -m src.manage init-db
+    python -m src.manage startup-report [--requests 3] [--top 15] [--output inicio.json]
+
+init-db cria as tabelas, aplica as migrações pendentes e grava as decisões
+padrão (uma vez por implantação; importar a aplicação não acessa o banco).
+
+startup-report mede, em um processo Python novo, o tempo de importar a
+aplicação (com os módulos mais lentos, por python -X importtime) e a
+latência da primeira requisição de cada rota, que carrega os índices em
+memória, comparada com as seguintes.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Rotas medidas no relatório de inicialização, na ordem das requisições
+STARTUP_ROUTES = (
+    '/api/rankings',
+    '/api/states?limit=50',
+    '/api/states/1/current-decision',
+    '/',
+)
+
+# Executado no processo novo: tempos de importação, criação e requisições
+STARTUP_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import src.main
+imported = time.perf_counter() - started
+started = time.perf_counter()
+app = src.main.create_app()
+created = time.perf_counter() - started
+client = app.test_client()
+routes = {}
+for path in json.loads(sys.argv[1]):
+    latencies = []
+    for _ in range(int(sys.argv[2])):
+        started = time.perf_counter()
+        response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+        response.get_data()
+        response.close()
+        latencies.append(time.perf_counter() - started)
+    routes[path] = {'status': response.status_code, 'latencies': latencies}
+print(json.dumps({'import': imported, 'create_app': created, 'routes': routes}))
+'''
+
+
+def parse_importtime(stderr, top):
+    """Módulos mais lentos da saída de -X importtime: [(módulo, próprio, acumulado)] em segundos"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(own) / 1e6, int(cumulative) / 1e6))
+    return sorted(modules, key=lambda module: module[2], reverse=True)[:top]
+
+
+def startup_report(n_requests=3, top=15):
+    """Roda STARTUP_PROBE em um interpretador novo e monta o relatório"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_PROBE, json.dumps(STARTUP_ROUTES), str(n_requests)],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'Falha ao medir a inicialização:\n{result.stderr[-2000:]}')
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    routes = {}
+    for path, stats in probe['routes'].items():
+        latencies = stats['latencies']
+        routes[path] = {
+            'status': stats['status'],
+            'first_ms': round(latencies[0] * 1000, 2),
+            'next_ms': round(min(latencies[1:]) * 1000, 2) if len(latencies) > 1 else None,
+        }
+    return {
+        'import_ms': round(probe['import'] * 1000, 1),
+        'create_app_ms': round(probe['create_app'] * 1000, 1),
+        'routes': routes,
+        'slowest_imports': [
+            {'module': name, 'self_ms': round(own * 1000, 1), 'cumulative_ms': round(cumulative * 1000, 1)}
+            for name, own, cumulative in parse_importtime(result.stderr, top)
+        ],
+    }
+
+
+def print_startup_report(report):
+    print(f"BrasilSim inicialização - import src.main {report['import_ms']} ms, "
+          f"create_app {report['create_app_ms']} ms")
+    print(f"\n{'rota':<36}{'status':>7}{'1ª ms':>10}{'seguintes ms':>14}")
+    for path, stats in report['routes'].items():
+        following = stats['next_ms'] if stats['next_ms'] is not None else '-'
+        print(f"{path:<36}{stats['status']:>7}{stats['first_ms']:>10}{following:>14}")
+    print(f"\n{'módulo':<48}{'próprio ms':>12}{'acumulado ms':>14}")
+    for module in report['slowest_imports']:
+        print(f"{module['module']:<48}{module['self_ms']:>12}{module['cumulative_ms']:>14}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Comandos de manutenção do BrasilSim')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('init-db', help='cria e migra o banco e grava as decisões padrão')
+    report_parser = commands.add_parser('startup-report', help='tempo de importação e da primeira requisição')
+    report_parser.add_argument('--requests', type=int, default=3, help='requisições por rota')
+    report_parser.add_argument('--top', type=int, default=15, help='módulos mais lentos listados')
+    report_parser.add_argument('--output', help='arquivo JSON para salvar o resultado')
+    args = parser.parse_args(argv)
+
+    from src.main import app
+    from src.models.migrations import init_database
+    with app.app_context():
+        applied, seeded = init_database()
+    if args.command == 'init-db':
+        print(f"Migrações aplicadas: {', '.join(map(str, applied)) or 'nenhuma'}"
+              f"{' - decisões padrão criadas' if seeded else ''}")
+        return 0
+
+    report = startup_report(args.requests, args.top)
+    print_startup_report(report)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""
+Métricas - BrasilSim
+Instrumentação das rotas no formato texto do Prometheus (GET /metrics):
+latência por rota, quantidade e tempo de consultas SQL por requisição
+(eventos do engine do SQLAlchemy), tempo de serialização JSON e acertos dos
+caches. Os números são do processo: com vários workers do Gunicorn, cada
+coleta mostra os do worker que atendeu.
+"""
+import time
+from bisect import bisect_left
+from threading import Lock
+from flask import Blueprint, Response, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+metrics_bp = Blueprint('metrics', __name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Limites (segundos) dos histogramas de tempo
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Limites do histograma de consultas SQL por requisição
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador com rótulos"""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f'{self.name}{format_labels(self.labels, label_values)} {format_value(value)}'
+
+
+class Histogram:
+    """Histograma com rótulos e limites fixos, como o do Prometheus"""
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        # rótulos -> [contagem por faixa (+ a faixa acima do último limite), soma]
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            items = sorted((label_values, (list(counts), total)) for label_values, (counts, total)
+                           in self._series.items())
+        for label_values, (counts, total) in items:
+            cumulative = 0
+            for limit, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = format_labels(self.labels, label_values, [('le', format_value(limit))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = format_labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class MetricsRegistry:
+    """Métricas do processo e caches acompanhados (objetos com hits e misses)"""
+
+    def __init__(self):
+        self.metrics = []
+        self.caches = {}
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, buckets, labels=()):
+        metric = Histogram(name, documentation, buckets, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def register_cache(self, name, cache):
+        self.caches[name] = cache
+
+    def collect_caches(self):
+        caches = sorted(self.caches.items())
+        for kind, documentation in (('hits', 'Consultas atendidas pelo cache'),
+                                    ('misses', 'Consultas que não estavam no cache')):
+            yield f'# HELP brasilsim_cache_{kind}_total {documentation}'
+            yield f'# TYPE brasilsim_cache_{kind}_total counter'
+            for name, cache in caches:
+                yield f'brasilsim_cache_{kind}_total{{cache="{name}"}} {getattr(cache, kind)}'
+        yield '# HELP brasilsim_cache_hit_ratio Fração das consultas atendidas pelo cache'
+        yield '# TYPE brasilsim_cache_hit_ratio gauge'
+        for name, cache in caches:
+            total = cache.hits + cache.misses
+            yield f'brasilsim_cache_hit_ratio{{cache="{name}"}} {format_value(cache.hits / total if total else 0.0)}'
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.collect())
+        lines.extend(self.collect_caches())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    'brasilsim_request_duration_seconds', 'Duração das requisições, incluindo o envio em streaming',
+    LATENCY_BUCKETS, ('route', 'method', 'status'))
+request_queries = registry.histogram(
+    'brasilsim_request_sql_queries', 'Consultas SQL por requisição',
+    QUERY_COUNT_BUCKETS, ('route', 'method'))
+request_sql_duration = registry.histogram(
+    'brasilsim_request_sql_duration_seconds', 'Tempo em consultas SQL por requisição',
+    LATENCY_BUCKETS, ('route', 'method'))
+request_serialization = registry.histogram(
+    'brasilsim_request_serialization_seconds', 'Tempo codificando JSON por requisição',
+    LATENCY_BUCKETS, ('route', 'method'))
+sql_queries = registry.counter(
+    'brasilsim_sql_queries_total', 'Consultas SQL executadas pelo processo (dentro ou fora de requisições)')
+sql_duration = registry.counter(
+    'brasilsim_sql_duration_seconds_total', 'Tempo total em consultas SQL do processo')
+
+
+def register_cache(name, cache):
+    """Acompanha os acertos de um cache com atributos `hits` e `misses`"""
+    registry.register_cache(name, cache)
+
+
+class RequestStats:
+    """Números de uma requisição em andamento (guardado em g)"""
+    __slots__ = ('started', 'queries', 'sql_time', 'serialization_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialization_time = 0.0
+
+
+def current_stats():
+    return g.get('request_stats') if has_app_context() else None
+
+
+def add_serialization_time(seconds):
+    """Soma tempo de codificação JSON à requisição atual (se houver)"""
+    stats = current_stats()
+    if stats is not None:
+        stats.serialization_time += seconds
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    sql_queries.inc()
+    sql_duration.inc(amount=elapsed)
+    stats = current_stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_time += elapsed
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A consulta falhou: after_cursor_execute não será chamado
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def route_label():
+    """Regra da rota (ex.: /api/states/<int:state_id>), para não criar uma série por URL"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def init_metrics(app):
+    """Instala a coleta por requisição na aplicação"""
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        route, method, status = route_label(), request.method, response.status_code
+
+        def record():
+            request_duration.observe(time.perf_counter() - stats.started, route, method, status)
+            request_queries.observe(stats.queries, route, method)
+            request_sql_duration.observe(stats.sql_time, route, method)
+            request_serialization.observe(stats.serialization_time, route, method)
+
+        if response.is_streamed:
+            # O corpo ainda vai ser gerado: registra quando o servidor fecha a
+            # resposta, depois do último pedaço enviado (o teardown roda antes)
+            response.call_on_close(record)
+        else:
+            # Corpo pronto: registra já, sem depender de alguém fechar a resposta
+            record()
+        return response
+
+    return app
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas do processo no formato texto do Prometheus"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
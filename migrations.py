@@ -0,0 +1,144 @@
+"""
+Migrações do esquema - BrasilSim
+db.create_all() cria as tabelas que faltam, mas não altera as que já
+existem. As mudanças em tabelas existentes ficam aqui: cada migração tem um
+número, roda uma vez, em ordem, e fica registrada em schema_migrations. As
+migrações conferem o que já existe antes de alterar, então em um banco novo
+(criado por create_all já com o esquema atual) elas só são registradas.
+"""
+from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
+from . import db
+from .decision import Decision
+from .state import State, STATE_INDEXES, INDICATORS, GROWTH_WINDOW, balance_score, growth_score
+from .decision_event import DecisionEvent
+
+# Estados recalculados por vez ao preencher colunas novas
+BACKFILL_BATCH_SIZE = 1000
+
+MIGRATIONS = []
+
+schema_migrations = db.Table(
+    'schema_migrations', db.metadata,
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('name', db.String(200), nullable=False),
+    db.Column('applied_at', db.DateTime, nullable=False),
+)
+
+
+def migration(version, name):
+    """Registra uma migração (função que recebe a conexão)"""
+    def register(function):
+        MIGRATIONS.append((version, name, function))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return function
+    return register
+
+
+def column_names(connection, table_name):
+    return {column['name'] for column in inspect(connection).get_columns(table_name)}
+
+
+def add_column(connection, table, name, server_default=None):
+    """ALTER TABLE ... ADD COLUMN com o tipo do modelo; retorna False se a coluna já existia"""
+    if name in column_names(connection, table.name):
+        return False
+    column = table.c[name]
+    sql = f'ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(dialect=connection.dialect)}'
+    if server_default is not None:
+        sql += f' DEFAULT {server_default}'
+    if not column.nullable:
+        sql += ' NOT NULL'
+    connection.exec_driver_sql(sql)
+    return True
+
+
+@migration(1, 'pontuações, agenda de decisões e versão em states')
+def add_state_columns(connection):
+    table = State.__table__
+    added_scores = add_column(connection, table, 'balance_score', '100.0')
+    added_scores = add_column(connection, table, 'growth_score', '0') or added_scores
+    add_column(connection, table, 'decision_seed')
+    add_column(connection, table, 'decision_position', '0')
+    add_column(connection, table, 'decision_queue')
+    add_column(connection, table, 'version', '0')
+
+    # A agenda é criada na primeira consulta de cada estado; as pontuações são
+    # calculadas agora, a partir dos indicadores e do histórico
+    if added_scores:
+        backfill_scores(connection)
+
+
+def backfill_scores(connection):
+    columns = [getattr(State, indicator) for indicator in INDICATORS]
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            db.select(State.id, *columns).where(State.id > last_id).order_by(State.id).limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        recent = DecisionEvent.scan_recent_deltas([row[0] for row in rows], GROWTH_WINDOW, connection)
+        connection.execute(
+            State.__table__.update().where(State.__table__.c.id == db.bindparam('_id')),
+            [
+                {
+                    '_id': row[0],
+                    'balance_score': balance_score(dict(zip(INDICATORS, row[1:]))),
+                    'growth_score': growth_score(recent[row[0]]),
+                }
+                for row in rows
+            ]
+        )
+        last_id = rows[-1][0]
+
+
+@migration(2, 'índices das consultas frequentes em states')
+def add_state_indexes(connection):
+    # IF NOT EXISTS: a reflexão do SQLite não enxerga índices de expressão
+    for index in STATE_INDEXES:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+def applied_versions(connection):
+    return {row[0] for row in connection.execute(db.select(schema_migrations.c.version))}
+
+
+def migrate():
+    """
+    Aplica as migrações pendentes, cada uma em sua transação (requer contexto
+    da aplicação; chamar depois de db.create_all). Retorna os números aplicados.
+    """
+    schema_migrations.create(bind=db.engine, checkfirst=True)
+    with db.engine.connect() as connection:
+        done = applied_versions(connection)
+
+    applied = []
+    for version, name, function in MIGRATIONS:
+        if version in done:
+            continue
+        with db.engine.begin() as connection:
+            function(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.utcnow()
+            ))
+        applied.append(version)
+    return applied
+
+
+def init_database(default_decisions=True):
+    """
+    Cria as tabelas, aplica as migrações e grava as decisões padrão se não
+    houver nenhuma (a menos que `default_decisions` seja falso, como na
+    importação, que traz as próprias decisões). Roda uma vez por instalação
+    ou implantação (python -m src.manage init-db, ou o servidor antes de
+    iniciar os workers), nunca ao importar a aplicação.
+    """
+    db.create_all()
+    applied = migrate()
+    seeded = False
+    if default_decisions and db.session.query(Decision.id).first() is None:
+        Decision.create_default_decisions()
+        seeded = True
+    return applied, seeded
@@ -0,0 +1,120 @@
+"""
+Profiler por amostragem - BrasilSim
+Com BRASILSIM_PROFILING=1, uma requisição com o cabeçalho X-Profile: 1 é
+acompanhada por uma thread que anota a pilha da thread da requisição a cada
+intervalo (tempo de parede: inclui a espera pelo banco). Ao terminar, as
+pilhas vão para um arquivo no formato "folded" (uma pilha por linha, da raiz
+para a folha, separada por ';', e a quantidade de amostras), aceito por
+flamegraph.pl, speedscope e inferno. O nome do arquivo volta no cabeçalho
+X-Profile-File.
+
+Configuração por variáveis de ambiente:
+    BRASILSIM_PROFILING            habilita o cabeçalho (padrão 0)
+    BRASILSIM_PROFILE_DIR          pasta dos arquivos (padrão: <temp>/brasilsim-profiles)
+    BRASILSIM_PROFILE_INTERVAL_MS  intervalo entre amostras (padrão 5)
+"""
+import itertools
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+
+from src.config import env_flag
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_FILE_HEADER = 'X-Profile-File'
+
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'brasilsim-profiles')
+DEFAULT_INTERVAL_MS = 5.0
+
+# Número sequencial dos arquivos do processo
+_profile_numbers = itertools.count(1)
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f'{getattr(code, "co_qualname", code.co_name)} ({os.path.basename(code.co_filename)})'
+
+
+def folded_stack(frame):
+    """Pilha de um frame, da raiz para a folha, no formato folded"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Amostra periodicamente a pilha de uma thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='brasilsim-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[folded_stack(frame)] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+
+def write_folded(path, samples):
+    with open(path, 'w', encoding='utf-8') as output:
+        for stack, count in samples.most_common():
+            output.write(f'{stack} {count}\n')
+
+
+def profile_filename(route):
+    """Ex.: 20240101-120000-4242-3-api_states_state_id_decision.folded"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return f'{stamp}-{os.getpid()}-{next(_profile_numbers)}-{slug}.folded'
+
+
+def init_profiler(app, environ=os.environ):
+    """Instala o profiler por requisição, se habilitado no ambiente"""
+    app.config['PROFILING_ENABLED'] = env_flag(environ, 'BRASILSIM_PROFILING', False)
+    app.config['PROFILE_DIR'] = environ.get('BRASILSIM_PROFILE_DIR', DEFAULT_PROFILE_DIR)
+    app.config['PROFILE_INTERVAL'] = float(environ.get('BRASILSIM_PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS)) / 1000
+    if not app.config['PROFILING_ENABLED']:
+        return app
+
+    os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+
+    @app.before_request
+    def start_profiler():
+        if request.headers.get(PROFILE_HEADER, '').strip().lower() not in ('1', 'true', 'yes', 'on'):
+            return
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        g.profile_path = os.path.join(app.config['PROFILE_DIR'], profile_filename(route))
+        g.profiler = SamplingProfiler(threading.get_ident(), app.config['PROFILE_INTERVAL']).start()
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        path = g.pop('profile_path')
+        response.headers[PROFILE_FILE_HEADER] = os.path.basename(path)
+        # Para quando o servidor fecha a resposta, depois do último pedaço enviado
+        response.call_on_close(lambda: write_folded(path, profiler.stop()))
+        return response
+
+    return app
@@ -1,19 +1,64 @@
 """
 Rotas para Rankings - BrasilSim
 """
-from flask import Blueprint, jsonify
-from src.models.state import State
-from sqlalchemy import desc, asc
+from flask import Blueprint, request, jsonify
+from src.models import db
+from src.models.state import State, GENERAL_TOTAL
+from src.models.leaderboard import leaderboard
+from src.routes.response_cache import cached_response
+from sqlalchemy import func
 
 rankings_bp = Blueprint('rankings', __name__)
 
-@rankings_bp.route('/rankings', methods=['GET'])
+# Tipo de ranking -> categoria do índice de rankings
+RANKING_TYPES = {
+    'economia': 'economia',
+    'educacao': 'educacao',
+    'saude': 'saude',
+    'seguranca': 'seguranca',
+    'cultura': 'cultura',
+    'satisfacao': 'satisfacao',
+    'corrupcao': 'menos_corrupto',  # Menor é melhor
+    'geral': 'geral',
+    'equilibrio': 'equilibrio',
+    'crescimento': 'crescimento'
+}
+
+DEFAULT_RANKING_SIZE = 10
+MAX_RANKING_SIZE = 100
+
+def build_rankings(tops):
+    """Monta as entradas de vários rankings carregando todos os estados em uma consulta"""
+    state_ids = {state_id for entries in tops.values() for state_id, _ in entries}
+    states = {
+        state.id: state
+        for state in State.query.filter(State.id.in_(state_ids)).all()
+    }
+
+    rankings = {}
+    for ranking_type, entries in tops.items():
+        rankings[ranking_type] = [
+            {
+                'position': i + 1,
+                'state_id': state_id,
+                'name': states[state_id].name,
+                'value': value,
+                'region': states[state_id].region,
+                'government': states[state_id].government_type
+            }
+            for i, (state_id, value) in enumerate(entries)
+            if state_id in states
+        ]
+    return rankings
+
+@rankings_bp.route('/rankings/overview', methods=['GET'])
+@cached_response
 def get_all_rankings():
     """Obter todos os rankings"""
     try:
-        states = State.get_all_states()
-        
-        if not states:
+        total_states = len(leaderboard)
+
+        if not total_states:
             return jsonify({
                 'rankings': {},
                 'stats': {
@@ -22,165 +67,71 @@ def get_all_rankings():
                     'averageScore': 0
                 }
             }), 200
-        
-        # Calcular estatísticas
-        total_decisions = sum(len(state.get_decisions_history()) for state in states)
-        average_score = sum(state.get_score() for state in states) / len(states)
-        
-        # Função para criar ranking
-        def create_ranking(states_list, key_func, reverse=True):
-            sorted_states = sorted(states_list, key=key_func, reverse=reverse)
-            return [
-                {
-                    'position': i + 1,
-                    'name': state.name,
-                    'value': key_func(state),
-                    'region': state.region,
-                    'government': state.government
-                }
-                for i, state in enumerate(sorted_states[:10])  # Top 10
-            ]
-        
-        # Rankings por indicador
-        rankings = {
-            'economia': create_ranking(states, lambda s: s.economia),
-            'educacao': create_ranking(states, lambda s: s.educacao),
-            'saude': create_ranking(states, lambda s: s.saude),
-            'seguranca': create_ranking(states, lambda s: s.seguranca),
-            'cultura': create_ranking(states, lambda s: s.cultura),
-            'satisfacao': create_ranking(states, lambda s: s.satisfacao),
-            'corrupcao': create_ranking(states, lambda s: s.corrupcao, reverse=False),  # Menor é melhor
-            'geral': create_ranking(states, lambda s: s.get_score()),
-            'equilibrio': create_ranking(states, lambda s: calculate_balance_score(s)),
-            'crescimento': create_ranking(states, lambda s: calculate_growth_score(s))
-        }
-        
-        # Ranking de estilos de governo
+
+        # Estatísticas em uma única consulta agregada
+        total_decisions, average_total = db.session.query(
+            func.sum(State.decisions_count), func.avg(GENERAL_TOTAL)
+        ).one()
+
+        # Top 10 de cada tipo direto do índice
+        rankings = build_rankings({
+            ranking_type: leaderboard.top(category, DEFAULT_RANKING_SIZE)
+            for ranking_type, category in RANKING_TYPES.items()
+        })
+
+        # Ranking de estilos de governo: top 5 de cada estilo por pontuação geral
         government_styles = {}
-        for state in states:
-            style = state.get_government_style()
-            if style not in government_styles:
-                government_styles[style] = []
-            government_styles[style].append({
-                'name': state.name,
-                'region': state.region,
-                'score': state.get_score()
-            })
-        
-        # Ordenar cada estilo por pontuação
-        for style in government_styles:
-            government_styles[style] = sorted(
-                government_styles[style], 
-                key=lambda x: x['score'], 
-                reverse=True
-            )[:5]  # Top 5 de cada estilo
-        
+        for style in State.get_government_types():
+            rows = db.session.query(State.id, State.name, State.region, GENERAL_TOTAL).filter(
+                State.government_type == style
+            ).order_by(GENERAL_TOTAL.desc(), State.id).limit(5).all()
+            if rows:
+                government_styles[style] = [
+                    {'state_id': state_id, 'name': name, 'region': region, 'score': round(total / 6, 1)}
+                    for state_id, name, region, total in rows
+                ]
+
         rankings['estilos'] = government_styles
-        
+
         return jsonify({
             'rankings': rankings,
             'stats': {
-                'totalStates': len(states),
-                'totalDecisions': total_decisions,
-                'averageScore': round(average_score, 1)
+                'totalStates': total_states,
+                'totalDecisions': total_decisions or 0,
+                'averageScore': round(float(average_total or 0) / 6, 1)
             }
         }), 200
-        
+
     except Exception as e:
         return jsonify({
             'error': f'Erro interno do servidor: {str(e)}'
         }), 500
 
 @rankings_bp.route('/rankings/<ranking_type>', methods=['GET'])
+@cached_response
 def get_specific_ranking(ranking_type):
     """Obter ranking específico"""
     try:
-        states = State.get_all_states()
-        
-        if not states:
-            return jsonify({
-                'ranking': [],
-                'type': ranking_type
-            }), 200
-        
-        # Mapear tipos de ranking para funções
-        ranking_functions = {
-            'economia': lambda s: s.economia,
-            'educacao': lambda s: s.educacao,
-            'saude': lambda s: s.saude,
-            'seguranca': lambda s: s.seguranca,
-            'cultura': lambda s: s.cultura,
-            'satisfacao': lambda s: s.satisfacao,
-            'corrupcao': lambda s: s.corrupcao,
-            'geral': lambda s: s.get_score(),
-            'equilibrio': lambda s: calculate_balance_score(s),
-            'crescimento': lambda s: calculate_growth_score(s)
-        }
-        
-        if ranking_type not in ranking_functions:
+        if ranking_type not in RANKING_TYPES:
             return jsonify({'error': 'Tipo de ranking inválido'}), 400
-        
-        key_func = ranking_functions[ranking_type]
-        reverse = ranking_type != 'corrupcao'  # Corrupção: menor é melhor
-        
-        sorted_states = sorted(states, key=key_func, reverse=reverse)
-        
-        ranking = [
-            {
-                'position': i + 1,
-                'name': state.name,
-                'value': key_func(state),
-                'region': state.region,
-                'government': state.government,
-                'style': state.get_government_style()
-            }
-            for i, state in enumerate(sorted_states)
-        ]
-        
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_RANKING_SIZE))
+        except ValueError:
+            return jsonify({'error': 'Parâmetro limit inválido'}), 400
+        limit = max(1, min(limit, MAX_RANKING_SIZE))
+
+        ranking = build_rankings({
+            ranking_type: leaderboard.top(RANKING_TYPES[ranking_type], limit)
+        })[ranking_type]
+
         return jsonify({
             'ranking': ranking,
             'type': ranking_type,
             'total': len(ranking)
         }), 200
-        
+
     except Exception as e:
         return jsonify({
             'error': f'Erro interno do servidor: {str(e)}'
         }), 500
-
-def calculate_balance_score(state):
-    """Calcula pontuação de equilíbrio (menor desvio padrão = mais equilibrado)"""
-    indicators = [
-        state.economia, state.educacao, state.saude,
-        state.seguranca, state.cultura, state.satisfacao
-    ]
-    
-    mean = sum(indicators) / len(indicators)
-    variance = sum((x - mean) ** 2 for x in indicators) / len(indicators)
-    std_dev = variance ** 0.5
-    
-    # Inverter para que menor desvio = maior pontuação
-    return round(100 - std_dev, 1)
-
-def calculate_growth_score(state):
-    """Calcula pontuação de crescimento baseada no histórico"""
-    decisions = state.get_decisions_history()
-    
-    if len(decisions) < 2:
-        return 0
-    
-    # Simular crescimento baseado nas últimas decisões
-    # Em uma implementação real, isso seria baseado em dados históricos
-    recent_decisions = decisions[-3:] if len(decisions) >= 3 else decisions
-    
-    total_positive_effects = 0
-    for decision in recent_decisions:
-        effects = decision.get('decision', {}).get('effects', {})
-        for indicator, change in effects.items():
-            if indicator != 'corrupcao' and change > 0:
-                total_positive_effects += change
-            elif indicator == 'corrupcao' and change < 0:
-                total_positive_effects += abs(change)
-    
-    return total_positive_effects
-
@@ -0,0 +1,105 @@
+"""
+Cache de Respostas - BrasilSim
+Cache em memória para as rotas de leitura (rankings, estatísticas, listas
+fixas). As entradas são invalidadas por um contador de versão que as rotas
+de escrita incrementam, expiram por tempo e são descartadas em ordem LRU.
+As respostas levam ETag para que o cliente possa revalidar com 304.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from flask import request, make_response
+from src.routes.metrics import register_cache
+
+# Quantidade máxima de respostas guardadas
+MAX_ENTRIES = 256
+
+# Tempo máximo (segundos) que uma resposta fica no cache
+TTL_SECONDS = 30
+
+
+class ResponseCache:
+    """Cache LRU com expiração por tempo e invalidação por versão"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def bump(self):
+        """Invalida todas as entradas (chamar após qualquer escrita)"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != self.version or entry['expires'] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, version, body, mimetype):
+        with self._lock:
+            # Uma escrita aconteceu enquanto a resposta era montada
+            if version != self.version:
+                return None
+            entry = {
+                'version': version,
+                'expires': time.monotonic() + self.ttl,
+                'body': body,
+                'mimetype': mimetype,
+                'etag': hashlib.sha1(body).hexdigest()
+            }
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+register_cache('response', response_cache)
+
+
+def cached_response(view):
+    """
+    Decorador para rotas GET de leitura: a chave é a rota mais os parâmetros
+    da query string. Só respostas 200 são guardadas.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+        entry = response_cache.get(key)
+
+        if entry is None:
+            version = response_cache.version
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = response_cache.set(key, version, response.get_data(), response.mimetype)
+            if entry is None:
+                response.add_etag()
+                return response.make_conditional(request)
+
+        response = make_response(entry['body'])
+        response.mimetype = entry['mimetype']
+        response.set_etag(entry['etag'])
+        return response.make_conditional(request)
+
+    return wrapper
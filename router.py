@@ -0,0 +1,631 @@
+"""
+Roteador do modo em shards - BrasilSim
+
+Cada região (Norte, Nordeste, Centro-Oeste, Sudeste, Sul) roda como um
+shard: a aplicação de sempre (python -m src.serve), com seu próprio banco e
+seus workers, aceitando só estados da sua região (BRASILSIM_SHARD). As
+escritas de regiões diferentes não disputam o mesmo arquivo do banco.
+
+O roteador é uma aplicação Flask sem banco que fica na frente dos shards:
+    - criação de estado: vai para o shard da região informada;
+    - rotas de um estado (/states/<id>/..., /admin/states/<id>/...): vão para
+      o shard dono do id (cada região tem uma faixa de ids, ver models/sharding.py);
+    - lote de decisões: dividido por shard, enviado em paralelo e remontado;
+    - rankings: top k de cada shard, juntados por intercalação (k-way merge)
+      na mesma ordem do índice de rankings (valor, id);
+    - GET /states e estatísticas: pedidos a todos os shards e combinados;
+    - cadastro de decisões: o primeiro shard define o id e os demais gravam a
+      mesma decisão com esse id; se algum falhar, ela é removida de todos;
+    - remoção de decisões e limpeza geral: repetidas em todos os shards.
+Exportação, importação, simulação, métricas e rankings ao vivo não passam
+pelo roteador: use o endereço de cada shard.
+
+Uso:
+    python -m src.router
+
+Configuração por variáveis de ambiente:
+    BRASILSIM_SHARD_URLS          shards já em execução, ex.:
+                                  "Norte=http://10.0.0.1:5001,Sul=http://10.0.0.2:5001,..."
+                                  (sem ela, o roteador inicia um shard local por região)
+    BRASILSIM_SHARD_BASE_PORT     porta do primeiro shard local (padrão 5101; os demais seguem)
+    BRASILSIM_SHARD_WORKERS       workers de cada shard local (padrão 1)
+    BRASILSIM_SHARD_DATABASE_URL  banco de cada shard local, com {shard} no lugar
+                                  da região (padrão sqlite:///database/shard_{shard}.db)
+    BRASILSIM_SHARD_TIMEOUT       timeout (s) das requisições aos shards (padrão 30)
+    BRASILSIM_BIND, BRASILSIM_WORKERS, BRASILSIM_THREADS, ...: do roteador, como em serve.py
+"""
+import atexit
+import heapq
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from urllib.parse import urlencode, urlsplit
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+from src.assets import init_static_assets, DEFAULT_BUILD_DIR
+from src.config import DEFAULT_DATABASE_PATH
+from src.models.leaderboard import INDICATOR_CATEGORIES
+from src.models.sharding import shard_regions, shard_slug, shard_of
+from src.routes.rankings import RANKING_TYPES, DEFAULT_RANKING_SIZE, MAX_RANKING_SIZE
+from src.routes.serialization import FastJSONProvider, json_response, dumps, loads
+from src.routes.states import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_BATCH_SIZE, encode_cursor
+
+DEFAULT_SHARD_BASE_PORT = 5101
+DEFAULT_SHARD_WORKERS = 1
+DEFAULT_SHARD_DATABASE_URL = 'sqlite:///' + os.path.join(os.path.dirname(DEFAULT_DATABASE_PATH), 'shard_{shard}.db')
+DEFAULT_SHARD_TIMEOUT = 30
+
+# Espera pelos shards locais ao iniciar
+SHARD_STARTUP_TIMEOUT = 60
+
+# Cabeçalhos da requisição repassados aos shards
+FORWARDED_HEADERS = ('Content-Type', 'If-None-Match')
+
+# Estilos de governo no ranking geral: quantos de cada (ver rankings.get_all_rankings)
+GOVERNMENT_STYLE_SIZE = 5
+
+
+class ShardUnavailable(Exception):
+    """O shard não respondeu"""
+
+    def __init__(self, region):
+        super().__init__(f'Shard {region} indisponível.')
+        self.region = region
+
+
+class ShardClient:
+    """Conexões HTTP com um shard, uma por thread, reaproveitadas entre requisições"""
+
+    def __init__(self, region, url, timeout=DEFAULT_SHARD_TIMEOUT):
+        parts = urlsplit(url)
+        self.region = region
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, Content-Type, corpo) da resposta do shard"""
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            fresh = connection is None
+            if fresh:
+                connection = self._local.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+                with self._connections_lock:
+                    self._connections.add(connection)
+            try:
+                connection.request(method, path, body, headers or {})
+                response = connection.getresponse()
+                return response.status, response.getheader('Content-Type'), response.read()
+            except (http.client.HTTPException, OSError) as error:
+                connection.close()
+                self._local.connection = None
+                with self._connections_lock:
+                    self._connections.discard(connection)
+                # Conexão parada que o shard já fechou: tenta de novo uma vez, com uma nova
+                if fresh or attempt:
+                    raise ShardUnavailable(self.region) from error
+
+    def close(self):
+        """Fecha as conexões de todas as threads (o shard não espera mais por elas ao encerrar)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for connection in connections:
+            connection.close()
+
+    def json(self, method, path, payload=None):
+        """(status, corpo decodificado) de uma requisição JSON"""
+        body = dumps(payload) if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        status, _, data = self.request(method, path, body, headers)
+        return status, loads(data)
+
+
+class ShardRouter:
+    """Shards por região e as formas de falar com eles: um, todos em paralelo ou todos em ordem"""
+
+    def __init__(self, urls, timeout=DEFAULT_SHARD_TIMEOUT):
+        missing = [region for region in shard_regions() if region not in urls]
+        if missing:
+            raise ValueError(f"Shards sem endereço: {', '.join(missing)}")
+        self.shards = {region: ShardClient(region, urls[region], timeout) for region in shard_regions()}
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(self.shards), thread_name_prefix='brasilsim-router')
+
+    def for_region(self, region):
+        return self.shards.get(region)
+
+    def for_state(self, state_id):
+        region = shard_of(state_id)
+        return self.shards[region] if region is not None else None
+
+    def scatter(self, call, regions=None):
+        """{região: call(shard)} para todos os shards (ou os informados), em paralelo"""
+        regions = list(regions) if regions is not None else list(self.shards)
+        futures = {region: self._executor.submit(call, self.shards[region]) for region in regions}
+        return {region: future.result() for region, future in futures.items()}
+
+    def broadcast(self, call):
+        """call(shard) em cada shard, um depois do outro, na ordem das regiões"""
+        return {region: call(shard) for region, shard in self.shards.items()}
+
+    def close(self):
+        self._executor.shutdown()
+        for shard in self.shards.values():
+            shard.close()
+
+
+def higher_is_better(category):
+    """Sentido da ordem de uma categoria do índice de rankings"""
+    if category in INDICATOR_CATEGORIES:
+        return INDICATOR_CATEGORIES[category][1]
+    return True
+
+
+def merge_top(lists, limit, value_of, id_of, higher=True):
+    """
+    Intercala listas já ordenadas (top k de cada shard) na ordem do índice de
+    rankings, (valor, id), e fica com as `limit` primeiras
+    """
+    if higher:
+        key = lambda entry: (-value_of(entry), id_of(entry))
+    else:
+        key = lambda entry: (value_of(entry), id_of(entry))
+    return list(islice(heapq.merge(*lists, key=key), limit))
+
+
+def renumber(entries):
+    """Posições 1..n depois da intercalação"""
+    for position, entry in enumerate(entries, 1):
+        entry['position'] = position
+    return entries
+
+
+def shard_error(statuses):
+    return jsonify({
+        'error': 'Os shards responderam de forma diferente.',
+        'shards': statuses
+    }), 502
+
+
+def create_router_app(router, static_build_dir=DEFAULT_BUILD_DIR):
+    """Aplicação do roteador (sem banco) para os shards de `router`"""
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.json = FastJSONProvider(app)
+    CORS(app)
+
+    def forward(shard, path=None):
+        """Repassa a requisição atual ao shard e devolve a resposta como veio"""
+        if shard is None:
+            return jsonify({'error': 'Estado não encontrado.'}), 404
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        path = path or request.full_path.rstrip('?')
+        status, content_type, body = shard.request(request.method, path, request.get_data() or None, headers)
+        return Response(body, status=status, content_type=content_type)
+
+    def scatter_json(path):
+        """{região: (status, corpo)} de um GET em todos os shards"""
+        return router.scatter(lambda shard: shard.json('GET', path))
+
+    def failed(responses):
+        statuses = {region: status for region, (status, _) in responses.items()}
+        if any(status != 200 for status in statuses.values()):
+            # Repassa o erro do primeiro shard que falhou (ex.: parâmetro inválido)
+            for status, body in responses.values():
+                if status != 200:
+                    return json_response(body, status)
+        return None
+
+    @app.errorhandler(ShardUnavailable)
+    def shard_unavailable(error):
+        return jsonify({'error': str(error)}), 502
+
+    # Estados: cada um vive no shard da sua região
+
+    @app.route('/api/states', methods=['POST'])
+    def create_state():
+        data = request.get_json(silent=True)
+        region = data.get('region') if isinstance(data, dict) else None
+        if region is None:
+            return jsonify({'error': 'Dados incompletos. Nome, região e tipo de governo são obrigatórios.'}), 400
+        shard = router.for_region(region)
+        if shard is None:
+            return jsonify({'error': 'Região inválida.'}), 400
+        return forward(shard)
+
+    @app.route('/api/states/<int:state_id>', methods=['GET'])
+    @app.route('/api/states/<int:state_id>/<path:rest>', methods=['GET', 'POST'])
+    def state_route(state_id, rest=None):
+        return forward(router.for_state(state_id))
+
+    @app.route('/api/admin/states/<state_id>', methods=['DELETE'])
+    @app.route('/api/admin/states/<state_id>/<path:rest>', methods=['PATCH'])
+    def admin_state_route(state_id, rest=None):
+        if not state_id.isdigit():
+            return jsonify({'error': 'ID inválido'}), 400
+        return forward(router.for_state(int(state_id)))
+
+    @app.route('/api/states/decisions/batch', methods=['POST'])
+    def batch():
+        """Divide o lote por shard, envia as partes em paralelo e remonta os resultados na ordem"""
+        started = time.perf_counter()
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Lista de itens é obrigatória.'}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'No máximo {MAX_BATCH_SIZE} itens por lote.'}), 400
+
+        results = [None] * len(items)
+        parts = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[position] = {'success': False, 'error': 'Item inválido.'}
+                continue
+            state_id = item.get('state_id')
+            region = shard_of(state_id) if type(state_id) is int else None
+            if region is None:
+                results[position] = {'state_id': state_id, 'success': False, 'error': 'Estado não encontrado.'}
+                continue
+            parts.setdefault(region, []).append(position)
+
+        responses = router.scatter(
+            lambda shard: shard.json('POST', '/api/states/decisions/batch', {
+                'items': [items[position] for position in parts[shard.region]]
+            }),
+            parts
+        )
+        error = failed(responses)
+        if error is not None:
+            return error
+        for region, (_, body) in responses.items():
+            for position, result in zip(parts[region], body['results']):
+                results[position] = result
+
+        elapsed = time.perf_counter() - started
+        applied = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': True,
+            'results': results,
+            'applied': applied,
+            'failed': len(results) - applied,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'items_per_second': round(len(items) / elapsed, 1) if elapsed > 0 else None
+        })
+
+    @app.route('/api/states', methods=['GET'])
+    def list_states():
+        """Mesma página em todos os shards, intercalada pela ordem pedida"""
+        try:
+            limit = max(1, min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'Parâmetro limit inválido.'}), 400
+        order_by = request.args.get('order_by', 'id')
+        args = request.args.to_dict()
+
+        # A intercalação precisa do campo da ordenação em cada linha
+        fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+        added_field = bool(fields) and order_by not in fields
+        if added_field:
+            args['fields'] = ','.join(fields + [order_by])
+
+        responses = scatter_json('/api/states?' + urlencode(args))
+        error = failed(responses)
+        if error is not None:
+            return error
+
+        pages = [body for _, body in responses.values()]
+        first = pages[0]
+        # Mesma ordem dos shards: (valor, id), com o desempate pelo id no sentido
+        # contrário ao do valor (a ordem crescente é o inverso da decrescente)
+        sign = -1 if first['order'] == 'desc' else 1
+        if order_by == 'id':
+            value_of = lambda state: state['id']
+            key = lambda state: sign * state['id']
+        else:
+            value_of = lambda state: state['indicators'][order_by]
+            key = lambda state: (sign * value_of(state), -sign * state['id'])
+        merged = list(heapq.merge(*(page['states'] for page in pages), key=key))
+
+        page = merged[:limit]
+        has_more = len(merged) > limit or any(body['next_cursor'] for body in pages)
+        next_cursor = encode_cursor([value_of(page[-1]), page[-1]['id']]) if has_more and page else None
+        if added_field:
+            for state in page:
+                state['indicators'].pop(order_by, None)
+                if not state['indicators']:
+                    del state['indicators']
+
+        return json_response({
+            'success': True,
+            'total': sum(body['total'] for body in pages),
+            'limit': limit,
+            'order_by': order_by,
+            'order': first['order'],
+            'states': page,
+            'count': len(page),
+            'next_cursor': next_cursor
+        })
+
+    # Rankings: intercalação dos top k de cada shard
+
+    @app.route('/api/rankings', methods=['GET'])
+    def rankings():
+        responses = scatter_json('/api/rankings')
+        error = failed(responses)
+        if error is not None:
+            return error
+        bodies = [body for _, body in responses.values()]
+        total_states = sum(body.get('total_states', 0) for body in bodies)
+        if not total_states:
+            return jsonify({'success': True, 'rankings': {}, 'message': 'Nenhum estado encontrado.'})
+
+        merged = {}
+        for category in dict.fromkeys(category for body in bodies for category in body['rankings']):
+            merged[category] = renumber(merge_top(
+                [body['rankings'].get(category, []) for body in bodies], DEFAULT_RANKING_SIZE,
+                value_of=lambda entry: entry['score'], id_of=lambda entry: entry['state']['id'],
+                higher=higher_is_better(category)
+            ))
+        return json_response({'success': True, 'rankings': merged, 'total_states': total_states})
+
+    @app.route('/api/rankings/overview', methods=['GET'])
+    def rankings_overview():
+        responses = scatter_json('/api/rankings/overview')
+        error = failed(responses)
+        if error is not None:
+            return error
+        bodies = [body for _, body in responses.values()]
+        stats = [body['stats'] for body in bodies]
+        total_states = sum(stat['totalStates'] for stat in stats)
+        if not total_states:
+            return jsonify({'rankings': {}, 'stats': {'totalStates': 0, 'totalDecisions': 0, 'averageScore': 0}})
+
+        rankings = {}
+        for ranking_type, category in RANKING_TYPES.items():
+            rankings[ranking_type] = renumber(merge_top(
+                [body['rankings'].get(ranking_type, []) for body in bodies], DEFAULT_RANKING_SIZE,
+                value_of=lambda entry: entry['value'], id_of=lambda entry: entry['state_id'],
+                higher=higher_is_better(category)
+            ))
+        styles = {}
+        for style in dict.fromkeys(style for body in bodies for style in body['rankings'].get('estilos', {})):
+            styles[style] = merge_top(
+                [body['rankings']['estilos'].get(style, []) for body in bodies], GOVERNMENT_STYLE_SIZE,
+                value_of=lambda entry: entry['score'], id_of=lambda entry: entry['state_id']
+            )
+        rankings['estilos'] = styles
+
+        # Média ponderada pelas médias já arredondadas de cada shard
+        average = sum(stat['averageScore'] * stat['totalStates'] for stat in stats) / total_states
+        return jsonify({
+            'rankings': rankings,
+            'stats': {
+                'totalStates': total_states,
+                'totalDecisions': sum(stat['totalDecisions'] for stat in stats),
+                'averageScore': round(average, 1)
+            }
+        })
+
+    @app.route('/api/rankings/<ranking_type>', methods=['GET'])
+    def specific_ranking(ranking_type):
+        if ranking_type not in RANKING_TYPES:
+            return jsonify({'error': 'Tipo de ranking inválido'}), 400
+        responses = scatter_json(request.full_path)
+        error = failed(responses)
+        if error is not None:
+            return error
+        # O limite já foi validado pelos shards
+        limit = max(1, min(int(request.args.get('limit', DEFAULT_RANKING_SIZE)), MAX_RANKING_SIZE))
+        ranking = renumber(merge_top(
+            [body['ranking'] for _, body in responses.values()], limit,
+            value_of=lambda entry: entry['value'], id_of=lambda entry: entry['state_id'],
+            higher=higher_is_better(RANKING_TYPES[ranking_type])
+        ))
+        return jsonify({'ranking': ranking, 'type': ranking_type, 'total': len(ranking)})
+
+    # Administração
+
+    @app.route('/api/admin/states', methods=['GET'])
+    def admin_states():
+        responses = scatter_json('/api/admin/states')
+        error = failed(responses)
+        if error is not None:
+            return error
+        states = [state for _, body in responses.values() for state in body['states']]
+        return jsonify({'states': states, 'total': len(states), 'timestamp': datetime.now().isoformat()})
+
+    @app.route('/api/admin/stats', methods=['GET'])
+    def admin_stats():
+        responses = scatter_json('/api/admin/stats')
+        error = failed(responses)
+        if error is not None:
+            return error
+        bodies = [body for _, body in responses.values()]
+        total_states = sum(body['total_states'] for body in bodies)
+        by_region = {}
+        by_government = {}
+        sums = {}
+        for body in bodies:
+            for region, count in body['states_by_region'].items():
+                by_region[region] = by_region.get(region, 0) + count
+            for government, count in body['states_by_government'].items():
+                by_government[government] = by_government.get(government, 0) + count
+            for name, average in body['average_indicators'].items():
+                sums[name] = sums.get(name, 0) + average * body['total_states']
+        return jsonify({
+            'total_states': total_states,
+            'total_decisions': bodies[0]['total_decisions'],
+            'states_by_region': by_region,
+            'states_by_government': by_government,
+            'average_indicators': {name: total / total_states for name, total in sums.items()} if total_states else {},
+            'timestamp': datetime.now().isoformat()
+        })
+
+    @app.route('/api/admin/decisions', methods=['POST'])
+    def create_decision():
+        """
+        O primeiro shard cria a decisão e define o id; os demais gravam a mesma
+        decisão com esse id (repetir é inofensivo). Se algum shard falhar, a
+        decisão é removida dos que já a gravaram e a resposta é 502, para que
+        os catálogos continuem iguais em todos os shards.
+        """
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Dados obrigatórios: title, description, options'}), 400
+        payload.pop('id', None)
+
+        primary, *others = router.shards
+        status, body = router.shards[primary].json('POST', '/api/admin/decisions', payload)
+        if status != 201:
+            return json_response(body, status)
+        decision_id = body['decision']['id']
+
+        def replicate(shard):
+            try:
+                return shard.json('POST', '/api/admin/decisions', dict(payload, id=decision_id))[0]
+            except ShardUnavailable:
+                return None
+        statuses = {primary: status, **router.scatter(replicate, others)}
+        if all(status in (200, 201) for status in statuses.values()):
+            return json_response(body, 201)
+
+        def rollback(shard):
+            try:
+                return shard.request('DELETE', f'/api/admin/decisions/{decision_id}')[0]
+            except ShardUnavailable:
+                return None
+        created = [region for region, status in statuses.items() if status in (200, 201)]
+        return jsonify({
+            'error': 'A decisão não foi gravada em todos os shards e foi desfeita.',
+            'shards': statuses,
+            'rollback': router.scatter(rollback, created)
+        }), 502
+
+    @app.route('/api/admin/decisions/<decision_id>', methods=['DELETE'])
+    @app.route('/api/admin/clear-all-data', methods=['DELETE'])
+    def broadcast(decision_id=None):
+        """Repete a escrita em todos os shards, em ordem; as respostas devem coincidir"""
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        body = request.get_data() or None
+        path = request.full_path.rstrip('?')
+        responses = router.broadcast(lambda shard: shard.request(request.method, path, body, headers))
+        statuses = {region: status for region, (status, _, _) in responses.items()}
+        if len(set(statuses.values())) > 1:
+            return shard_error(statuses)
+        status, content_type, data = next(iter(responses.values()))
+        return Response(data, status=status, content_type=content_type)
+
+    # Iguais em todos os shards: qualquer um responde
+
+    @app.route('/api/regions', methods=['GET'])
+    @app.route('/api/government-types', methods=['GET'])
+    @app.route('/api/admin/decisions', methods=['GET'])
+    def any_shard():
+        return forward(router.shards[shard_regions()[0]])
+
+    init_static_assets(app, static_build_dir)
+    return app
+
+
+def shard_urls(environ=os.environ):
+    """{região: URL} de BRASILSIM_SHARD_URLS, ou None para iniciar shards locais"""
+    value = environ.get('BRASILSIM_SHARD_URLS', '').strip()
+    if not value:
+        return None
+    urls = {}
+    for entry in value.split(','):
+        region, _, url = entry.partition('=')
+        urls[region.strip()] = url.strip()
+    return urls
+
+
+def start_local_shards(environ=os.environ):
+    """
+    Inicia um python -m src.serve por região e espera todos responderem;
+    retorna ({região: URL}, função que encerra os shards)
+    """
+    base_port = int(environ.get('BRASILSIM_SHARD_BASE_PORT', DEFAULT_SHARD_BASE_PORT))
+    database_template = environ.get('BRASILSIM_SHARD_DATABASE_URL', DEFAULT_SHARD_DATABASE_URL)
+    if database_template == DEFAULT_SHARD_DATABASE_URL:
+        os.makedirs(os.path.dirname(DEFAULT_DATABASE_PATH), exist_ok=True)
+
+    urls = {}
+    processes = []
+    for index, region in enumerate(shard_regions()):
+        bind = f'127.0.0.1:{base_port + index}'
+        shard_environ = dict(
+            environ,
+            BRASILSIM_SHARD=region,
+            BRASILSIM_BIND=bind,
+            BRASILSIM_WORKERS=environ.get('BRASILSIM_SHARD_WORKERS', str(DEFAULT_SHARD_WORKERS)),
+            BRASILSIM_LIVE_BIND='0',
+            DATABASE_URL=database_template.format(shard=shard_slug(region)),
+        )
+        processes.append(subprocess.Popen([sys.executable, '-m', 'src.serve'], env=shard_environ))
+        urls[region] = f'http://{bind}'
+
+    # Só o processo principal encerra os shards (os workers herdam o atexit)
+    master = os.getpid()
+
+    def stop_shards():
+        if os.getpid() != master:
+            return
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            process.wait()
+    atexit.register(stop_shards)
+
+    deadline = time.monotonic() + SHARD_STARTUP_TIMEOUT
+    for region, url in urls.items():
+        client = ShardClient(region, url, timeout=1)
+        while True:
+            try:
+                if client.request('GET', '/api/regions')[0] == 200:
+                    break
+            except ShardUnavailable:
+                pass
+            if time.monotonic() > deadline or any(process.poll() is not None for process in processes):
+                stop_shards()
+                raise RuntimeError(f'O shard {region} não iniciou')
+            time.sleep(0.2)
+    return urls, stop_shards
+
+
+def main():
+    from src.serve import BrasilSimServer, server_options
+    environ = os.environ
+    # Os ganchos de serve.py preparam a aplicação com banco; o roteador não tem banco
+    options = dict(server_options(environ), post_fork=None, worker_exit=None)
+
+    urls = shard_urls(environ)
+    if urls is None:
+        urls, _ = start_local_shards(environ)
+    router = ShardRouter(urls, float(environ.get('BRASILSIM_SHARD_TIMEOUT', DEFAULT_SHARD_TIMEOUT)))
+    app = create_router_app(router, environ.get('BRASILSIM_ASSET_BUILD_DIR', DEFAULT_BUILD_DIR))
+
+    print("🇧🇷 BrasilSim - Simulador Político Brasileiro (modo em shards)")
+    for region, url in urls.items():
+        print(f"   shard {region:<13}{url}")
+    print(f"🚀 Roteador em http://{options['bind']} "
+          f"({options['workers']} workers x {options['threads']} threads)")
+    BrasilSimServer(options, app).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
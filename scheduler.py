@@ -0,0 +1,120 @@
+"""
+Agenda de Decisões - BrasilSim
+Cada estado guarda a fila das suas próximas decisões (a primeira é a atual).
+A fila é determinística: a decisão na posição N da sequência de um estado
+depende só da semente do estado, de N, das decisões anteriores dentro da
+janela de repetição e do catálogo. Com a mesma semente, o mesmo catálogo e
+as mesmas escolhas, a partida se repete.
+"""
+import random
+import secrets
+from .catalog import decision_catalog
+
+# Decisões futuras guardadas com o estado (a primeira é a atual)
+QUEUE_SIZE = 8
+
+# Uma decisão não volta a aparecer dentro dessa quantidade de decisões
+REPEAT_WINDOW = 5
+
+# Peso de cada categoria (padrão 1.0). Cada categoria tem a mesma chance,
+# multiplicada pelo peso, independentemente de quantas decisões ela tenha
+CATEGORY_WEIGHTS = {}
+
+
+def decision_weights(entries, category_weights=CATEGORY_WEIGHTS):
+    """Peso de sorteio de cada decisão: peso da categoria dividido entre as decisões dela"""
+    per_category = {}
+    for entry in entries:
+        per_category[entry.category] = per_category.get(entry.category, 0) + 1
+    return [category_weights.get(entry.category, 1.0) / per_category[entry.category] for entry in entries]
+
+
+def new_seed():
+    """Semente aleatória para um estado novo"""
+    return secrets.randbits(31)
+
+
+def encode_queue(decision_ids):
+    return ','.join(str(decision_id) for decision_id in decision_ids)
+
+
+def decode_queue(text):
+    if not text:
+        return []
+    try:
+        return [int(part) for part in text.split(',')]
+    except ValueError:
+        return []
+
+
+class DecisionScheduler:
+    """Gera e avança a fila de decisões de um estado a partir do catálogo"""
+
+    def __init__(self, catalog, queue_size=QUEUE_SIZE, repeat_window=REPEAT_WINDOW,
+                 category_weights=CATEGORY_WEIGHTS):
+        if queue_size < repeat_window:
+            raise ValueError('A fila deve ser pelo menos do tamanho da janela de repetição')
+        self.catalog = catalog
+        self.queue_size = queue_size
+        self.repeat_window = repeat_window
+        self.category_weights = category_weights
+        # (geração do catálogo, decisões em ordem de id, pesos), trocado de uma vez
+        self._candidates = (None, [], [])
+
+    def candidates(self):
+        """Decisões do catálogo em ordem de id e o peso de cada uma"""
+        self.catalog.ensure_loaded()
+        generation = self.catalog.generation
+        cached = self._candidates
+        if cached[0] != generation:
+            entries = sorted(self.catalog.all(), key=lambda entry: entry.id)
+            weights = decision_weights(entries, self.category_weights)
+            cached = self._candidates = (generation, entries, weights)
+        return cached[1], cached[2]
+
+    def pick(self, seed, position, recent):
+        """Decisão na posição `position` da sequência, evitando os ids em `recent`"""
+        entries, weights = self.candidates()
+        if not entries:
+            return None
+
+        # Com poucas decisões no catálogo, a janela encolhe para sempre sobrar alguma
+        window_size = min(self.repeat_window, len(entries) - 1)
+        window = set(recent[-window_size:]) if window_size > 0 else set()
+        pool = [(entry, weight) for entry, weight in zip(entries, weights) if entry.id not in window]
+
+        rng = random.Random(f'{seed}:{position}')
+        entry = rng.choices([entry for entry, _ in pool], weights=[weight for _, weight in pool])[0]
+        return entry.id
+
+    def build(self, seed, position, recent=()):
+        """Fila completa a partir de `position`"""
+        queue = list(recent)
+        for offset in range(self.queue_size):
+            decision_id = self.pick(seed, position + offset, queue)
+            if decision_id is None:
+                return []
+            queue.append(decision_id)
+        return queue[len(recent):]
+
+    def ensure(self, seed, position, queue):
+        """
+        Agenda válida para (semente, posição, fila): preenche a semente de
+        estados antigos e refaz a fila se estiver incompleta ou citar
+        decisões que saíram do catálogo
+        """
+        if seed is None:
+            seed = new_seed()
+        position = position or 0
+        if len(queue) == self.queue_size and all(self.catalog.get(decision_id) for decision_id in queue):
+            return seed, position, queue
+        return seed, position, self.build(seed, position)
+
+    def advance(self, seed, position, queue):
+        """Agenda depois de decidir a decisão atual (a primeira da fila)"""
+        remaining = queue[1:]
+        next_id = self.pick(seed, position + self.queue_size, queue)
+        return seed, position + 1, remaining + ([next_id] if next_id is not None else [])
+
+
+decision_scheduler = DecisionScheduler(decision_catalog)
@@ -0,0 +1,198 @@
+"""
+Serialização JSON - BrasilSim
+Codifica as respostas com orjson quando ele está instalado (senão, com o json
+da biblioteca padrão), guarda os bytes já codificados de cada estado e
+decisão até a linha mudar e monta respostas a partir desses pedaços, em
+streaming no caso de listas grandes.
+"""
+import json
+import time
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from threading import Lock
+from flask import Response, stream_with_context
+from flask.json.provider import JSONProvider
+from src.routes.metrics import add_serialization_time, register_cache
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+# Quantidade máxima de estados com JSON guardado
+MAX_CACHED_STATES = 10000
+
+# Itens de uma lista enviados em cada pedaço da resposta em streaming
+STREAM_CHUNK_ITEMS = 64
+
+MIMETYPE = 'application/json'
+
+
+def default(value):
+    """Tipos que os codificadores não conhecem"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):  # números e vetores do NumPy
+        return value.tolist()
+    raise TypeError(f'Tipo não serializável em JSON: {type(value).__name__}')
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(value):
+        """Codifica um valor em bytes JSON"""
+        return orjson.dumps(value, default=default, option=ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumps(value):
+        """Codifica um valor em bytes JSON"""
+        return json.dumps(value, default=default, ensure_ascii=False, separators=(',', ':')).encode()
+
+    loads = json.loads
+
+
+class RawJSON:
+    """Trecho de JSON já codificado, inserido como está na resposta"""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+
+def encode(value):
+    """Como dumps, mas aceita RawJSON em qualquer ponto de dicionários e listas"""
+    if isinstance(value, RawJSON):
+        return value.data
+    if isinstance(value, dict):
+        return b'{' + b','.join(dumps(str(key)) + b':' + encode(item) for key, item in value.items()) + b'}'
+    if isinstance(value, (list, tuple)):
+        return b'[' + b','.join(encode(item) for item in value) + b']'
+    return dumps(value)
+
+
+class FastJSONProvider(JSONProvider):
+    """Provedor de JSON do Flask (jsonify) usando o codificador acima"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        body = dumps(obj) + b'\n'
+        add_serialization_time(time.perf_counter() - started)
+        return self._app.response_class(body, mimetype=MIMETYPE)
+
+
+class StateJSONCache:
+    """
+    JSON de State.to_dict() por estado, válido enquanto a versão da linha
+    (e a data de criação, caso o id seja reaproveitado) não mudar. Descarta
+    os estados menos usados acima de `max_entries`.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_STATES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, state):
+        token = (state.version, state.created_at)
+        with self._lock:
+            entry = self._entries.get(state.id)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(state.id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        data = dumps(state.to_dict())
+        with self._lock:
+            self._entries[state.id] = (token, data)
+            self._entries.move_to_end(state.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+    def discard(self, state_id):
+        """Remove o JSON de um estado apagado"""
+        with self._lock:
+            self._entries.pop(state_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+state_json_cache = StateJSONCache()
+register_cache('state_json', state_json_cache)
+
+
+def state_json(state):
+    """State.to_dict() já codificado, para usar dentro de uma resposta"""
+    return RawJSON(state_json_cache.get(state))
+
+
+def decision_json(decision):
+    """
+    Decision.to_dict() já codificado. As entradas do catálogo guardam os
+    bytes no próprio objeto, que é substituído quando a decisão muda.
+    """
+    data = getattr(decision, 'encoded', None)
+    if data is None:
+        data = dumps(decision.to_dict())
+        if hasattr(decision, 'encoded'):
+            decision.encoded = data
+    return RawJSON(data)
+
+
+def json_response(payload, status=200):
+    """Resposta JSON montada com encode (aceita RawJSON)"""
+    started = time.perf_counter()
+    body = encode(payload) + b'\n'
+    add_serialization_time(time.perf_counter() - started)
+    return Response(body, status=status, mimetype=MIMETYPE)
+
+
+def stream_json(key, items, head=None, tail=None):
+    """
+    Resposta {**head, key: [itens...], **tail()} enviada em pedaços, sem montar
+    a lista inteira em memória. `tail` é chamado depois de consumir `items`
+    (ex.: cursor da próxima página). O contexto da requisição continua ativo
+    durante o envio, então `items` pode ler o banco aos poucos, desde que use
+    a sessão do momento do envio (a da view é fechada quando ela retorna).
+    """
+    def generate():
+        opening = encode(head or {})[:-1]
+        yield opening + (b',' if head else b'') + dumps(key) + b':['
+
+        # Só a codificação conta como serialização (ler `items` pode consultar o banco)
+        encoding_time = 0.0
+        chunk = []
+        first = True
+        for item in items:
+            started = time.perf_counter()
+            chunk.append(encode(item))
+            encoding_time += time.perf_counter() - started
+            if len(chunk) >= STREAM_CHUNK_ITEMS:
+                yield (b'' if first else b',') + b','.join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield (b'' if first else b',') + b','.join(chunk)
+
+        closing = encode(tail() if tail else {})
+        add_serialization_time(encoding_time)
+        yield b']' + (b',' + closing[1:] if len(closing) > 2 else b'}') + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype=MIMETYPE)
@@ -0,0 +1,144 @@
+"""
+Servidor de produção - BrasilSim
+
+Serve a mesma aplicação de main.py com Gunicorn: vários processos (workers),
+cada um com várias threads, sem o depurador do servidor de desenvolvimento.
+
+Uso:
+    python -m src.serve
+
+Configuração por variáveis de ambiente:
+    BRASILSIM_BIND          endereço de escuta (padrão 0.0.0.0:5001)
+    BRASILSIM_WORKERS       quantidade de processos (padrão: 2 x CPUs + 1)
+    BRASILSIM_THREADS       threads por processo (padrão 4)
+    BRASILSIM_TIMEOUT       timeout de requisição em segundos (padrão 30)
+    BRASILSIM_INDEX_MAX_AGE idade máxima (s) dos índices em memória com mais
+                            de um worker (padrão 5)
+    BRASILSIM_INIT_DB       cria e migra o banco antes de iniciar os workers
+                            (padrão 1; use 0 se a implantação já roda
+                            python -m src.manage init-db)
+    BRASILSIM_LIVE_BIND, BRASILSIM_LIVE_INTERVAL_MS: rankings ao vivo, em
+                            cada worker (ver routes/live.py)
+    DATABASE_URL, DB_POOL_*, SQLITE_BUSY_TIMEOUT_MS, SQLITE_SYNCHRONOUS,
+    BRASILSIM_WRITE_BEHIND*: ver config.py (a escrita adiada exige BRASILSIM_WORKERS=1)
+    BRASILSIM_SHARD         região atendida por este processo no modo em shards
+                            (iniciado por python -m src.router; ver router.py)
+"""
+import multiprocessing
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from src.config import env_flag
+
+DEFAULT_BIND = '0.0.0.0:5001'
+DEFAULT_THREADS = 4
+DEFAULT_TIMEOUT = 30
+DEFAULT_INDEX_MAX_AGE = 5.0
+
+
+def default_workers():
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+def server_options(environ=os.environ):
+    """Opções do Gunicorn a partir das variáveis de ambiente"""
+    workers = int(environ.get('BRASILSIM_WORKERS', default_workers()))
+    threads = int(environ.get('BRASILSIM_THREADS', DEFAULT_THREADS))
+    if workers < 1 or threads < 1:
+        raise ValueError('BRASILSIM_WORKERS e BRASILSIM_THREADS devem ser pelo menos 1')
+    # Os estados em memória da escrita adiada são do processo
+    if workers > 1 and env_flag(environ, 'BRASILSIM_WRITE_BEHIND', False):
+        raise ValueError('BRASILSIM_WRITE_BEHIND exige BRASILSIM_WORKERS=1')
+
+    return {
+        'bind': environ.get('BRASILSIM_BIND', DEFAULT_BIND),
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'timeout': int(environ.get('BRASILSIM_TIMEOUT', DEFAULT_TIMEOUT)),
+        'keepalive': 5,
+        # Carrega a aplicação uma vez só, antes do fork (sem acessar o banco)
+        'preload_app': True,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+        'accesslog': environ.get('BRASILSIM_ACCESS_LOG'),
+    }
+
+
+def post_fork(server, worker):
+    """
+    Cada worker abre suas próprias conexões, passa a revalidar os índices e
+    inicia seu servidor de rankings ao vivo
+    """
+    from src.main import app
+    from src.models import db
+    from src.models.leaderboard import leaderboard
+    from src.models.catalog import decision_catalog
+    from src.routes.response_cache import response_cache
+    from src.routes.live import start_live_server
+
+    with app.app_context():
+        db.engine.dispose()
+
+    # Outros workers também gravam: os índices em memória expiram
+    if server.cfg.workers > 1:
+        max_age = float(os.environ.get('BRASILSIM_INDEX_MAX_AGE', DEFAULT_INDEX_MAX_AGE))
+        leaderboard.max_age = max_age
+        decision_catalog.max_age = max_age
+        response_cache.ttl = min(response_cache.ttl, max_age)
+
+    # Todos os workers abrem a mesma porta (SO_REUSEPORT)
+    start_live_server(app, reuse_port=server.cfg.workers > 1)
+
+
+def worker_exit(server, worker):
+    """Grava as decisões ainda pendentes da escrita adiada antes do worker sair"""
+    from src.models.write_behind import write_behind
+    write_behind.close()
+
+
+class BrasilSimServer(BaseApplication):
+    """
+    Aplicação Gunicorn configurada em código, sem arquivo de configuração.
+    Serve a aplicação de main.py, ou `application` (ex.: o roteador de router.py).
+    """
+
+    def __init__(self, options, application=None):
+        self.options = options
+        self.application = application
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        if self.application is not None:
+            return self.application
+        from src.main import app
+        return app
+
+
+def main():
+    options = server_options()
+    if env_flag(os.environ, 'BRASILSIM_INIT_DB', True):
+        # Um processo só prepara o banco; os workers apenas o usam
+        from src.main import app
+        from src.models.migrations import init_database
+        with app.app_context():
+            init_database()
+    print("🇧🇷 BrasilSim - Simulador Político Brasileiro")
+    print(f"🚀 Servidor de produção em http://{options['bind']} "
+          f"({options['workers']} workers x {options['threads']} threads)")
+    from src.routes.live import live_bind, LIVE_PATH
+    if live_bind(os.environ):
+        print(f"📡 Rankings ao vivo em http://{live_bind(os.environ)}{LIVE_PATH}")
+    BrasilSimServer(options).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
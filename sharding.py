@@ -0,0 +1,50 @@
+"""
+Estados divididos por região (shards) - BrasilSim
+No modo em shards (ver router.py), cada região tem seu banco e seus
+processos, e o roteador encaminha cada requisição ao shard dono do estado.
+Os ids dos estados de cada região ficam em uma faixa própria, então o dono
+de um estado sai do próprio id, sem consulta; a ordem por id continua a
+mesma em todos os shards (usada para desempatar rankings e páginas).
+"""
+from sqlalchemy import func, select
+from .state import State
+
+# Ids por região: a região de índice i usa de i * SHARD_ID_SPAN + 1 a (i + 1) * SHARD_ID_SPAN - 1.
+# Cabe em uma coluna INTEGER de 32 bits (PostgreSQL) com as cinco regiões.
+SHARD_ID_SPAN = 100_000_000
+
+
+def shard_regions():
+    """Regiões, cada uma um shard, na ordem das faixas de ids"""
+    return State.get_regions()
+
+
+def shard_slug(region):
+    """Nome da região para arquivos e variáveis (ex.: Centro-Oeste -> centro_oeste)"""
+    return region.lower().replace('-', '_').replace(' ', '_')
+
+
+def shard_id_range(region):
+    """(primeiro, último) id dos estados da região"""
+    base = shard_regions().index(region) * SHARD_ID_SPAN
+    return base + 1, base + SHARD_ID_SPAN - 1
+
+
+def shard_of(state_id):
+    """Região dona do estado com esse id, ou None se o id não for de nenhuma"""
+    index, offset = divmod(state_id, SHARD_ID_SPAN)
+    regions = shard_regions()
+    if offset == 0 or not 0 <= index < len(regions):
+        return None
+    return regions[index]
+
+
+def next_state_id(region):
+    """
+    Próximo id da faixa da região, como subconsulta calculada pelo próprio
+    INSERT (atribuir a State.id antes do commit)
+    """
+    first, last = shard_id_range(region)
+    return select(func.coalesce(func.max(State.id), first - 1) + 1).where(
+        State.id.between(first, last)
+    ).scalar_subquery()
@@ -0,0 +1,365 @@
+"""
+Simulador de cenários (Monte Carlo) - BrasilSim
+
+Parte dos indicadores atuais de todos os estados e do catálogo de decisões e
+simula K turnos futuros para cada estado, com várias sementes aleatórias em
+processos separados. A cada turno, cada estado recebe uma decisão sorteada
+com os mesmos pesos por categoria do agendador (a janela de repetição não é
+reproduzida) e escolhe uma das opções ao acaso; os efeitos são somados e
+cortados em 0..100, como em State.apply_decision_effects.
+
+O relatório traz a distribuição final de cada indicador, a mudança no
+ranking geral (correlação de Spearman, variação média de posição e quantos
+do top 10 continuam lá) e a parcela de estados em cada mensagem de
+State.get_status_message. Com uma decisão hipotética (--decision), as mesmas
+sementes são simuladas com e sem ela, e o relatório mostra a diferença.
+
+Uso:
+    python -m src.simulator --turns 50 --seeds 200
+    python -m src.simulator --turns 20 --seeds 64 --decision nova.json --output cenario.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.models.engine import IndicatorMatrix, compile_effects
+from src.models.scheduler import decision_weights, new_seed
+from src.models.state import (
+    INDICATORS, MIN_INDICATOR_VALUE, MAX_INDICATOR_VALUE, STATUS_INDICATORS, STATUS_LEVELS
+)
+
+DEFAULT_TURNS = 20
+DEFAULT_SEEDS = 32
+
+# Tamanho do topo do ranking geral acompanhado no relatório
+TOP_SIZE = 10
+
+# Percentis dos indicadores no relatório
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Sinal de cada indicador no total do ranking geral (ver leaderboard.general_total)
+GENERAL_SIGNS = np.array([-1 if name == 'corruption' else 1 for name in INDICATORS], dtype=np.int64)
+MIN_GENERAL = int(np.where(GENERAL_SIGNS > 0, MIN_INDICATOR_VALUE, -MAX_INDICATOR_VALUE).sum())
+MAX_GENERAL = int(np.where(GENERAL_SIGNS > 0, MAX_INDICATOR_VALUE, -MIN_INDICATOR_VALUE).sum())
+
+STATUS_COLUMNS = [INDICATORS.index(name) for name in STATUS_INDICATORS]
+STATUS_MESSAGES = [message for _, message in STATUS_LEVELS]
+# Limites multiplicados pela quantidade de indicadores: compara a soma, sem dividir
+STATUS_LIMITS = [minimum * len(STATUS_INDICATORS) for minimum, _ in STATUS_LEVELS if minimum is not None]
+
+INDICATOR_BINS = MAX_INDICATOR_VALUE - MIN_INDICATOR_VALUE + 1
+GENERAL_BINS = MAX_GENERAL - MIN_GENERAL + 1
+
+
+class CandidateDecision:
+    """Decisão hipotética, ainda não gravada, incluída só na simulação"""
+
+    def __init__(self, title, options, category='geral'):
+        self.id = None
+        self.title = title
+        self.options = options
+        self.category = category
+        self.deltas = compile_effects(options)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Valida o mesmo formato aceito por POST /admin/decisions"""
+        if not isinstance(data, dict) or not all(key in data for key in ('title', 'description', 'options')):
+            raise ValueError('Decisão hipotética: dados obrigatórios: title, description, options')
+        options = data['options']
+        if not isinstance(options, list) or len(options) < 2:
+            raise ValueError('Decisão hipotética: deve haver pelo menos 2 opções')
+        for i, option in enumerate(options):
+            if not isinstance(option, dict) or 'text' not in option or not isinstance(option.get('effects'), dict):
+                raise ValueError(f'Decisão hipotética: opção {i+1} deve ter "text" e "effects"')
+            unknown = [indicator for indicator in option['effects'] if indicator not in INDICATORS]
+            if unknown:
+                raise ValueError(f'Decisão hipotética: indicadores desconhecidos na opção {i+1}: '
+                                 f'{", ".join(map(str, unknown))}')
+            if not all(isinstance(change, int) and not isinstance(change, bool)
+                       for change in option['effects'].values()):
+                raise ValueError(f'Decisão hipotética: os efeitos da opção {i+1} devem ser inteiros')
+        return cls(str(data['title']).strip(), options, data.get('category') or 'geral')
+
+
+class CompiledCatalog:
+    """
+    Catálogo em forma de vetores: uma linha de efeitos por opção, onde começam
+    as opções de cada decisão, quantas são e a distribuição acumulada do sorteio
+    """
+
+    def __init__(self, entries):
+        entries = [entry for entry in entries if entry.deltas]
+        if not entries:
+            raise ValueError('O catálogo de decisões está vazio')
+        self.size = len(entries)
+        counts = [len(entry.deltas) for entry in entries]
+        self.effects = np.array([delta for entry in entries for delta in entry.deltas], dtype=np.int16)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        self.counts = np.array(counts, dtype=np.int64)
+        weights = np.array(decision_weights(entries), dtype=np.float64)
+        self.cumulative = np.cumsum(weights / weights.sum())
+        self.cumulative[-1] = 1.0
+
+
+def general_totals(values):
+    return values.astype(np.int64) @ GENERAL_SIGNS
+
+
+def general_ranks(values):
+    """Posição (0 = primeiro) de cada estado no ranking geral; empates pela ordem de id"""
+    order = np.argsort(-general_totals(values), kind='stable')
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+def status_buckets(values):
+    """Índice em STATUS_LEVELS da mensagem de status de cada estado"""
+    sums = values[:, STATUS_COLUMNS].astype(np.int64).sum(axis=1)
+    buckets = np.zeros(len(values), dtype=np.int64)
+    for limit in STATUS_LIMITS:
+        buckets += sums < limit
+    return buckets
+
+
+def distribution(values):
+    """Histogramas exatos (inteiros) dos indicadores, do total geral e das mensagens de status"""
+    return {
+        'indicators': np.stack([
+            np.bincount(values[:, column] - MIN_INDICATOR_VALUE, minlength=INDICATOR_BINS)
+            for column in range(len(INDICATORS))
+        ]),
+        'general': np.bincount(general_totals(values) - MIN_GENERAL, minlength=GENERAL_BINS),
+        'status': np.bincount(status_buckets(values), minlength=len(STATUS_LEVELS)),
+    }
+
+
+def simulate_seed(values, catalog, turns, seed):
+    """Simula `turns` turnos de todos os estados com uma semente"""
+    rng = np.random.default_rng(seed)
+    current = values.astype(np.int16)
+    n_states = len(current)
+    for _ in range(turns):
+        decisions = np.searchsorted(catalog.cumulative, rng.random(n_states), side='right')
+        np.minimum(decisions, catalog.size - 1, out=decisions)
+        options = (rng.random(n_states) * catalog.counts[decisions]).astype(np.int64)
+        current += catalog.effects[catalog.offsets[decisions] + options]
+        np.clip(current, MIN_INDICATOR_VALUE, MAX_INDICATOR_VALUE, out=current)
+
+    result = distribution(current)
+
+    # Mudança no ranking geral em relação ao início
+    start, end = general_ranks(values), general_ranks(current)
+    shift = (end - start).astype(np.float64)
+    if n_states > 1:
+        spearman = 1 - 6 * float(np.square(shift).sum()) / (n_states * (n_states ** 2 - 1))
+    else:
+        spearman = 1.0
+    top = min(TOP_SIZE, n_states)
+    result['churn'] = np.array([
+        spearman,
+        float(np.abs(shift).mean()),
+        float(np.count_nonzero(end[start < top] < top)) / top if top else 1.0,
+    ])
+    return result
+
+
+# Dados de cada processo do pool, recebidos uma vez só (initializer)
+_worker_inputs = None
+
+
+def _init_worker(values, catalogs, turns):
+    global _worker_inputs
+    _worker_inputs = (values, catalogs, turns)
+
+
+def _run_seed(seed):
+    values, catalogs, turns = _worker_inputs
+    return [simulate_seed(values, catalog, turns, seed) for catalog in catalogs]
+
+
+def percentile(histogram, fraction, offset):
+    """Percentil de uma distribuição de inteiros dada pelo histograma"""
+    cumulative = np.cumsum(histogram)
+    return int(np.searchsorted(cumulative, fraction * cumulative[-1], side='left')) + offset
+
+
+def histogram_summary(histogram, offset):
+    points = np.arange(len(histogram)) + offset
+    total = histogram.sum()
+    mean = float((histogram * points).sum() / total)
+    std = float(np.sqrt((histogram * np.square(points - mean)).sum() / total))
+    summary = {'mean': round(mean, 2), 'std': round(std, 2)}
+    for value in PERCENTILES:
+        summary[f'p{value}'] = percentile(histogram, value / 100, offset)
+    return summary
+
+
+def summarize(result, churn=None):
+    """Converte histogramas (somados entre sementes) no trecho do relatório"""
+    summary = {
+        'indicators': {
+            name: histogram_summary(result['indicators'][column], MIN_INDICATOR_VALUE)
+            for column, name in enumerate(INDICATORS)
+        },
+        'general_total': histogram_summary(result['general'], MIN_GENERAL),
+        'status_shares': {
+            message: round(float(count) / float(result['status'].sum()), 4)
+            for message, count in zip(STATUS_MESSAGES, result['status'])
+        },
+    }
+    if churn is not None:
+        churn = np.asarray(churn)
+        summary['ranking_churn'] = {
+            name: {'mean': round(float(churn[:, column].mean()), 4), 'std': round(float(churn[:, column].std()), 4)}
+            for column, name in enumerate(('spearman', 'mean_rank_change', f'top{TOP_SIZE}_retention'))
+        }
+    return summary
+
+
+def difference(baseline, scenario):
+    """Diferença (cenário - base) das médias, medianas, parcelas e mudanças no ranking"""
+    return {
+        'indicators': {
+            name: {
+                'mean': round(scenario['indicators'][name]['mean'] - stats['mean'], 2),
+                'p50': scenario['indicators'][name]['p50'] - stats['p50'],
+            }
+            for name, stats in baseline['indicators'].items()
+        },
+        'general_total_mean': round(scenario['general_total']['mean'] - baseline['general_total']['mean'], 2),
+        'status_shares': {
+            message: round(scenario['status_shares'][message] - share, 4)
+            for message, share in baseline['status_shares'].items()
+        },
+        'ranking_churn': {
+            name: round(scenario['ranking_churn'][name]['mean'] - stats['mean'], 4)
+            for name, stats in baseline['ranking_churn'].items()
+        },
+    }
+
+
+def simulate(values, entries, turns=DEFAULT_TURNS, seeds=DEFAULT_SEEDS, seed=None, candidate=None, workers=1):
+    """
+    Simula `seeds` futuros de `turns` turnos para os estados em `values`
+    (n_estados x 7) com as decisões `entries` (objetos com category e
+    deltas, como as do catálogo). Com `candidate`, simula também o catálogo
+    acrescido dela, com as mesmas sementes. `workers` > 1 divide as sementes
+    entre processos.
+    """
+    values = np.asarray(values, dtype=np.int64).reshape(-1, len(INDICATORS))
+    if len(values) == 0:
+        raise ValueError('Nenhum estado para simular')
+    if turns < 1 or seeds < 1:
+        raise ValueError('turns e seeds devem ser pelo menos 1')
+
+    entries = list(entries)
+    catalogs = [CompiledCatalog(entries)]
+    if candidate is not None:
+        catalogs.append(CompiledCatalog(entries + [candidate]))
+
+    if seed is None:
+        seed = new_seed()
+    seed_sequences = np.random.SeedSequence(seed).spawn(seeds)
+
+    started = time.perf_counter()
+    if workers > 1 and seeds > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, seeds), initializer=_init_worker,
+                                 initargs=(values, catalogs, turns)) as pool:
+            results = list(pool.map(_run_seed, seed_sequences))
+    else:
+        results = [[simulate_seed(values, catalog, turns, sequence) for catalog in catalogs]
+                   for sequence in seed_sequences]
+    elapsed = time.perf_counter() - started
+
+    scenarios = []
+    for index in range(len(catalogs)):
+        per_seed = [result[index] for result in results]
+        totals = {key: sum(item[key] for item in per_seed) for key in ('indicators', 'general', 'status')}
+        scenarios.append(summarize(totals, [item['churn'] for item in per_seed]))
+
+    state_turns = len(values) * turns * seeds * len(catalogs)
+    report = {
+        'states': len(values),
+        'decisions': len(entries),
+        'turns': turns,
+        'seeds': seeds,
+        'seed': seed,
+        'workers': workers,
+        'state_turns': state_turns,
+        'elapsed_seconds': round(elapsed, 3),
+        'state_turns_per_second': round(state_turns / elapsed) if elapsed else None,
+        'current': summarize(distribution(values)),
+        'baseline': scenarios[0],
+    }
+    if candidate is not None:
+        report['candidate'] = {'title': candidate.title, 'category': candidate.category}
+        report['with_candidate'] = scenarios[1]
+        report['difference'] = difference(scenarios[0], scenarios[1])
+    return report
+
+
+def simulate_current(turns=DEFAULT_TURNS, seeds=DEFAULT_SEEDS, seed=None, candidate=None, workers=1):
+    """Simula a partir dos estados do banco e do catálogo (requer contexto da aplicação)"""
+    from src.models.catalog import decision_catalog
+    matrix = IndicatorMatrix.load()
+    return simulate(matrix.values, decision_catalog.all(), turns, seeds, seed, candidate, workers)
+
+
+def print_report(report, file=sys.stderr):
+    print(f"{report['states']} estados x {report['turns']} turnos x {report['seeds']} sementes "
+          f"= {report['state_turns']:,} estado-turnos em {report['elapsed_seconds']:.1f}s "
+          f"({report['state_turns_per_second']:,}/s, {report['workers']} processos, semente {report['seed']})",
+          file=file)
+    scenarios = [('hoje', report['current']), ('base', report['baseline'])]
+    if 'with_candidate' in report:
+        scenarios.append((f"com '{report['candidate']['title']}'", report['with_candidate']))
+
+    for label, summary in scenarios:
+        print(f'\n[{label}]', file=file)
+        for name, stats in summary['indicators'].items():
+            print(f"  {name:<13} média {stats['mean']:6.2f}  p5 {stats['p5']:3d}  p50 {stats['p50']:3d}  "
+                  f"p95 {stats['p95']:3d}", file=file)
+        for message, share in summary['status_shares'].items():
+            print(f'  {share * 100:5.1f}%  {message}', file=file)
+        churn = summary.get('ranking_churn')
+        if churn:
+            print('  ranking geral: ' + ', '.join(f"{name} {stats['mean']:.3f}" for name, stats in churn.items()),
+                  file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simula turnos futuros de todos os estados (Monte Carlo)')
+    parser.add_argument('--turns', type=int, default=DEFAULT_TURNS, help='turnos simulados por estado')
+    parser.add_argument('--seeds', type=int, default=DEFAULT_SEEDS, help='quantidade de futuros simulados')
+    parser.add_argument('--seed', type=int, help='semente base (padrão: aleatória, informada no relatório)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processos (padrão: CPUs)')
+    parser.add_argument('--decision', help='arquivo JSON com uma decisão hipotética a comparar')
+    parser.add_argument('--output', help='grava o relatório completo em JSON')
+    args = parser.parse_args(argv)
+
+    candidate = None
+    if args.decision:
+        with open(args.decision, encoding='utf-8') as source:
+            candidate = CandidateDecision.from_dict(json.load(source))
+
+    from src.archive import create_cli_app
+    app = create_cli_app()
+    with app.app_context():
+        report = simulate_current(args.turns, args.seeds, args.seed, candidate, args.workers)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
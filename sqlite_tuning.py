@@ -0,0 +1,34 @@
+"""
+Ajustes do SQLite - BrasilSim
+Abre as conexões SQLite em modo WAL, para que leituras (rankings) não fiquem
+bloqueadas por escritas (decisões), com timeout de espera por lock e nível
+de sincronização configuráveis.
+"""
+from sqlalchemy import event
+
+# Padrões usados quando a configuração da aplicação não define os valores
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_SYNCHRONOUS = 'NORMAL'
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def configure_sqlite(engine, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS,
+                     synchronous=DEFAULT_SYNCHRONOUS, wal=True):
+    """Aplica os PRAGMAs em toda conexão nova do engine (ignora outros bancos)"""
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    synchronous = synchronous.upper()
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f'Nível de synchronous inválido: {synchronous}')
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if wal:
+            cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.close()
+
+    return True
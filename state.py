@@ -1,7 +1,74 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+from sqlalchemy import case
+from sqlalchemy.sql.expression import Grouping
+from sqlalchemy.orm.exc import StaleDataError
 from . import db
 
+# Indicadores do estado, na ordem em que aparecem na tabela
+INDICATORS = ('economy', 'education', 'health', 'security', 'culture', 'satisfaction', 'corruption')
+
+# Valor inicial de cada indicador de um estado novo
+INITIAL_INDICATOR_VALUE = 50
+
+# Limites de cada indicador
+MIN_INDICATOR_VALUE = 0
+MAX_INDICATOR_VALUE = 100
+
+# Intervalo entre decisões mostrado na administração (a API não o exige)
+DECISION_COOLDOWN = timedelta(hours=24)
+
+# Quantidade de eventos recentes considerados na pontuação de crescimento
+GROWTH_WINDOW = 3
+
+# Indicadores da mensagem de status e (média mínima, mensagem), da melhor para a pior
+STATUS_INDICATORS = ('satisfaction', 'economy', 'education', 'health')
+STATUS_LEVELS = (
+    (80, "Seu povo está feliz da vida! 🎉"),
+    (60, "As coisas estão indo bem por aí! 👍"),
+    (40, "O povo está meio desconfiado... 🤔"),
+    (20, "Seu povo tá pistola com você! 😠"),
+    (None, "Revolução à vista! Cuidado! 🔥"),
+)
+
+def clamp_indicator(value):
+    """Corta um valor nos limites dos indicadores"""
+    return max(MIN_INDICATOR_VALUE, min(MAX_INDICATOR_VALUE, value))
+
+def clamped_sql(expression):
+    """Mesmo corte de clamp_indicator, como expressão SQL (CASE, portável)"""
+    return case(
+        (expression < MIN_INDICATOR_VALUE, MIN_INDICATOR_VALUE),
+        (expression > MAX_INDICATOR_VALUE, MAX_INDICATOR_VALUE),
+        else_=expression
+    )
+
+def balance_score(indicators):
+    """Calcula pontuação de equilíbrio (menor desvio padrão = mais equilibrado)"""
+    values = [indicators[indicator] for indicator in INDICATORS if indicator != 'corruption']
+    
+    mean = sum(values) / len(values)
+    variance = sum((x - mean) ** 2 for x in values) / len(values)
+    std_dev = variance ** 0.5
+    
+    # Inverter para que menor desvio = maior pontuação
+    return round(100 - std_dev, 1)
+
+def growth_score(recent_deltas):
+    """Calcula pontuação de crescimento a partir das variações dos últimos eventos"""
+    if len(recent_deltas) < 2:
+        return 0
+    
+    total_positive_effects = 0
+    for deltas in recent_deltas:
+        for indicator, change in deltas.items():
+            if indicator != 'corruption' and change > 0:
+                total_positive_effects += change
+            elif indicator == 'corruption' and change < 0:
+                total_positive_effects += abs(change)
+    
+    return total_positive_effects
+
 class State(db.Model):
     """
     Modelo de Estado - representa um estado fictício criado pelo jogador
@@ -14,19 +81,35 @@ class State(db.Model):
     government_type = db.Column(db.String(50), nullable=False)
     
     # Indicadores do estado (0-100)
-    economy = db.Column(db.Integer, default=50)
-    education = db.Column(db.Integer, default=50)
-    health = db.Column(db.Integer, default=50)
-    security = db.Column(db.Integer, default=50)
-    culture = db.Column(db.Integer, default=50)
-    satisfaction = db.Column(db.Integer, default=50)
-    corruption = db.Column(db.Integer, default=50)
+    economy = db.Column(db.Integer, default=INITIAL_INDICATOR_VALUE)
+    education = db.Column(db.Integer, default=INITIAL_INDICATOR_VALUE)
+    health = db.Column(db.Integer, default=INITIAL_INDICATOR_VALUE)
+    security = db.Column(db.Integer, default=INITIAL_INDICATOR_VALUE)
+    culture = db.Column(db.Integer, default=INITIAL_INDICATOR_VALUE)
+    satisfaction = db.Column(db.Integer, default=INITIAL_INDICATOR_VALUE)
+    corruption = db.Column(db.Integer, default=INITIAL_INDICATOR_VALUE)
     
     # Metadados
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_decision = db.Column(db.DateTime, default=datetime.utcnow)
     decisions_count = db.Column(db.Integer, default=0)
     
+    # Pontuações derivadas, recalculadas a cada alteração do estado
+    balance_score = db.Column(db.Float, default=100.0)
+    growth_score = db.Column(db.Integer, default=0)
+    
+    # Agenda de decisões (ver scheduler.py): semente, posição da decisão atual
+    # na sequência do estado e fila de ids das próximas (a primeira é a atual)
+    decision_seed = db.Column(db.Integer)
+    decision_position = db.Column(db.Integer, nullable=False, default=0)
+    decision_queue = db.Column(db.String(200))
+    
+    # Versão da linha (controle de concorrência otimista): toda escrita
+    # incrementa o valor e só é aplicada se a versão lida ainda for a atual
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    __mapper_args__ = {'version_id_col': version}
+    
     def __init__(self, name, region, government_type):
         self.name = name
         self.region = region
@@ -58,26 +141,111 @@ class State(db.Model):
         for indicator, change in effects.items():
             if hasattr(self, indicator):
                 current_value = getattr(self, indicator)
-                new_value = max(0, min(100, current_value + change))
+                new_value = clamp_indicator(current_value + change)
                 setattr(self, indicator, new_value)
         
         self.last_decision = datetime.utcnow()
         self.decisions_count += 1
     
+    @staticmethod
+    def snapshot(state_id):
+        """
+        Lê (versão, indicadores, agenda) direto do banco, ou None se o estado
+        não existir. A agenda é (semente, posição, ids da fila).
+        """
+        from .scheduler import decode_queue
+        row = db.session.query(
+            State.version, State.decision_seed, State.decision_position, State.decision_queue,
+            *[getattr(State, name) for name in INDICATORS]
+        ).filter(State.id == state_id).first()
+        if row is None:
+            return None
+        return row[0], dict(zip(INDICATORS, row[4:])), (row[1], row[2], decode_queue(row[3]))
+    
+    def get_schedule(self):
+        """Agenda de decisões gravada: (semente, posição, ids da fila)"""
+        from .scheduler import decode_queue
+        return self.decision_seed, self.decision_position, decode_queue(self.decision_queue)
+    
+    def set_schedule(self, schedule):
+        from .scheduler import encode_queue
+        self.decision_seed, self.decision_position, queue = schedule
+        self.decision_queue = encode_queue(queue)
+    
+    @staticmethod
+    def apply_delta_atomic(state_id, version, before, delta, decision_id, option_index, schedule=None):
+        """
+        Aplica o vetor de efeitos `delta` (alinhado a INDICATORS, ver
+        engine.compile_effects) com um UPDATE condicional: a soma e o corte em 0..100
+        são feitos no SQL, e a linha só é alterada se ainda estiver na versão
+        `version` (lida junto com `before`). Registra o evento na mesma
+        transação e retorna os indicadores resultantes; se outra escrita chegou
+        antes, levanta StaleDataError (desfazer a transação e tentar de novo).
+        Com `schedule`, grava também a nova agenda de decisões.
+        """
+        from .decision_event import DecisionEvent
+        from .scheduler import encode_queue
+        changes = {name: change for name, change in zip(INDICATORS, delta) if change}
+        after = dict(before)
+        for name, change in changes.items():
+            after[name] = clamp_indicator(before[name] + change)
+        
+        now = datetime.utcnow()
+        DecisionEvent.record_many([
+            DecisionEvent.row(state_id, decision_id, option_index, before, after, now)
+        ])
+        # Só os últimos eventos, pelo índice: o custo não cresce com o histórico
+        recent = DecisionEvent.latest_deltas(state_id, GROWTH_WINDOW)
+        
+        values = {name: clamped_sql(State.__table__.c[name] + change) for name, change in changes.items()}
+        if schedule is not None:
+            values['decision_seed'], values['decision_position'], queue = schedule
+            values['decision_queue'] = encode_queue(queue)
+        
+        table = State.__table__
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == state_id, table.c.version == version)
+            .values(
+                last_decision=now,
+                decisions_count=table.c.decisions_count + 1,
+                version=table.c.version + 1,
+                balance_score=balance_score(after),
+                growth_score=growth_score(recent),
+                **values
+            )
+        )
+        if result.rowcount != 1:
+            raise StaleDataError(f'Estado {state_id} alterado por outra requisição')
+        return after
+    
+    def get_indicators(self):
+        """Retorna os indicadores atuais como dicionário"""
+        return {indicator: getattr(self, indicator) for indicator in INDICATORS}
+    
+    def refresh_scores(self):
+        """Recalcula as pontuações derivadas (usar após registrar o evento)"""
+        from .decision_event import DecisionEvent
+        self.balance_score = balance_score(self.get_indicators())
+        recent = DecisionEvent.history(self.id, GROWTH_WINDOW)
+        self.growth_score = growth_score([event.deltas for event in recent])
+    
+    def get_decisions_history(self, limit=None):
+        """Retorna os eventos de decisão do estado, do mais antigo ao mais recente"""
+        from .decision_event import DecisionEvent
+        return [event.to_dict() for event in DecisionEvent.history(self.id, limit)]
+    
+    def can_make_decision(self):
+        """Indica se já passou DECISION_COOLDOWN desde a última decisão"""
+        return self.last_decision is None or datetime.utcnow() - self.last_decision >= DECISION_COOLDOWN
+    
     def get_status_message(self):
         """Retorna uma mensagem de status baseada nos indicadores"""
-        avg_satisfaction = (self.satisfaction + self.economy + self.education + self.health) / 4
+        avg_satisfaction = sum(getattr(self, name) for name in STATUS_INDICATORS) / len(STATUS_INDICATORS)
         
-        if avg_satisfaction >= 80:
-            return "Seu povo está feliz da vida! 🎉"
-        elif avg_satisfaction >= 60:
-            return "As coisas estão indo bem por aí! 👍"
-        elif avg_satisfaction >= 40:
-            return "O povo está meio desconfiado... 🤔"
-        elif avg_satisfaction >= 20:
-            return "Seu povo tá pistola com você! 😠"
-        else:
-            return "Revolução à vista! Cuidado! 🔥"
+        for minimum, message in STATUS_LEVELS:
+            if minimum is None or avg_satisfaction >= minimum:
+                return message
     
     @staticmethod
     def get_regions():
@@ -101,3 +269,23 @@ class State(db.Model):
             'Autoritarismo'
         ]
 
+
+# Total usado no ranking geral, calculado no banco (ver leaderboard.general_total)
+GENERAL_TOTAL = (
+    State.economy + State.education + State.health + State.security
+    + State.culture + State.satisfaction - State.corruption
+)
+
+# Índices das consultas frequentes (bancos antigos: ver migrations.py)
+# - um por indicador: listas ordenadas por ele (ORDER BY indicador DESC, id LIMIT)
+# - por governo e total geral: top 5 de cada estilo de governo
+# - região, governo e colunas agregadas: estatísticas sem ler a tabela
+STATE_INDEXES = [
+    db.Index(f'ix_states_{indicator}', getattr(State, indicator).desc(), State.id)
+    for indicator in INDICATORS
+] + [
+    # Expressões em índices precisam de parênteses no PostgreSQL
+    db.Index('ix_states_government_general', State.government_type, Grouping(GENERAL_TOTAL).desc(), State.id),
+    db.Index('ix_states_region_government', State.region, State.government_type, State.decisions_count,
+             *[getattr(State, indicator) for indicator in INDICATORS]),
+]
@@ -1,9 +1,91 @@
-from flask import Blueprint, request, jsonify
-from src.models import db, State, Decision
+from flask import Blueprint, current_app, request, jsonify
+from src.models import db, State, Decision, DecisionEvent
+from src.models.state import INDICATORS, GROWTH_WINDOW, balance_score, growth_score
+from src.models.leaderboard import leaderboard, CATEGORIES
+from src.models.catalog import decision_catalog
+from src.models.scheduler import decision_scheduler
+from src.models.engine import IndicatorMatrix, compile_effects
+from src.models.write_behind import write_behind, exclusive_write
+from src.models.sharding import next_state_id
+from src.routes.response_cache import response_cache, cached_response
+from src.routes.live import live_feed
+from src.routes.serialization import state_json, decision_json, json_response, stream_json
+from sqlalchemy import bindparam, and_, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from collections import Counter
 from datetime import datetime, timedelta
+import base64
+import json
+import random
+import time
 
 states_bp = Blueprint('states', __name__)
 
+# Quantidade máxima de decisões aceitas em um único lote
+MAX_BATCH_SIZE = 1000
+
+# Paginação de GET /states
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+ORDERABLE_FIELDS = ('id',) + INDICATORS
+LISTABLE_FIELDS = ('id', 'name', 'region', 'government_type') + INDICATORS + (
+    'created_at', 'last_decision', 'decisions_count'
+)
+
+# Colunas gravadas pelo UPDATE em lote de /states/decisions/batch
+BATCH_WRITTEN = INDICATORS + ('balance_score', 'growth_score')
+
+# Escritas concorrentes no mesmo estado: tentativas e espera entre elas.
+# Só depois de MAX_WRITE_ATTEMPTS conflitos seguidos a rota responde 409.
+MAX_WRITE_ATTEMPTS = 10
+RETRY_BASE_DELAY = 0.005  # segundos; dobra a cada tentativa, com variação aleatória
+RETRY_MAX_DELAY = 0.2  # teto da espera entre duas tentativas
+# Lotes que perderam tantas tentativas seguem com os estados travados (lock_states)
+BATCH_LOCK_AFTER = 2
+
+# Trechos das mensagens do banco que indicam um conflito passageiro
+TRANSIENT_ERRORS = ('locked', 'deadlock', 'could not serialize')
+
+def is_write_conflict(error):
+    """Indica se o erro é uma escrita concorrente que vale repetir"""
+    if isinstance(error, StaleDataError):
+        return True
+    return isinstance(error, OperationalError) and any(
+        text in str(error.orig).lower() for text in TRANSIENT_ERRORS
+    )
+
+def with_write_retry(write):
+    """
+    Executa `write(tentativa)`, que deve terminar em commit. Em conflito,
+    desfaz a transação e repete até MAX_WRITE_ATTEMPTS vezes, com espera
+    exponencial (limitada a RETRY_MAX_DELAY) e aleatória, para que as
+    requisições em conflito não voltem todas juntas; depois disso o erro é
+    repassado.
+    """
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        try:
+            return write(attempt)
+        except (StaleDataError, OperationalError) as error:
+            db.session.rollback()
+            if not is_write_conflict(error) or attempt == MAX_WRITE_ATTEMPTS - 1:
+                raise
+            delay = min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+def lock_states(state_ids):
+    """
+    Trava as linhas dos estados até o commit com um UPDATE que não muda nada
+    (no SQLite, pega a trava de escrita do banco). Lido depois disso, o estado
+    não pode mais ser alterado por outra requisição antes da gravação.
+    """
+    table = State.__table__
+    db.session.execute(table.update().where(table.c.id.in_(list(state_ids))).values(version=table.c.version))
+
+def conflict_response():
+    """409: o conflito persistiu em todas as tentativas; nada foi gravado e o cliente pode repetir"""
+    return jsonify({'error': 'O estado foi alterado por outra requisição. Tente novamente.'}), 409
+
 @states_bp.route('/states', methods=['POST'])
 def create_state():
     """Cria um novo estado"""
@@ -26,21 +108,38 @@ def create_state():
         if data['government_type'] not in State.get_government_types():
             return jsonify({'error': 'Tipo de governo inválido.'}), 400
         
+        # No modo em shards, este processo só guarda os estados da sua região
+        shard = current_app.config.get('SHARD_REGION')
+        if shard is not None and data['region'] != shard:
+            return jsonify({'error': f'Este shard atende apenas a região {shard}.'}), 400
+        
+        # Semente opcional da agenda de decisões (partidas reproduzíveis)
+        seed = data.get('seed')
+        if seed is not None and (type(seed) is not int or not 0 <= seed < 2 ** 31):
+            return jsonify({'error': 'Semente inválida. Use um inteiro entre 0 e 2147483647.'}), 400
+        
         # Cria o estado
         state = State(
             name=data['name'],
             region=data['region'],
             government_type=data['government_type']
         )
+        state.set_schedule(decision_scheduler.ensure(seed, 0, []))
+        if shard is not None:
+            # Id na faixa da região: o roteador acha o shard pelo id
+            state.id = next_state_id(shard)
         
         db.session.add(state)
         db.session.commit()
+        leaderboard.update(state)
+        response_cache.bump()
+        live_feed.changed(state.id)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': f'Estado {state.name} criado com sucesso!',
-            'state': state.to_dict()
-        }), 201
+            'state': state_json(state)
+        }, 201)
         
     except Exception as e:
         db.session.rollback()
@@ -50,98 +149,419 @@ def create_state():
 def get_state(state_id):
     """Busca um estado pelo ID"""
     try:
-        state = State.query.get(state_id)
+        # Com a escrita adiada, a cópia em memória pode estar à frente do banco
+        state = (write_behind.enabled and write_behind.cached(state_id)) or db.session.get(State, state_id)
         if not state:
             return jsonify({'error': 'Estado não encontrado.'}), 404
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'state': state.to_dict(),
+            'state': state_json(state),
             'status_message': state.get_status_message()
         })
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+def encode_cursor(values):
+    """Codifica a posição da última linha de uma página em um cursor opaco"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decodifica um cursor gerado por encode_cursor"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
 @states_bp.route('/states', methods=['GET'])
 def list_states():
-    """Lista todos os estados"""
+    """Lista os estados em páginas (paginação por cursor)"""
     try:
-        states = State.query.all()
-        return jsonify({
+        # Tamanho da página, sempre limitado
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'Parâmetro limit inválido.'}), 400
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        # Ordenação: por id ou por qualquer indicador
+        order_by = request.args.get('order_by', 'id')
+        if order_by not in ORDERABLE_FIELDS:
+            return jsonify({'error': f'Ordenação inválida. Válidas: {", ".join(ORDERABLE_FIELDS)}'}), 400
+        
+        default_order = 'asc' if order_by == 'id' else 'desc'
+        order = request.args.get('order', default_order)
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': 'Parâmetro order deve ser asc ou desc.'}), 400
+        
+        # Projeção de campos
+        fields = request.args.get('fields')
+        if fields:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+            invalid = [field for field in fields if field not in LISTABLE_FIELDS]
+            if invalid:
+                return jsonify({'error': f'Campos inválidos: {", ".join(invalid)}'}), 400
+        else:
+            fields = list(LISTABLE_FIELDS)
+        
+        columns = ['id'] + [field for field in fields if field != 'id']
+        if order_by not in columns:
+            columns.append(order_by)
+        
+        sort_column = getattr(State, order_by)
+        query = db.session.query(*[getattr(State, column) for column in columns])
+        
+        # Continua a partir do cursor (valor da ordenação, id da última linha)
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                last_value, last_id = decode_cursor(cursor)
+            except (ValueError, TypeError):
+                return jsonify({'error': 'Cursor inválido.'}), 400
+            if order_by == 'id':
+                query = query.filter(State.id > last_id if order == 'asc' else State.id < last_id)
+            else:
+                after_value = sort_column > last_value if order == 'asc' else sort_column < last_value
+                # O limite com igualdade é redundante, mas deixa o banco buscar
+                # direto a posição do cursor no índice do indicador
+                from_value = sort_column >= last_value if order == 'asc' else sort_column <= last_value
+                same_value_after = State.id < last_id if order == 'asc' else State.id > last_id
+                query = query.filter(from_value, or_(after_value, and_(sort_column == last_value, same_value_after)))
+        
+        if order_by == 'id':
+            query = query.order_by(State.id.asc() if order == 'asc' else State.id.desc())
+        else:
+            # A ordem crescente é o inverso exato da decrescente (empates com o id
+            # decrescente): as duas percorrem o mesmo índice (indicador DESC, id),
+            # uma em cada sentido, sem ordenar linhas à parte
+            if order == 'asc':
+                query = query.order_by(sort_column.asc(), State.id.desc())
+            else:
+                query = query.order_by(sort_column.desc(), State.id.asc())
+        
+        # Uma linha a mais indica se existe próxima página; as linhas são lidas
+        # e enviadas aos poucos, e o cursor vai no fim da resposta
+        page = {'count': 0, 'last': None, 'has_more': False}
+        
+        def serialize(query):
+            # A sessão da view é fechada quando ela retorna; a consulta roda na
+            # sessão ativa durante o envio
+            for row in query.with_session(db.session()):
+                if page['count'] == limit:
+                    page['has_more'] = True
+                    break
+                record = dict(zip(columns, row))
+                state = {}
+                indicators = {}
+                for field in fields:
+                    value = record[field]
+                    if field in INDICATORS:
+                        indicators[field] = value
+                    elif isinstance(value, datetime):
+                        state[field] = value.isoformat()
+                    else:
+                        state[field] = value
+                state['id'] = record['id']
+                if indicators:
+                    state['indicators'] = indicators
+                page['count'] += 1
+                page['last'] = record
+                yield state
+        
+        def tail():
+            next_cursor = None
+            if page['has_more']:
+                next_cursor = encode_cursor([page['last'][order_by], page['last']['id']])
+            return {'count': page['count'], 'next_cursor': next_cursor}
+        
+        return stream_json('states', serialize(query.limit(limit + 1)), head={
             'success': True,
-            'states': [state.to_dict() for state in states],
-            'total': len(states)
-        })
+            'total': len(leaderboard),
+            'limit': limit,
+            'order_by': order_by,
+            'order': order
+        }, tail=tail)
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 @states_bp.route('/states/<int:state_id>/decision', methods=['POST'])
 def apply_decision(state_id):
-    """Aplica uma decisão ao estado"""
+    """
+    Aplica uma decisão ao estado. Escritas concorrentes no mesmo estado são
+    repetidas (with_write_retry); se o conflito persistir, responde 409 sem
+    gravar nada, e o cliente pode reenviar a mesma requisição.
+    """
     try:
         data = request.get_json()
         
         if not data or 'option_index' not in data:
             return jsonify({'error': 'Índice da opção é obrigatório.'}), 400
         
-        state = State.query.get(state_id)
-        if not state:
-            return jsonify({'error': 'Estado não encontrado.'}), 404
+        option_index = data['option_index']
+        requested_id = data.get('decision_id')
         
         # Verifica cooldown (opcional - pode ser removido para testes)
         # if state.last_decision and datetime.utcnow() - state.last_decision < timedelta(hours=1):
         #     return jsonify({'error': 'Você deve aguardar antes de tomar outra decisão.'}), 429
         
-        # Busca uma decisão (do banco ou padrão)
-        decision = Decision.get_random_decision()
+        # (resultado, decisão, efeitos da opção, agenda seguinte) para a agenda lida
+        def choose(schedule):
+            # A decisão aplicada é a atual da agenda do estado (a mesma mostrada em current-decision)
+            schedule = decision_scheduler.ensure(*schedule)
+            decision = decision_catalog.get(schedule[2][0]) if schedule[2] else None
+            next_schedule = None
+            if decision is None:
+                # Sem decisões no banco: decisão padrão, fora da agenda
+                decision = Decision.get_default_decision()
+            else:
+                next_schedule = decision_scheduler.advance(*schedule)
+            
+            if requested_id is not None and requested_id != decision.id:
+                return 'other_decision', decision, None, None
+            if not isinstance(option_index, int) or option_index < 0 or option_index >= len(decision.options):
+                return 'invalid_option', decision, None, None
+            deltas = getattr(decision, 'deltas', None) or compile_effects(decision.options)
+            return 'applied', decision, deltas[option_index], next_schedule
         
-        option_index = data['option_index']
-        if option_index < 0 or option_index >= len(decision.options):
+        if write_behind.enabled:
+            # Aplica na cópia em memória; o banco é gravado em lote depois
+            outcome, decision, state = write_behind.apply_decision(state_id, option_index, choose)
+        else:
+            current = State.snapshot(state_id)
+            if current is None:
+                return jsonify({'error': 'Estado não encontrado.'}), 404
+            
+            def write(attempt):
+                snapshot = current if attempt == 0 else State.snapshot(state_id)
+                if snapshot is None:
+                    return 'not_found', None
+                version, before, schedule = snapshot
+                outcome, decision, delta, next_schedule = choose(schedule)
+                if delta is None:
+                    return outcome, decision
+                
+                # Aplica os efeitos da decisão com um UPDATE condicional à versão lida
+                State.apply_delta_atomic(
+                    state_id, version, before, delta, decision.id, option_index, next_schedule
+                )
+                db.session.commit()
+                return outcome, decision
+            
+            outcome, decision = with_write_retry(write)
+            state = db.session.get(State, state_id) if outcome == 'applied' else None
+        
+        if outcome == 'not_found':
+            return jsonify({'error': 'Estado não encontrado.'}), 404
+        if outcome == 'other_decision':
+            return json_response({
+                'error': 'A decisão informada não é a decisão atual do estado.',
+                'decision': decision_json(decision)
+            }, 409)
+        if outcome == 'invalid_option':
             return jsonify({'error': 'Opção inválida.'}), 400
         
-        # Aplica os efeitos da decisão
         chosen_option = decision.options[option_index]
-        effects = chosen_option.get('effects', {})
         
-        state.apply_decision_effects(effects)
-        db.session.commit()
+        leaderboard.update(state)
+        response_cache.bump()
+        live_feed.changed(state_id)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': 'Decisão aplicada com sucesso!',
-            'decision': decision.to_dict(),
+            'decision': decision_json(decision),
             'chosen_option': chosen_option,
-            'state': state.to_dict(),
+            'state': state_json(state),
             'status_message': state.get_status_message()
         })
         
     except Exception as e:
         db.session.rollback()
+        if is_write_conflict(e):
+            return conflict_response()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@states_bp.route('/states/decisions/batch', methods=['POST'])
+@exclusive_write
+def apply_decisions_batch():
+    """
+    Aplica várias decisões (de vários estados) em uma única transação. Como
+    em apply_decision, um conflito que persiste após as tentativas responde
+    409 e nenhum item do lote é gravado.
+    """
+    try:
+        data = request.get_json()
+        
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Lista de itens é obrigatória.'}), 400
+        
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'No máximo {MAX_BATCH_SIZE} itens por lote.'}), 400
+        
+        started = time.perf_counter()
+        
+        def write(attempt):
+            # Carrega os indicadores (e versões) de todos os estados envolvidos em uma consulta
+            state_ids = {item.get('state_id') for item in items if isinstance(item, dict)}
+            if attempt >= BATCH_LOCK_AFTER:
+                # Um lote toca vários estados e perde a corrida para as decisões
+                # individuais; depois de algumas tentativas, trava antes de ler
+                lock_states(state_id for state_id in state_ids if isinstance(state_id, int))
+            matrix = IndicatorMatrix.load(state_ids)
+            
+            # Valida os itens e monta os vetores de efeito
+            results = []
+            valid = []
+            rows = []
+            deltas = []
+            for item in items:
+                if not isinstance(item, dict):
+                    results.append({'success': False, 'error': 'Item inválido.'})
+                    continue
+                
+                state_id = item.get('state_id')
+                if state_id not in matrix:
+                    results.append({'state_id': state_id, 'success': False, 'error': 'Estado não encontrado.'})
+                    continue
+                
+                decision = decision_catalog.get(item.get('decision_id'))
+                if decision is None:
+                    results.append({'state_id': state_id, 'success': False, 'error': 'Decisão não encontrada.'})
+                    continue
+                
+                option_index = item.get('option_index')
+                if not isinstance(option_index, int) or option_index < 0 or option_index >= len(decision.deltas):
+                    results.append({'state_id': state_id, 'success': False, 'error': 'Opção inválida.'})
+                    continue
+                
+                valid.append(len(results))
+                rows.append(matrix.row_of(state_id))
+                deltas.append(decision.deltas[option_index])
+                results.append({'state_id': state_id, 'success': True, 'decision_id': decision.id})
+            
+            # Soma e corte vetorizados, com as mesmas regras de State.apply_decision_effects
+            initial = matrix.values.copy()
+            after = matrix.apply(rows, deltas)
+            
+            # Eventos do histórico: variação de cada item em relação ao anterior do mesmo estado
+            now = datetime.utcnow()
+            previous = {}
+            events = []
+            for position, row, values in zip(valid, rows, after.tolist()):
+                result = results[position]
+                result['indicators'] = dict(zip(INDICATORS, values))
+                before = previous.get(row)
+                if before is None:
+                    before = initial[row].tolist()
+                previous[row] = values
+                item = items[position]
+                events.append(DecisionEvent.row(
+                    result['state_id'], result['decision_id'], item['option_index'], before, values, now
+                ))
+            
+            if not valid:
+                return results, []
+            
+            # Um único UPDATE em lote, um INSERT em lote de eventos e um único commit
+            DecisionEvent.record_many(events)
+            
+            # Pontuações derivadas só dos estados tocados pelo lote
+            applied_count = Counter(results[position]['state_id'] for position in valid)
+            recent = DecisionEvent.recent_deltas(applied_count, GROWTH_WINDOW)
+            mappings = []
+            for state_id, times in applied_count.items():
+                mapping = matrix.indicators(state_id)
+                mapping['balance_score'] = balance_score(mapping)
+                mapping['growth_score'] = growth_score(recent[state_id])
+                mapping['_id'] = state_id
+                mapping['_version'] = matrix.versions[state_id]
+                mapping['_times'] = times
+                mappings.append(mapping)
+            
+            # Cada linha só é gravada se ainda estiver na versão lida acima
+            table = State.__table__
+            statement = table.update().where(
+                table.c.id == bindparam('_id'), table.c.version == bindparam('_version')
+            ).values(
+                last_decision=now,
+                decisions_count=table.c.decisions_count + bindparam('_times'),
+                version=table.c.version + 1,
+                **{name: bindparam(name) for name in BATCH_WRITTEN}
+            )
+            updated = db.session.execute(statement, mappings).rowcount
+            if db.session.get_bind().dialect.supports_sane_multi_rowcount and updated != len(mappings):
+                raise StaleDataError('Estados do lote alterados por outra requisição')
+            db.session.commit()
+            return results, mappings
+        
+        results, mappings = with_write_retry(write)
+        for mapping in mappings:
+            leaderboard.update_values(mapping['_id'], {name: mapping[name] for name in BATCH_WRITTEN})
+        if mappings:
+            response_cache.bump()
+            live_feed.changed(*(mapping['_id'] for mapping in mappings))
+        
+        elapsed = time.perf_counter() - started
+        applied = sum(1 for result in results if result['success'])
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'applied': applied,
+            'failed': len(results) - applied,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'items_per_second': round(len(items) / elapsed, 1) if elapsed > 0 else None
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        if is_write_conflict(e):
+            return conflict_response()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 @states_bp.route('/states/<int:state_id>/current-decision', methods=['GET'])
 def get_current_decision(state_id):
-    """Busca uma decisão atual para o estado"""
+    """Retorna a decisão atual do estado (a primeira da sua agenda)"""
     try:
-        state = State.query.get(state_id)
+        # A decisão atual é a primeira da agenda; estados sem agenda (ou com
+        # decisões que saíram do catálogo) ganham uma nova, gravada aqui (ou
+        # na cópia em memória, com a escrita adiada)
+        def scheduled_state(attempt):
+            state = db.session.get(State, state_id)
+            if state is None:
+                return None
+            schedule = state.get_schedule()
+            valid = decision_scheduler.ensure(*schedule)
+            if valid != schedule:
+                state.set_schedule(valid)
+                db.session.commit()
+            return state
+        
+        if write_behind.enabled:
+            state = write_behind.get(state_id)
+        else:
+            state = with_write_retry(scheduled_state)
         if not state:
             return jsonify({'error': 'Estado não encontrado.'}), 404
         
-        # Busca uma decisão aleatória
-        decision = Decision.get_random_decision()
+        queue = state.get_schedule()[2]
+        decision = decision_catalog.get(queue[0]) if queue else None
+        if decision is None:
+            decision = Decision.get_default_decision()
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'decision': decision.to_dict(),
-            'state': state.to_dict()
+            'decision': decision_json(decision),
+            'state': state_json(state)
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
 @states_bp.route('/regions', methods=['GET'])
+@cached_response
 def get_regions():
     """Retorna as regiões disponíveis"""
     return jsonify({
@@ -150,6 +570,7 @@ def get_regions():
     })
 
 @states_bp.route('/government-types', methods=['GET'])
+@cached_response
 def get_government_types():
     """Retorna os tipos de governo disponíveis"""
     return jsonify({
@@ -158,67 +579,47 @@ def get_government_types():
     })
 
 @states_bp.route('/rankings', methods=['GET'])
+@cached_response
 def get_rankings():
     """Retorna os rankings dos estados"""
     try:
-        states = State.query.all()
+        total_states = len(leaderboard)
         
-        if not states:
+        if not total_states:
             return jsonify({
                 'success': True,
                 'rankings': {},
                 'message': 'Nenhum estado encontrado.'
             })
         
-        # Calcula diferentes rankings
-        rankings = {
-            'economia': sorted(states, key=lambda s: s.economy, reverse=True)[:10],
-            'educacao': sorted(states, key=lambda s: s.education, reverse=True)[:10],
-            'saude': sorted(states, key=lambda s: s.health, reverse=True)[:10],
-            'seguranca': sorted(states, key=lambda s: s.security, reverse=True)[:10],
-            'cultura': sorted(states, key=lambda s: s.culture, reverse=True)[:10],
-            'satisfacao': sorted(states, key=lambda s: s.satisfaction, reverse=True)[:10],
-            'menos_corrupto': sorted(states, key=lambda s: s.corruption)[:10],
-            'geral': sorted(states, key=lambda s: (s.economy + s.education + s.health + s.security + s.culture + s.satisfaction - s.corruption) / 6, reverse=True)[:10]
+        # Top 10 de cada categoria direto do índice em memória
+        tops = {category: leaderboard.top(category, 10) for category in CATEGORIES}
+        
+        # Carrega e serializa cada estado vencedor uma única vez
+        state_ids = {state_id for entries in tops.values() for state_id, _ in entries}
+        states_by_id = {
+            state.id: state_json(state)
+            for state in State.query.filter(State.id.in_(state_ids)).all()
         }
         
         # Converte para formato JSON
         rankings_json = {}
-        for category, state_list in rankings.items():
-            rankings_json[category] = []
-            for i, state in enumerate(state_list):
-                # Calcula o score baseado na categoria
-                if category == 'economia':
-                    score = state.economy
-                elif category == 'educacao':
-                    score = state.education
-                elif category == 'saude':
-                    score = state.health
-                elif category == 'seguranca':
-                    score = state.security
-                elif category == 'cultura':
-                    score = state.culture
-                elif category == 'satisfacao':
-                    score = state.satisfaction
-                elif category == 'menos_corrupto':
-                    score = state.corruption
-                elif category == 'geral':
-                    score = round((state.economy + state.education + state.health + state.security + state.culture + state.satisfaction - state.corruption) / 6, 1)
-                else:
-                    score = 0
-                
-                rankings_json[category].append({
+        for category, entries in tops.items():
+            rankings_json[category] = [
+                {
                     'position': i + 1,
-                    'state': state.to_dict(),
+                    'state': states_by_id[state_id],
                     'score': score
-                })
+                }
+                for i, (state_id, score) in enumerate(entries)
+                if state_id in states_by_id
+            ]
         
-        return jsonify({
+        return json_response({
             'success': True,
             'rankings': rankings_json,
-            'total_states': len(states)
+            'total_states': total_states
         })
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
-
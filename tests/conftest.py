@@ -0,0 +1,98 @@
+"""
+Configuração dos testes - BrasilSim
+
+Os módulos Python ficam na raiz do repositório, mas a aplicação os importa
+como o pacote `src` (src.main, src.models.*, src.routes.*). Antes de
+importar qualquer um, os testes montam esse pacote em uma pasta temporária
+com links para os arquivos da raiz.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Arquivo da raiz -> módulo do pacote src
+MODELS = (
+    'state.py', 'decision.py', 'decision_event.py', 'leaderboard.py', 'catalog.py', 'engine.py',
+    'sqlite_tuning.py', 'scheduler.py', 'migrations.py', 'write_behind.py', 'sharding.py',
+)
+ROUTES = (
+    'states.py', 'rankings.py', 'admin.py', 'response_cache.py', 'serialization.py',
+    'metrics.py', 'profiler.py', 'live.py',
+)
+TOP_LEVEL = (
+    'main.py', 'config.py', 'benchmark.py', 'serve.py', 'archive.py', 'simulator.py',
+    'assets.py', 'manage.py', 'router.py',
+)
+STATIC = ('index.html', 'app.js', 'components.js', 'styles.css', 'utils.js')
+
+
+def build_package(target):
+    """Monta target/src com links para os módulos da raiz"""
+    package = os.path.join(target, 'src')
+    for directory in ('', 'models', 'routes', 'static'):
+        os.makedirs(os.path.join(package, directory), exist_ok=True)
+    for directory in ('', 'routes'):
+        open(os.path.join(package, directory, '__init__.py'), 'a').close()
+    links = [('__init__.py', 'models/__init__.py')]
+    links += [(name, f'models/{name}') for name in MODELS]
+    links += [(name, f'routes/{name}') for name in ROUTES]
+    links += [(name, name) for name in TOP_LEVEL]
+    links += [(name, f'static/{name}') for name in STATIC]
+    for source, destination in links:
+        os.symlink(os.path.join(ROOT, source), os.path.join(package, destination))
+
+
+PACKAGE_DIR = tempfile.mkdtemp(prefix='brasilsim-tests-')
+build_package(PACKAGE_DIR)
+sys.path.insert(0, PACKAGE_DIR)
+
+
+def reset_process_state():
+    """Índices, catálogos e caches do processo valem para um banco só"""
+    from src.models.leaderboard import leaderboard
+    from src.models.catalog import decision_catalog
+    from src.routes.response_cache import response_cache
+    from src.routes.serialization import state_json_cache
+    leaderboard.invalidate()
+    decision_catalog.invalidate()
+    state_json_cache.clear()
+    response_cache.bump()
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplicação com um banco SQLite novo, já criado e com as decisões padrão"""
+    from src.main import create_app
+    from src.models.migrations import init_database
+    application = create_app({
+        'DATABASE_URL': f'sqlite:///{tmp_path / "app.db"}',
+        'BRASILSIM_ASSET_BUILD_DIR': str(tmp_path / 'static_build'),
+    })
+    with application.app_context():
+        init_database()
+    reset_process_state()
+    yield application
+    reset_process_state()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def create_state(client, name, region='Norte', government_type='Democracia', **extra):
+    """Cria um estado pela API e retorna seu JSON"""
+    response = client.post('/api/states', json={
+        'name': name, 'region': region, 'government_type': government_type, **extra
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['state']
+
+
+@pytest.fixture
+def make_state(client):
+    return lambda name, **extra: create_state(client, name, **extra)
@@ -0,0 +1,172 @@
+"""Rotas de administração de estados e decisões"""
+import pytest
+
+
+def ranking_ids(client, category):
+    rankings = client.get('/api/rankings').get_json()['rankings']
+    return [entry['state']['id'] for entry in rankings.get(category, [])]
+
+
+def test_patch_indicators_moves_state_in_rankings(client, make_state):
+    first = make_state('Acre')
+    second = make_state('Bahia')
+    assert ranking_ids(client, 'economia') == [first['id'], second['id']]
+
+    response = client.patch(f"/api/admin/states/{second['id']}/indicators", json={'indicators': {'economy': 90}})
+    assert response.status_code == 200
+    assert response.get_json()['state']['indicators']['economy'] == 90
+    assert ranking_ids(client, 'economia') == [second['id'], first['id']]
+
+
+def test_patch_indicators_validates_input(client, make_state):
+    state = make_state('Acre')
+    assert client.patch('/api/admin/states/abc/indicators', json={'indicators': {}}).status_code == 400
+    assert client.patch('/api/admin/states/999/indicators', json={'indicators': {'economy': 1}}).status_code == 404
+    response = client.patch(f"/api/admin/states/{state['id']}/indicators", json={'indicators': {'economy': 101}})
+    assert response.status_code == 400
+
+
+def test_delete_state_removes_it_from_rankings(client, make_state):
+    first = make_state('Acre')
+    second = make_state('Bahia')
+    assert client.delete(f"/api/admin/states/{first['id']}").status_code == 200
+    assert ranking_ids(client, 'economia') == [second['id']]
+    assert client.get(f"/api/states/{first['id']}").status_code == 404
+    assert client.delete(f"/api/admin/states/{first['id']}").status_code == 404
+
+
+def test_reset_cooldown(client, make_state):
+    state = make_state('Acre')
+    response = client.patch(f"/api/admin/states/{state['id']}/reset-cooldown")
+    assert response.status_code == 200
+    assert response.get_json()['can_make_decision'] is True
+
+
+def test_deleted_decision_is_no_longer_served(client, make_state):
+    state = make_state('Acre')
+    current = client.get(f"/api/states/{state['id']}/current-decision").get_json()['decision']
+
+    assert client.delete(f"/api/admin/decisions/{current['id']}").status_code == 200
+    assert client.delete(f"/api/admin/decisions/{current['id']}").status_code == 404
+    assert client.delete('/api/admin/decisions/abc').status_code == 400
+
+    remaining = [decision['id'] for decision in client.get('/api/admin/decisions').get_json()['decisions']]
+    assert current['id'] not in remaining
+    for _ in range(5):
+        served = client.get(f"/api/states/{state['id']}/current-decision").get_json()['decision']
+        assert served['id'] != current['id']
+        response = client.post(f"/api/states/{state['id']}/decision", json={'option_index': 0})
+        assert response.status_code == 200
+        assert response.get_json()['decision']['id'] != current['id']
+
+
+def test_manual_adjustment_is_recorded_in_event_log(app, client, make_state):
+    from src.models.decision_event import DecisionEvent
+    from src.models.state import INDICATORS
+    state = make_state('Acre')
+    assert client.post(f"/api/states/{state['id']}/decision", json={'option_index': 0}).status_code == 200
+    response = client.patch(f"/api/admin/states/{state['id']}/indicators",
+                            json={'indicators': {'economy': 90, 'corruption': 12.6}})
+    indicators = response.get_json()['state']['indicators']
+    assert indicators['economy'] == 90 and indicators['corruption'] == 13
+
+    with app.app_context():
+        events = DecisionEvent.history(state['id'])
+        assert len(events) == 2
+        manual = events[-1]
+        assert manual.decision_id is None and manual.option_index is None
+        assert manual.d_economy == 90 - events[0].d_economy - 50
+        assert DecisionEvent.replay(state['id']) == {name: indicators[name] for name in INDICATORS}
+
+
+def test_patch_recomputes_stored_scores(app, client, make_state):
+    from src.models.decision_event import DecisionEvent
+    from src.models.state import GROWTH_WINDOW, balance_score, growth_score
+    state = make_state('Acre')
+    for _ in range(2):
+        assert client.post(f"/api/states/{state['id']}/decision", json={'option_index': 1}).status_code == 200
+    response = client.patch(f"/api/admin/states/{state['id']}/indicators",
+                            json={'indicators': {'economy': 95, 'health': 10}})
+    indicators = response.get_json()['state']['indicators']
+
+    listed = client.get('/api/admin/states').get_json()
+    assert listed['total'] == 1
+    stored = listed['states'][0]
+    assert stored['decisions_count'] == 2
+    assert stored['balance_score'] == balance_score(indicators)
+    with app.app_context():
+        recent = [event.deltas for event in DecisionEvent.history(state['id'], GROWTH_WINDOW)]
+    assert stored['growth_score'] == growth_score(recent)
+
+
+def test_create_decision_with_given_id_is_idempotent(client):
+    decision = {
+        'id': 500, 'title': 'Ferrovias', 'description': 'Ligar as capitais por trem?',
+        'options': [{'text': 'Sim', 'effects': {'economy': 3}}, {'text': 'Não', 'effects': {'economy': -1}}],
+    }
+    response = client.post('/api/admin/decisions', json=decision)
+    assert response.status_code == 201 and response.get_json()['decision']['id'] == 500
+    assert client.post('/api/admin/decisions', json=decision).status_code == 200
+    assert client.post('/api/admin/decisions', json=dict(decision, title='Outra')).status_code == 409
+    assert client.post('/api/admin/decisions', json=dict(decision, id='500')).status_code == 400
+    ids = [item['id'] for item in client.get('/api/admin/decisions').get_json()['decisions']]
+    assert ids.count(500) == 1
+
+
+def test_create_decision_rejects_invalid_effects(app, client, make_state):
+    from src.models.catalog import decision_catalog
+    state = make_state('Acre')
+    before = client.get('/api/admin/decisions').get_json()['decisions']
+    for effects in ({'economy': 'x'}, {'economy': 2.7}, {'economia': 3}, {'economy': True}, ['economy']):
+        response = client.post('/api/admin/decisions', json={
+            'title': 'Inválida', 'description': 'Efeitos inválidos',
+            'options': [{'text': 'A', 'effects': effects}, {'text': 'B', 'effects': {'economy': 1}}],
+        })
+        assert response.status_code == 400, effects
+    assert client.get('/api/admin/decisions').get_json()['decisions'] == before
+
+    # Depois de recarregar o catálogo, as rotas de decisão continuam atendendo
+    decision_catalog.invalidate()
+    assert client.get(f"/api/states/{state['id']}/current-decision").status_code == 200
+    assert client.post(f"/api/states/{state['id']}/decision", json={'option_index': 0}).status_code == 200
+
+
+def test_catalog_skips_stored_decisions_with_invalid_effects(app, client, make_state):
+    from src.models import db
+    from src.models.catalog import decision_catalog
+    from src.models.decision import Decision
+    state = make_state('Acre')
+    with app.app_context():
+        # Gravada direto no banco, como antes da validação da rota
+        broken = Decision.create_decision('Antiga', 'Efeitos inválidos', [
+            {'text': 'A', 'effects': {'economy': 'x'}}, {'text': 'B', 'effects': {'economy': 1}}
+        ])
+        broken_id = broken.id
+        db.session.remove()
+    decision_catalog.invalidate()
+    for _ in range(3):
+        response = client.post(f"/api/states/{state['id']}/decision", json={'option_index': 0})
+        assert response.status_code == 200
+        assert response.get_json()['decision']['id'] != broken_id
+
+
+def test_compile_effects_rejects_instead_of_coercing():
+    from src.models.engine import compile_effects
+    assert compile_effects([{'effects': {'economy': 2}}, {}]) == ((2, 0, 0, 0, 0, 0, 0), (0,) * 7)
+    for effects in ({'economy': 2.7}, {'economia': 1}, {'economy': '1'}):
+        with pytest.raises(ValueError):
+            compile_effects([{'effects': effects}])
+
+
+def test_stats_count_decisions_in_the_database(app, client):
+    from src.models import db
+    from src.models.decision import Decision
+    with app.app_context():
+        stored = db.session.query(Decision).count()
+    assert client.get('/api/admin/stats').get_json()['total_decisions'] == stored
+    response = client.post('/api/admin/decisions', json={
+        'title': 'Ferrovias', 'description': 'Ligar as capitais por trem?',
+        'options': [{'text': 'Sim', 'effects': {'economy': 3}}, {'text': 'Não', 'effects': {'economy': -1}}],
+    })
+    assert response.status_code == 201
+    assert client.get('/api/admin/stats').get_json()['total_decisions'] == stored + 1
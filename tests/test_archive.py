@@ -0,0 +1,35 @@
+"""Exportação e importação pela linha de comando (python -m src.archive)"""
+
+
+def test_cli_export_imports_into_a_new_database(app, client, make_state, tmp_path, monkeypatch):
+    from src.archive import main
+    state = make_state('Acre')
+    assert client.post(f"/api/states/{state['id']}/decision", json={'option_index': 0}).status_code == 200
+    exported = tmp_path / 'mundo.ndjson'
+    monkeypatch.setenv('BRASILSIM_ASSET_BUILD_DIR', str(tmp_path / 'static_build'))
+
+    monkeypatch.setenv('DATABASE_URL', app.config['SQLALCHEMY_DATABASE_URI'])
+    assert main(['export', '--output', str(exported)]) == 0
+
+    # Banco novo: o esquema é criado, mas sem as decisões padrão (vêm do arquivo)
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'novo.db'}")
+    assert main(['import', str(exported)]) == 0
+    assert main(['export', '--output', str(tmp_path / 'copia.ndjson')]) == 0
+    assert (tmp_path / 'copia.ndjson').read_bytes() == exported.read_bytes()
+
+
+def test_benchmark_app_is_the_application_factory(tmp_path, monkeypatch):
+    from src.benchmark import create_benchmark_app
+    from src.main import create_app
+    from src.models.write_behind import write_behind
+    monkeypatch.setenv('BRASILSIM_ASSET_BUILD_DIR', str(tmp_path / 'static_build'))
+    try:
+        benchmark_app = create_benchmark_app(f"sqlite:///{tmp_path / 'bench.db'}", write_behind_mode=True)
+    finally:
+        # O modo é do processo: desliga antes dos próximos testes
+        write_behind.close()
+    app = create_app({'DATABASE_URL': f"sqlite:///{tmp_path / 'app.db'}",
+                      'BRASILSIM_ASSET_BUILD_DIR': str(tmp_path / 'static_build')})
+    assert sorted(map(str, benchmark_app.url_map.iter_rules())) == sorted(map(str, app.url_map.iter_rules()))
+    assert benchmark_app.config['WRITE_BEHIND'] is True
+    assert benchmark_app.config['SQLALCHEMY_DATABASE_URI'].endswith('bench.db')
@@ -0,0 +1,86 @@
+"""Decisões concorrentes nos mesmos estados não podem se perder"""
+import threading
+from collections import Counter
+
+HOT_STATES = 3
+THREADS = 6
+REQUESTS_PER_THREAD = 15
+BATCH_EVERY = 5  # a cada BATCH_EVERY requisições da thread, um lote
+BATCH_SIZE = 4
+
+# Uma só decisão, com efeitos pequenos: nenhum indicador chega ao limite e o
+# valor final é exatamente o inicial mais a soma das opções confirmadas
+OPTIONS = [
+    {'text': 'Investir', 'effects': {'economy': 1}},
+    {'text': 'Ensinar', 'effects': {'education': 1}},
+]
+EFFECTS = [('economy', 1), ('education', 1)]
+
+
+def use_single_decision(client):
+    for decision in client.get('/api/admin/decisions').get_json()['decisions']:
+        assert client.delete(f"/api/admin/decisions/{decision['id']}").status_code == 200
+    response = client.post('/api/admin/decisions', json={
+        'title': 'Orçamento', 'description': 'Onde aplicar o recurso extra?', 'options': OPTIONS
+    })
+    assert response.status_code == 201
+    return response.get_json()['decision']['id']
+
+
+def test_concurrent_decisions_keep_every_delta(app, client, make_state):
+    from src.models import db
+    from src.models.decision_event import DecisionEvent
+    from src.models.state import INDICATORS, State
+
+    decision_id = use_single_decision(client)
+    states = [make_state(f'Estado {n}') for n in range(HOT_STATES)]
+    state_ids = [state['id'] for state in states]
+    start = threading.Barrier(THREADS)
+
+    def worker(index, confirmed, statuses):
+        thread_client = app.test_client()
+        start.wait()
+        for n in range(REQUESTS_PER_THREAD):
+            if n % BATCH_EVERY == BATCH_EVERY - 1:
+                items = [{
+                    'state_id': state_ids[(index + n + k) % HOT_STATES],
+                    'decision_id': decision_id,
+                    'option_index': (index + k) % 2,
+                } for k in range(BATCH_SIZE)]
+                response = thread_client.post('/api/states/decisions/batch', json={'items': items})
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    for item, result in zip(items, response.get_json()['results']):
+                        assert result['success']
+                        confirmed[item['state_id'], item['option_index']] += 1
+            else:
+                state_id = state_ids[(index + n) % HOT_STATES]
+                option_index = (index * n) % 2
+                response = thread_client.post(f'/api/states/{state_id}/decision', json={'option_index': option_index})
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    confirmed[state_id, option_index] += 1
+
+    outcomes = [(Counter(), Counter()) for _ in range(THREADS)]
+    threads = [threading.Thread(target=worker, args=(index, *outcomes[index])) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    confirmed = sum((outcome[0] for outcome in outcomes), Counter())
+    statuses = sum((outcome[1] for outcome in outcomes), Counter())
+    # Conflitos são repetidos no servidor; 409 só se persistirem em todas as tentativas
+    assert statuses == {200: THREADS * REQUESTS_PER_THREAD}
+
+    with app.app_context():
+        for state in states:
+            expected = dict(state['indicators'])
+            for option_index, (indicator, delta) in enumerate(EFFECTS):
+                expected[indicator] += delta * confirmed[state['id'], option_index]
+            stored = db.session.get(State, state['id'])
+            assert {name: getattr(stored, name) for name in INDICATORS} == expected
+            applied = confirmed[state['id'], 0] + confirmed[state['id'], 1]
+            assert stored.decisions_count == applied
+            assert len(DecisionEvent.history(state['id'])) == applied
+            assert DecisionEvent.replay(state['id']) == expected
@@ -0,0 +1,59 @@
+"""Histórico de eventos e pontuação de crescimento"""
+from datetime import datetime, timedelta
+
+
+def query_plan(statement):
+    from src.models import db
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+
+
+def add_events(state_id, count):
+    from src.models.decision_event import DecisionEvent
+    from src.models.state import INDICATORS
+    start = datetime(2026, 1, 1)
+    DecisionEvent.record_many([
+        DecisionEvent.row(state_id, None, None, [50] * len(INDICATORS),
+                          [50 + n % 5] + [50] * (len(INDICATORS) - 1), start + timedelta(minutes=n))
+        for n in range(count)
+    ])
+
+
+def test_latest_deltas_reads_only_the_window_through_the_index(app, make_state):
+    from src.models import db
+    from src.models.decision_event import DecisionEvent
+    from src.models.state import GROWTH_WINDOW
+    state = make_state('Acre')
+    with app.app_context():
+        add_events(state['id'], 3 * GROWTH_WINDOW)
+        db.session.commit()
+
+        expected = [event.deltas for event in DecisionEvent.history(state['id'], GROWTH_WINDOW)]
+        assert DecisionEvent.latest_deltas(state['id'], GROWTH_WINDOW) == expected
+
+        plan = query_plan(DecisionEvent.latest_deltas_query(state['id'], GROWTH_WINDOW))
+        assert any('ix_decision_events_state_time' in line for line in plan), plan
+        assert not any(line.startswith('SCAN') or 'TEMP B-TREE' in line for line in plan), plan
+
+
+def test_recent_deltas_limits_each_state_through_the_index(app, make_state):
+    from src.models import db
+    from src.models.decision_event import DecisionEvent
+    from src.models.state import GROWTH_WINDOW
+    states = [make_state(f'Estado {n}')['id'] for n in range(3)]
+    with app.app_context():
+        add_events(states[0], 3 * GROWTH_WINDOW)
+        add_events(states[1], 2)
+        db.session.commit()
+
+        # Estados sem eventos (ou inexistentes) também aparecem, vazios
+        requested = states + [10_000]
+        recent = DecisionEvent.recent_deltas(requested, GROWTH_WINDOW)
+        assert set(recent) == set(requested)
+        for state_id in requested:
+            assert recent[state_id] == DecisionEvent.latest_deltas(state_id, GROWTH_WINDOW)
+        assert len(recent[states[0]]) == GROWTH_WINDOW and len(recent[states[1]]) == 2
+
+        plan = query_plan(DecisionEvent.recent_deltas_query(states, GROWTH_WINDOW))
+        assert any('ix_decision_events_state_time (state_id=?)' in line for line in plan), plan
+        assert not any(line.startswith('SCAN') or 'TEMP B-TREE' in line for line in plan), plan
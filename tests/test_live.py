@@ -0,0 +1,52 @@
+"""Avisos de mudança para os rankings ao vivo"""
+
+
+def apply_decision(client, state_id):
+    assert client.post(f'/api/states/{state_id}/decision', json={'option_index': 0}).status_code == 200
+
+
+def test_feed_only_records_while_a_server_is_attached(app, client, make_state):
+    from src.routes.live import LiveServer, live_feed
+    state = make_state('Acre')
+
+    # Sem servidor ao vivo, ninguém esvazia o conjunto: nada é guardado
+    apply_decision(client, state['id'])
+    client.delete('/api/admin/clear-all-data')
+    assert not live_feed.active
+    assert live_feed.drain() == (set(), False)
+
+    state = make_state('Bahia')
+    # Intervalo longo: o servidor não esvazia os avisos durante o teste
+    server = LiveServer(app, '127.0.0.1', 0, interval=60).start()
+    try:
+        assert live_feed.active
+        apply_decision(client, state['id'])
+        assert live_feed.drain() == ({state['id']}, False)
+        apply_decision(client, state['id'])
+    finally:
+        server.stop()
+    assert not live_feed.active
+    assert live_feed.drain() == (set(), False)
+
+
+def read_until(connection, received, marker):
+    while marker not in received:
+        chunk = connection.recv(65536)
+        assert chunk, received
+        received += chunk
+    return received
+
+
+def test_connected_client_receives_state_changes(app, client, make_state):
+    import socket
+    from src.routes.live import LIVE_PATH, LiveServer
+    state = make_state('Acre')
+    server = LiveServer(app, '127.0.0.1', 0, interval=0.05).start()
+    try:
+        with socket.create_connection(('127.0.0.1', server.port), timeout=5) as connection:
+            connection.sendall(f"GET {LIVE_PATH}?state_id={state['id']} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+            received = read_until(connection, b'', b'event: snapshot')
+            apply_decision(client, state['id'])
+            read_until(connection, received, b'event: state')
+    finally:
+        server.stop()
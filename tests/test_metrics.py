@@ -0,0 +1,31 @@
+"""Métricas por requisição em GET /metrics"""
+
+
+def request_count(client, route, method='GET', status=200):
+    """Requisições já registradas na série de latência da rota"""
+    prefix = f'brasilsim_request_duration_seconds_count{{route="{route}",method="{method}",status="{status}"}} '
+    for line in client.get('/metrics').get_data(as_text=True).splitlines():
+        if line.startswith(prefix):
+            return int(line[len(prefix):])
+    return 0
+
+
+def test_request_is_counted_without_closing_the_response(client, make_state):
+    state = make_state('Acre')
+    route = '/api/states/<int:state_id>'
+    before = request_count(client, route)
+    for _ in range(3):
+        assert client.get(f"/api/states/{state['id']}").status_code == 200
+    assert request_count(client, route) == before + 3
+
+
+def test_streamed_response_is_counted_when_closed(client, make_state):
+    make_state('Acre')
+    before = request_count(client, '/api/states')
+    response = client.get('/api/states?limit=50')
+    assert response.is_streamed
+    response.get_data()
+    # O tempo inclui o envio do corpo: só conta depois de fechada
+    assert request_count(client, '/api/states') == before
+    response.close()
+    assert request_count(client, '/api/states') == before + 1
@@ -0,0 +1,33 @@
+"""As consultas frequentes em states usam índices (EXPLAIN QUERY PLAN do SQLite)"""
+
+
+def test_hot_queries_use_indexes():
+    from src.benchmark import PLAN_CHECK_REQUESTS, run_plan_check
+    report = run_plan_check(200)
+    # As listas (primeira e segunda página) sempre consultam o banco; as demais
+    # rotas podem ser atendidas pelos índices em memória
+    requests = {query['request'] for query in report['queries']}
+    listings = [f'{method} {path}' for method, path in PLAN_CHECK_REQUESTS if '?' in path]
+    assert set(listings) | {f'{listing} (segunda página)' for listing in listings} <= requests
+    problems = {query['request']: query['plan'] for query in report['queries'] if not query['ok']}
+    assert problems == {}
+
+
+def test_ascending_pages_reverse_the_descending_order(client, make_state):
+    states = [make_state(f'Estado {n}') for n in range(7)]
+    for state, economy in zip(states, (40, 60, 40, 50, 60, 40, 50)):
+        client.patch(f"/api/admin/states/{state['id']}/indicators", json={'indicators': {'economy': economy}})
+
+    def walk(order):
+        seen, cursor = [], None
+        while True:
+            path = f'/api/states?limit=2&order_by=economy&order={order}&fields=economy'
+            page = client.get(path + (f'&cursor={cursor}' if cursor else '')).get_json()
+            seen += [(state['indicators']['economy'], state['id']) for state in page['states']]
+            cursor = page['next_cursor']
+            if not cursor:
+                return seen
+
+    descending = walk('desc')
+    assert descending == sorted(descending, key=lambda item: (-item[0], item[1]))
+    assert walk('asc') == descending[::-1]
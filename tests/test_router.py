@@ -0,0 +1,141 @@
+"""Modo em shards: roteador na frente de um shard (python -m src.serve) por região"""
+import os
+import socket
+
+import pytest
+
+
+def free_port_range(count):
+    """Primeira de `count` portas seguidas livres (os shards locais usam portas consecutivas)"""
+    for base in range(20000, 60000, 97):
+        sockets = []
+        try:
+            for port in range(base, base + count):
+                sock = socket.socket()
+                sockets.append(sock)
+                sock.bind(('127.0.0.1', port))
+            return base
+        except OSError:
+            continue
+        finally:
+            for sock in sockets:
+                sock.close()
+    raise RuntimeError('Nenhuma faixa de portas livre')
+
+
+@pytest.fixture(scope='module')
+def shard_urls(tmp_path_factory):
+    import src
+    from src.models.sharding import shard_regions
+    from src.router import start_local_shards
+    directory = tmp_path_factory.mktemp('shards')
+    environ = dict(
+        os.environ,
+        PYTHONPATH=os.path.dirname(os.path.dirname(src.__file__)),
+        BRASILSIM_SHARD_BASE_PORT=str(free_port_range(len(shard_regions()))),
+        BRASILSIM_SHARD_DATABASE_URL=f'sqlite:///{directory}/shard_{{shard}}.db',
+        BRASILSIM_ASSET_BUILD_DIR=str(directory / 'static_build'),
+        BRASILSIM_THREADS='2',
+    )
+    urls, stop = start_local_shards(environ)
+    yield urls
+    stop()
+
+
+@pytest.fixture
+def router_client(shard_urls, tmp_path):
+    from src.router import ShardRouter, create_router_app
+    router = ShardRouter(shard_urls)
+    yield create_router_app(router, str(tmp_path / 'static_build')).test_client()
+    router.close()
+
+
+def test_admin_state_routes_reach_the_owning_shard(router_client):
+    from src.models.sharding import shard_of
+    response = router_client.post('/api/states', json={
+        'name': 'Roteado', 'region': 'Sul', 'government_type': 'Democracia'
+    })
+    assert response.status_code == 201
+    state_id = response.get_json()['state']['id']
+    assert shard_of(state_id) == 'Sul'
+
+    response = router_client.patch(f'/api/admin/states/{state_id}/indicators', json={'indicators': {'economy': 99}})
+    assert response.status_code == 200
+    assert router_client.get(f'/api/states/{state_id}').get_json()['state']['indicators']['economy'] == 99
+    ranking = router_client.get('/api/rankings/economia').get_json()['ranking']
+    assert ranking[0]['state_id'] == state_id
+
+    assert router_client.patch(f'/api/admin/states/{state_id}/reset-cooldown').status_code == 200
+    assert router_client.patch('/api/admin/states/abc/indicators', json={'indicators': {}}).status_code == 400
+
+    assert router_client.delete(f'/api/admin/states/{state_id}').status_code == 200
+    assert router_client.get(f'/api/states/{state_id}').status_code == 404
+    assert router_client.delete(f'/api/admin/states/{state_id}').status_code == 404
+
+
+DECISION = {
+    'title': 'Ferrovias', 'description': 'Ligar as capitais por trem?',
+    'options': [{'text': 'Sim', 'effects': {'economy': 3}}, {'text': 'Não', 'effects': {'economy': -1}}],
+}
+
+
+def decision_ids(url, region):
+    from src.router import ShardClient
+    status, body = ShardClient(region, url).json('GET', '/api/admin/decisions')
+    assert status == 200
+    return {decision['id'] for decision in body['decisions']}
+
+
+def test_created_decision_has_the_same_id_on_every_shard(router_client, shard_urls):
+    response = router_client.post('/api/admin/decisions', json=DECISION)
+    assert response.status_code == 201
+    decision_id = response.get_json()['decision']['id']
+    assert all(decision_id in decision_ids(url, region) for region, url in shard_urls.items())
+
+    assert router_client.delete(f'/api/admin/decisions/{decision_id}').status_code == 200
+    assert not any(decision_id in decision_ids(url, region) for region, url in shard_urls.items())
+
+
+class FakeShard:
+    """Shard em memória: só o cadastro e a remoção de decisões"""
+
+    def __init__(self, region, fail=False):
+        self.region = region
+        self.fail = fail
+        self.decisions = {}
+
+    def json(self, method, path, payload=None):
+        if self.fail:
+            return 500, {'error': 'falhou'}
+        decision_id = payload.get('id') or max(self.decisions, default=0) + 1
+        self.decisions[decision_id] = payload['title']
+        return 201, {'decision': dict(payload, id=decision_id)}
+
+    def request(self, method, path, body=None, headers=None):
+        del self.decisions[int(path.rsplit('/', 1)[1])]
+        return 200, 'application/json', b'{}'
+
+    def close(self):
+        pass
+
+
+def test_failed_shard_rolls_back_decision_creation(tmp_path):
+    from src.models.sharding import shard_regions
+    from src.router import ShardRouter, create_router_app
+    regions = shard_regions()
+    router = ShardRouter({region: 'http://127.0.0.1:9' for region in regions})
+    router.shards = {region: FakeShard(region, fail=(region == regions[2])) for region in regions}
+    client = create_router_app(router, str(tmp_path / 'static_build')).test_client()
+
+    response = client.post('/api/admin/decisions', json=DECISION)
+    assert response.status_code == 502
+    body = response.get_json()
+    assert body['shards'][regions[2]] == 500
+    assert set(body['rollback']) == set(regions) - {regions[2]}
+    assert all(not shard.decisions for shard in router.shards.values())
+
+    # Com todos os shards de volta, a decisão tem o mesmo id em todos
+    router.shards[regions[2]].fail = False
+    assert client.post('/api/admin/decisions', json=DECISION).status_code == 201
+    assert {tuple(shard.decisions) for shard in router.shards.values()} == {(1,)}
+    router.close()
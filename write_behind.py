@@ -0,0 +1,317 @@
+"""
+Escrita adiada (write-behind) - BrasilSim
+Com BRASILSIM_WRITE_BEHIND=1, as decisões dos jogadores são aplicadas a uma
+cópia em memória dos estados, que passa a ser a versão oficial, e a resposta
+sai sem esperar o banco. Uma thread grava os eventos e as linhas alteradas
+em uma única transação a cada intervalo (ou assim que juntar um lote), em
+vez de um commit (e um fsync no SQLite) por clique.
+
+Uma decisão confirmada ao jogador fica só na memória até a próxima gravação:
+se o processo morrer nesse meio tempo, ela se perde. O intervalo é a janela
+de durabilidade. Ao encerrar o processo, o que estiver pendente é gravado.
+
+Consultas que leem o banco direto (listagem de estados, histórico, export)
+podem ficar até uma janela atrasadas; um estado buscado pelo id e os
+rankings (índice em memória) já refletem a decisão. Rotas que escrevem no
+banco sem passar por aqui usam @exclusive_write. Como a cópia em memória é
+do processo, o modo exige um único worker.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import wraps
+from . import db
+from .state import (State, INDICATORS, GROWTH_WINDOW, clamp_indicator,
+                    balance_score, growth_score)
+from .decision_event import DecisionEvent
+from .scheduler import decision_scheduler, encode_queue, decode_queue
+
+logger = logging.getLogger(__name__)
+
+# Janela de durabilidade: tempo máximo entre a primeira decisão pendente e a gravação
+DEFAULT_INTERVAL_MS = 10.0
+
+# Eventos que disparam a gravação antes do fim do intervalo
+DEFAULT_MAX_ITEMS = 500
+
+# Acima de tantos lotes pendentes (banco lento ou fora), quem decide grava junto
+PENDING_BATCHES_LIMIT = 10
+
+# Colunas de states gravadas a cada lote
+WRITTEN_COLUMNS = INDICATORS + (
+    'balance_score', 'growth_score', 'decisions_count', 'last_decision',
+    'decision_seed', 'decision_position', 'decision_queue', 'version'
+)
+
+# Colunas lidas ao carregar um estado
+LOADED_COLUMNS = ('id', 'name', 'region', 'government_type', 'created_at', 'last_decision',
+                  'decisions_count', 'decision_seed', 'decision_position', 'decision_queue',
+                  'version', 'growth_score') + INDICATORS
+
+
+class StateRecord:
+    """Cópia oficial de um estado enquanto o modo está ativo"""
+    __slots__ = ('id', 'name', 'region', 'government_type', 'created_at', 'last_decision',
+                 'decisions_count', 'schedule', 'version', 'indicators', 'growth_score', 'recent')
+
+    def __init__(self, row):
+        values = dict(zip(LOADED_COLUMNS, row))
+        for name in ('id', 'name', 'region', 'government_type', 'created_at',
+                     'last_decision', 'decisions_count', 'version', 'growth_score'):
+            setattr(self, name, values[name])
+        self.decisions_count = self.decisions_count or 0
+        self.schedule = (values['decision_seed'], values['decision_position'],
+                         decode_queue(values['decision_queue']))
+        self.indicators = {name: values[name] for name in INDICATORS}
+        # Variações dos últimos eventos (pontuação de crescimento), lidas na primeira decisão
+        self.recent = None
+
+    def apply(self, delta, now):
+        """
+        Soma o vetor de efeitos (alinhado a INDICATORS) e retorna (antes,
+        depois); `recent` já deve estar carregado
+        """
+        before = dict(self.indicators)
+        for name, change in zip(INDICATORS, delta):
+            if change:
+                self.indicators[name] = clamp_indicator(before[name] + change)
+        self.recent.append({name: self.indicators[name] - before[name] for name in INDICATORS})
+        self.growth_score = growth_score(list(self.recent))
+        self.last_decision = now
+        self.decisions_count += 1
+        self.version += 1
+        return before, self.indicators
+
+    def mapping(self):
+        """Valores gravados no UPDATE em lote"""
+        mapping = dict(self.indicators)
+        mapping['balance_score'] = balance_score(self.indicators)
+        mapping['growth_score'] = self.growth_score
+        mapping['decisions_count'] = self.decisions_count
+        mapping['last_decision'] = self.last_decision
+        mapping['decision_seed'], mapping['decision_position'], queue = self.schedule
+        mapping['decision_queue'] = encode_queue(queue)
+        mapping['version'] = self.version
+        mapping['_id'] = self.id
+        return mapping
+
+    def to_state(self):
+        """State fora da sessão com os valores atuais (para respostas e rankings)"""
+        state = State(self.name, self.region, self.government_type)
+        for name, value in self.mapping().items():
+            if name != '_id':
+                setattr(state, name, value)
+        state.id = self.id
+        state.created_at = self.created_at
+        return state
+
+
+class WriteBehindStore:
+    """
+    Estados em memória e fila de gravação. Ordem das travas: `_flush_lock`
+    (uma gravação por vez, na ordem das decisões) antes de `_lock` (registros
+    e pendências); as decisões usam só `_lock`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.interval = DEFAULT_INTERVAL_MS / 1000
+        self.max_items = DEFAULT_MAX_ITEMS
+        self.app = None
+        self._records = {}
+        self._events = []
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self._flush_lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closing = False
+        self._thread = None
+        self._thread_pid = None
+        self.flushes = 0
+        self.flushed_events = 0
+
+    def init_app(self, app):
+        """Liga o modo conforme app.config (ver config.configure_write_behind)"""
+        self.app = app
+        self.enabled = app.config.get('WRITE_BEHIND', False)
+        self.interval = app.config.get('WRITE_BEHIND_INTERVAL_MS', DEFAULT_INTERVAL_MS) / 1000
+        self.max_items = app.config.get('WRITE_BEHIND_MAX_ITEMS', DEFAULT_MAX_ITEMS)
+        if self.enabled:
+            atexit.register(self.close)
+        return self
+
+    def _load(self, state_id):
+        """Registro do estado, lido do banco na primeira vez (com `_lock`)"""
+        record = self._records.get(state_id)
+        if record is None:
+            row = db.session.execute(
+                db.select(*[getattr(State, column) for column in LOADED_COLUMNS]).where(State.id == state_id)
+            ).first()
+            if row is None:
+                return None
+            record = self._records[state_id] = StateRecord(row)
+        return record
+
+    def _ensure_schedule(self, record):
+        schedule = decision_scheduler.ensure(*record.schedule)
+        if schedule != record.schedule:
+            record.schedule = schedule
+            self._mark_dirty(record.id)
+        return schedule
+
+    def _mark_dirty(self, state_id):
+        """Agenda a gravação do estado (com `_lock`)"""
+        self._dirty.add(state_id)
+        self._start_writer()
+        if len(self._dirty) == 1 or len(self._events) >= self.max_items:
+            self._wakeup.notify()
+
+    def get(self, state_id):
+        """Estado atual (State fora da sessão) com agenda válida, ou None"""
+        with self._lock:
+            record = self._load(state_id)
+            if record is None:
+                return None
+            self._ensure_schedule(record)
+            return record.to_state()
+
+    def cached(self, state_id):
+        """Estado em memória, ou None se ele não foi carregado (o banco está em dia)"""
+        with self._lock:
+            record = self._records.get(state_id)
+            return record.to_state() if record is not None else None
+
+    def apply_decision(self, state_id, option_index, choose):
+        """
+        Escolhe e aplica uma decisão ao estado em memória. choose(agenda)
+        retorna (resultado, decisão, efeitos, agenda seguinte); com efeitos
+        None nada é aplicado. Retorna (resultado, decisão, State fora da
+        sessão), com resultado 'not_found' se o estado não existir.
+        """
+        if len(self._events) >= self.max_items * PENDING_BATCHES_LIMIT:
+            self.flush()
+
+        with self._lock:
+            record = self._load(state_id)
+            if record is None:
+                return 'not_found', None, None
+            outcome, decision, delta, next_schedule = choose(self._ensure_schedule(record))
+            if delta is not None:
+                if record.recent is None:
+                    record.recent = deque(DecisionEvent.latest_deltas(state_id, GROWTH_WINDOW), maxlen=GROWTH_WINDOW)
+                now = datetime.utcnow()
+                before, after = record.apply(delta, now)
+                if next_schedule is not None:
+                    record.schedule = next_schedule
+                self._events.append(DecisionEvent.row(state_id, decision.id, option_index, before, after, now))
+                self._mark_dirty(state_id)
+            return outcome, decision, record.to_state()
+
+    def _start_writer(self):
+        # Threads não passam pelo fork dos workers: cria a do processo atual
+        if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='brasilsim-write-behind', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._dirty and not self._closing:
+                    self._wakeup.wait()
+                if self._closing:
+                    return
+                # Junta o que chegar até o fim do intervalo ou até completar o lote
+                deadline = time.monotonic() + self.interval
+                while len(self._events) < self.max_items and not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar decisões pendentes; nova tentativa no próximo intervalo')
+                time.sleep(self.interval)
+
+    def flush(self):
+        """Grava tudo o que está pendente em uma transação; retorna a quantidade de eventos"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+                dirty, self._dirty = self._dirty, set()
+                mappings = [self._records[state_id].mapping() for state_id in sorted(dirty)
+                            if state_id in self._records]
+            if not dirty:
+                return 0
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as connection:
+                        if events:
+                            connection.execute(DecisionEvent.__table__.insert(), events)
+                        if mappings:
+                            table = State.__table__
+                            connection.execute(
+                                table.update().where(table.c.id == db.bindparam('_id')).values(
+                                    **{name: db.bindparam(name) for name in WRITTEN_COLUMNS}
+                                ),
+                                mappings
+                            )
+            except Exception:
+                # Volta para a frente da fila; os valores gravados são lidos de novo dos registros
+                with self._lock:
+                    self._events[:0] = events
+                    self._dirty |= dirty
+                raise
+            self.flushes += 1
+            self.flushed_events += len(events)
+            return len(events)
+
+    def pending(self):
+        """Eventos ainda não gravados"""
+        return len(self._events)
+
+    def release(self):
+        """
+        Grava o que está pendente e descarta os estados em memória (com as
+        duas travas seguras, quem chamou escreve no banco sem concorrência)
+        """
+        with self._flush_lock, self._lock:
+            self.flush()
+            self._records.clear()
+
+    def close(self):
+        """Grava o que está pendente e encerra a thread de gravação (ao sair do processo)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._closing = True
+            self._wakeup.notify_all()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._thread_pid == os.getpid():
+            thread.join()
+        self.release()
+        self.enabled = False
+
+
+write_behind = WriteBehindStore()
+
+
+def exclusive_write(view):
+    """
+    Rota que escreve no banco sem passar pela memória: com o modo ativo,
+    grava as pendências, descarta os estados em memória e segura as decisões
+    até a rota retornar
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not write_behind.enabled:
+            return view(*args, **kwargs)
+        with write_behind._flush_lock, write_behind._lock:
+            write_behind.release()
+            return view(*args, **kwargs)
+    return wrapper